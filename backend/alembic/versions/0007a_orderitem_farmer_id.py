@@ -0,0 +1,39 @@
+"""add farmer_id to orderitem
+
+Revision ID: 0007a_orderitem_farmer_id
+Revises: 0007_add_ecosystem_roles
+Create Date: 2026-10-17 08:30:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0007a_orderitem_farmer_id'
+down_revision = '0007_add_ecosystem_roles'
+branch_labels = None
+depends_on = None
+
+
+def _has_farmer_id() -> bool:
+    columns = sa.inspect(op.get_bind()).get_columns("orderitem")
+    return any(column["name"] == "farmer_id" for column in columns)
+
+
+def upgrade() -> None:
+    # OrderItem.farmer_id is declared on the model but 0001 never created it;
+    # the analytics rollup (0008) and indexes (0009) filter on it.
+    # Schemas built from the models already have it.
+    if _has_farmer_id():
+        return
+    op.add_column('orderitem', sa.Column('farmer_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'orderitem_farmer_id_fkey', 'orderitem', 'farmer', ['farmer_id'], ['id']
+    )
+
+
+def downgrade() -> None:
+    if not _has_farmer_id():
+        return
+    op.drop_constraint('orderitem_farmer_id_fkey', 'orderitem', type_='foreignkey')
+    op.drop_column('orderitem', 'farmer_id')
@@ -0,0 +1,45 @@
+"""add monthly_user_spend rollup
+
+Revision ID: 0008_monthly_user_spend
+Revises: 0007a_orderitem_farmer_id
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0008_monthly_user_spend'
+down_revision = '0007a_orderitem_farmer_id'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Per buyer/farmer/month revenue over paid orders. Enum columns store member
+    # names, hence 'PAID'. Refreshed periodically by app.database.refresh_rollups.
+    op.execute("""
+        CREATE MATERIALIZED VIEW monthly_user_spend AS
+        SELECT
+            o.buyer_id,
+            oi.farmer_id,
+            date_trunc('month', o.created_at) AS month,
+            sum(oi.quantity * oi.unit_price) AS revenue,
+            count(DISTINCT o.id) AS order_count
+        FROM "order" o
+        JOIN orderitem oi ON oi.order_id = o.id
+        WHERE o.payment_status = 'PAID' AND oi.farmer_id IS NOT NULL
+        GROUP BY 1, 2, 3
+    """)
+    # Unique index is required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.execute(
+        "CREATE UNIQUE INDEX ux_monthly_user_spend "
+        "ON monthly_user_spend (buyer_id, farmer_id, month)"
+    )
+    op.execute(
+        "CREATE INDEX ix_monthly_user_spend_farmer_month "
+        "ON monthly_user_spend (farmer_id, month)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS monthly_user_spend")
@@ -0,0 +1,41 @@
+"""add composite indexes for analytics queries
+
+Revision ID: 0009_analytics_indexes
+Revises: 0008_monthly_user_spend
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0009_analytics_indexes'
+down_revision = '0008_monthly_user_spend'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        # Buyer analytics: buyer_id = ? AND payment_status = 'PAID' AND created_at range
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_order_buyer_paid_created
+            ON "order" (buyer_id, payment_status, created_at DESC) INCLUDE (total)
+        """)
+        # Orders carry no farmer; farmer analytics filter through order items.
+        # orderitem.farmer_id is not in the 0001 schema; 0007a adds it.
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orderitem_farmer_order
+            ON orderitem (farmer_id, order_id) INCLUDE (quantity, unit_price)
+        """)
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orderitem_order_id
+            ON orderitem (order_id)
+        """)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_orderitem_order_id")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_orderitem_farmer_order")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_order_buyer_paid_created")
@@ -0,0 +1,29 @@
+"""add usersession (user_id, created_at) index
+
+Revision ID: 0010_usersession_user_created
+Revises: 0009_analytics_indexes
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0010_usersession_user_created'
+down_revision = '0009_analytics_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Login prunes all but a user's newest sessions; this index serves that
+    # ORDER BY created_at DESC OFFSET scan without touching the heap
+    with op.get_context().autocommit_block():
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_usersession_user_created
+            ON usersession (user_id, created_at DESC) INCLUDE (id)
+        """)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_usersession_user_created")
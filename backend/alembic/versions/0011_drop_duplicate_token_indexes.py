@@ -0,0 +1,35 @@
+"""drop duplicate token_jti / refresh_token indexes
+
+Revision ID: 0011_drop_dup_token_indexes
+Revises: 0010_usersession_user_created
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0011_drop_dup_token_indexes'
+down_revision = '0010_usersession_user_created'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # tokenblacklist.token_jti and usersession.refresh_token are UNIQUE, so their
+    # constraint indexes already serve the auth lookups; the plain copies from
+    # 0003 only add write cost on every login and revocation
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_tokenblacklist_token_jti")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_usersession_refresh_token")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tokenblacklist_token_jti
+            ON tokenblacklist (token_jti)
+        """)
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_usersession_refresh_token
+            ON usersession (refresh_token)
+        """)
@@ -0,0 +1,61 @@
+"""unique (cart_id, product_id) on cartitem
+
+Revision ID: 0012_cartitem_cart_product
+Revises: 0011_drop_dup_token_indexes
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0012_cartitem_cart_product'
+down_revision = '0011_drop_dup_token_indexes'
+branch_labels = None
+depends_on = None
+
+
+def _drop_invalid_index(name: str) -> None:
+    """Drop an index left INVALID by a failed concurrent build.
+    
+    IF NOT EXISTS would keep such an index, and the upserts' ON CONFLICT
+    cannot use it, so a re-run must rebuild it from scratch.
+    """
+    invalid = op.get_bind().execute(sa.text("""
+        SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = :name AND NOT i.indisvalid
+    """), {"name": name}).first()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY {name}")
+
+
+def upgrade() -> None:
+    # No earlier revision creates the cart tables; skip databases without them
+    if not sa.inspect(op.get_bind()).has_table("cartitem"):
+        return
+    # Fold any duplicate lines left by the old read-then-insert add_item into
+    # the oldest row so the unique index can be built
+    op.execute("""
+        UPDATE cartitem SET quantity = dup.total
+        FROM (
+            SELECT min(id) AS keep_id, sum(quantity) AS total
+            FROM cartitem GROUP BY cart_id, product_id HAVING count(*) > 1
+        ) AS dup
+        WHERE cartitem.id = dup.keep_id
+    """)
+    op.execute("""
+        DELETE FROM cartitem c USING cartitem k
+        WHERE c.cart_id = k.cart_id AND c.product_id = k.product_id AND c.id > k.id
+    """)
+    # Conflict target for the add_item upsert
+    with op.get_context().autocommit_block():
+        _drop_invalid_index("uq_cartitem_cart_product")
+        op.execute("""
+            CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_cartitem_cart_product
+            ON cartitem (cart_id, product_id)
+        """)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS uq_cartitem_cart_product")
@@ -0,0 +1,34 @@
+"""covering index for cart item listings
+
+Revision ID: 0013_cartitem_covering
+Revises: 0012_cartitem_cart_product
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0013_cartitem_covering'
+down_revision = '0012_cartitem_cart_product'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # No earlier revision creates the cart tables; skip databases without them
+    if not sa.inspect(op.get_bind()).has_table("cartitem"):
+        return
+    # Cart listings read every column of a cart's lines; carrying them in the
+    # index lets WHERE cart_id = ? be answered by an index-only scan
+    with op.get_context().autocommit_block():
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_cartitem_cart_covering
+            ON cartitem (cart_id)
+            INCLUDE (id, product_id, quantity, unit_price, added_at, updated_at)
+        """)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_cartitem_cart_covering")
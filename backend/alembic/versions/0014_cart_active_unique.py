@@ -0,0 +1,71 @@
+"""one active cart per user / guest session
+
+Revision ID: 0014_cart_active_unique
+Revises: 0013_cartitem_covering
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0014_cart_active_unique'
+down_revision = '0013_cartitem_covering'
+branch_labels = None
+depends_on = None
+
+
+def _drop_invalid_index(name: str) -> None:
+    """Drop an index left INVALID by a failed concurrent build.
+    
+    IF NOT EXISTS would keep such an index, and the upserts' ON CONFLICT
+    cannot use it, so a re-run must rebuild it from scratch.
+    """
+    invalid = op.get_bind().execute(sa.text("""
+        SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = :name AND NOT i.indisvalid
+    """), {"name": name}).first()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY {name}")
+
+
+def upgrade() -> None:
+    # No earlier revision creates the cart tables; skip databases without them
+    if not sa.inspect(op.get_bind()).has_table("cart"):
+        return
+    # Concurrent first requests could open several active carts for the same
+    # owner; keep the newest and expire the rest before enforcing uniqueness
+    op.execute("""
+        UPDATE cart SET status = 'EXPIRED'
+        WHERE status = 'ACTIVE' AND id NOT IN (
+            SELECT max(id) FROM cart
+            WHERE status = 'ACTIVE' AND user_id IS NOT NULL
+            GROUP BY user_id
+        ) AND user_id IS NOT NULL
+    """)
+    op.execute("""
+        UPDATE cart SET status = 'EXPIRED'
+        WHERE status = 'ACTIVE' AND id NOT IN (
+            SELECT max(id) FROM cart
+            WHERE status = 'ACTIVE' AND user_id IS NULL
+            GROUP BY session_id
+        ) AND user_id IS NULL
+    """)
+    # Conflict targets for the get_or_create_cart insert
+    with op.get_context().autocommit_block():
+        _drop_invalid_index("uq_cart_active_user")
+        op.execute("""
+            CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_cart_active_user
+            ON cart (user_id) WHERE status = 'ACTIVE'
+        """)
+        _drop_invalid_index("uq_cart_active_session")
+        op.execute("""
+            CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_cart_active_session
+            ON cart (session_id) WHERE status = 'ACTIVE' AND user_id IS NULL
+        """)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS uq_cart_active_session")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS uq_cart_active_user")
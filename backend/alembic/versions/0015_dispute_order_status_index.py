@@ -0,0 +1,32 @@
+"""index disputes by order and status
+
+Revision ID: 0015_dispute_order_status
+Revises: 0014_cart_active_unique
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0015_dispute_order_status'
+down_revision = '0014_cart_active_unique'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # No earlier revision creates the dispute tables; skip databases without them
+    if not sa.inspect(op.get_bind()).has_table("dispute"):
+        return
+    # Dispute creation checks for an open/in-review dispute on the order
+    with op.get_context().autocommit_block():
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_dispute_order_status
+            ON dispute (order_id, status)
+        """)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_dispute_order_status")
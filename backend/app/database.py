@@ -1,11 +1,32 @@
 import os
 from typing import Generator
+from sqlalchemy import text
 from sqlmodel import SQLModel, create_engine, Session
 
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///agri.db")
-# Enable pool_pre_ping for better connection handling in prod Postgres
-engine = create_engine(DATABASE_URL, echo=False, pool_pre_ping=True)
+
+# Services open a short-lived Session per call, so size the shared pool for
+# concurrent request threads and recycle connections before server-side
+# idle timeouts drop them. Keep (pool_size + max_overflow) x workers below the
+# server's max_connections. SQLite keeps SQLAlchemy's default pool.
+_pool_options = {} if DATABASE_URL.startswith("sqlite") else {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "20")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "40")),
+    "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+}
+
+# Enable pool_pre_ping for better connection handling in prod Postgres.
+# query_cache_size is raised above SQLAlchemy's default of 500 so the compiled
+# forms of every hot select()/update() across the routers stay cached.
+engine = create_engine(
+    DATABASE_URL,
+    echo=False,
+    pool_pre_ping=True,
+    query_cache_size=int(os.getenv("DB_QUERY_CACHE_SIZE", "1200")),
+    **_pool_options,
+)
 
 
 def init_db() -> None:
@@ -15,6 +36,29 @@ def init_db() -> None:
     return
 
 
+# Advisory lock key shared by every worker's rollup refresh loop
+_ROLLUP_REFRESH_LOCK_ID = 7_310_001
+
+
+def refresh_rollups() -> bool:
+    """Refresh analytics rollup materialized views (Postgres only).
+    
+    Every worker runs the refresh loop; a transaction-scoped advisory lock lets
+    one of them refresh while the others skip. Returns whether this call did.
+    """
+    if engine.dialect.name != "postgresql":
+        return False
+    with engine.begin() as conn:
+        acquired = conn.execute(
+            text("SELECT pg_try_advisory_xact_lock(:lock_id)"),
+            {"lock_id": _ROLLUP_REFRESH_LOCK_ID}
+        ).scalar()
+        if not acquired:
+            return False
+        conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY monthly_user_spend"))
+    return True
+
+
 def get_db() -> Generator[Session, None, None]:
     """Database dependency for FastAPI dependency injection."""
     with Session(engine) as session:
@@ -1,49 +1,89 @@
-from typing import Optional
+import os
+import time
+from typing import Dict, Optional, Tuple
 
 from fastapi import Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session
 
 from .database import engine
 from .models import User, UserStatus
 from .services.auth import token_manager
 
+# Authenticated users are re-read on every request; keep them briefly so bursts
+# from one client skip the lookup. Tokens are still validated each time.
+# invalidate_cached_user only clears this process, so a suspension or role
+# change made through another worker takes up to this long to apply there.
+USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "2"))
+USER_CACHE_MAX_SIZE = 4096
 
-def get_current_user(
+_user_cache: Dict[int, Tuple[float, User]] = {}
+
+
+def invalidate_cached_user(user_id: int) -> None:
+    """Drop a cached user so role/status changes apply on the next request."""
+    _user_cache.pop(user_id, None)
+
+
+def _fetch_user(user_id: int) -> Optional[User]:
+    with Session(engine) as session:
+        return session.get(User, user_id)
+
+
+async def _load_user(user_id: int) -> Optional[User]:
+    """Fetch a user by id, served from the short-lived cache when fresh."""
+    now = time.monotonic()
+    cached = _user_cache.get(user_id)
+    if cached and cached[0] > now:
+        return cached[1]
+    
+    user = await run_in_threadpool(_fetch_user, user_id)
+    
+    if user and USER_CACHE_TTL > 0:
+        if len(_user_cache) >= USER_CACHE_MAX_SIZE:
+            _user_cache.pop(next(iter(_user_cache)), None)
+        _user_cache[user_id] = (now + USER_CACHE_TTL, user)
+    return user
+
+
+async def get_current_user(
     request: Request,
     authorization: Optional[str] = Header(default=None)
 ) -> User:
     """Get current authenticated user with automatic token refresh support."""
+    user = getattr(request.state, "current_user", None)
+    if user is not None:
+        return user
+    
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=401, detail="Missing bearer token")
     
     token = authorization.split(" ", 1)[1]
-    payload = token_manager.validate_token(token, "access")
+    payload = await token_manager.validate_token_async(token, "access")
     
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     
-    user_id = int(payload.get("sub"))
+    user = await _load_user(int(payload.get("sub")))
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
     
-    with Session(engine) as session:
-        user = session.get(User, user_id)
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
-        
-        if user.status != UserStatus.ACTIVE:
-            raise HTTPException(status_code=403, detail="Account is not active")
-        
-        return user
+    if user.status != UserStatus.ACTIVE:
+        raise HTTPException(status_code=403, detail="Account is not active")
+    
+    request.state.current_user = user
+    return user
 
 
-def get_current_active_user(
+async def get_current_active_user(
     request: Request,
     authorization: Optional[str] = Header(default=None)
 ) -> User:
     """Get current user and ensure they are active."""
-    return get_current_user(request, authorization)
+    return await get_current_user(request, authorization)
 
 
-def get_current_user_optional(
+async def get_current_user_optional(
     request: Request,
     authorization: Optional[str] = Header(default=None)
 ) -> Optional[User]:
@@ -53,19 +93,16 @@ def get_current_user_optional(
     
     try:
         token = authorization.split(" ", 1)[1]
-        payload = token_manager.validate_token(token, "access")
+        payload = await token_manager.validate_token_async(token, "access")
         
         if not payload:
             return None
         
-        user_id = int(payload.get("sub"))
+        user = await _load_user(int(payload.get("sub")))
+        if not user or user.status != UserStatus.ACTIVE:
+            return None
         
-        with Session(engine) as session:
-            user = session.get(User, user_id)
-            if not user or user.status != UserStatus.ACTIVE:
-                return None
-            
-            return user
+        return user
     except Exception:
         return None
 
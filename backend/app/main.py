@@ -1,3 +1,5 @@
+import asyncio
+import logging
 import os
 from dotenv import load_dotenv
 from fastapi import FastAPI
@@ -6,9 +8,9 @@ from fastapi.exceptions import RequestValidationError
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.exc import IntegrityError
 
-from .database import init_db
+from .database import engine, init_db, refresh_rollups
 from .core.logging import CorrelationIdMiddleware, setup_logging
-from .routers import health, farmers, marketplace, finance, ai, supplychain, governance, commerce, users, auth, cart, notifications, orders, disputes, analytics, admin, recommendations, social, blockchain, agents, dev_agents, cropvariety
+from .routers import health, farmers, marketplace, finance, ai, supplychain, governance, commerce, users, auth, cart, notifications, orders, disputes, analytics, user_analytics, admin, recommendations, social, blockchain, agents, dev_agents, cropvariety
 from .middleware.security import (
     XSSProtectionMiddleware, 
     CSRFProtectionMiddleware, 
@@ -17,6 +19,7 @@ from .middleware.security import (
     set_csrf_middleware
 )
 from .services.redis_service import redis_service
+from .services.auth import token_manager
 from .middleware.error_handlers import (
     validation_exception_handler,
     http_exception_handler,
@@ -34,6 +37,17 @@ else:
     load_dotenv()
 
 app = FastAPI(title="AgriDAO Backend", version="0.1.0")
+logger = logging.getLogger(__name__)
+
+# Seconds between refreshes of the analytics rollup materialized views
+ROLLUP_REFRESH_INTERVAL = int(os.getenv("ROLLUP_REFRESH_INTERVAL", "3600"))
+
+# Seconds between sweeps of expired sessions and blacklist rows
+SESSION_CLEANUP_INTERVAL = int(os.getenv("SESSION_CLEANUP_INTERVAL", "300"))
+
+# Seconds between attempts to reload the Redis token blacklist after it
+# became untrustworthy; checks use the database in the meantime
+BLACKLIST_REHYDRATE_INTERVAL = int(os.getenv("BLACKLIST_REHYDRATE_INTERVAL", "30"))
 
 # Setup structured logging
 setup_logging(
@@ -89,14 +103,60 @@ app.add_exception_handler(IntegrityError, integrity_error_handler)
 app.add_exception_handler(Exception, general_exception_handler)
 
 
+async def _refresh_rollups_periodically() -> None:
+    while True:
+        await asyncio.sleep(ROLLUP_REFRESH_INTERVAL)
+        try:
+            if await asyncio.to_thread(refresh_rollups):
+                logger.info("Refreshed analytics rollups")
+        except Exception as e:
+            logger.error(f"Failed to refresh analytics rollups: {e}")
+
+
+async def _cleanup_sessions_periodically() -> None:
+    while True:
+        await asyncio.sleep(SESSION_CLEANUP_INTERVAL)
+        try:
+            removed = await asyncio.to_thread(token_manager.cleanup_expired_sessions)
+            logger.info("Expired session cleanup removed %d rows", removed)
+        except Exception as e:
+            logger.error(f"Failed to clean up expired sessions: {e}")
+
+
+async def _rehydrate_blacklist_periodically() -> None:
+    while True:
+        await asyncio.sleep(BLACKLIST_REHYDRATE_INTERVAL)
+        if token_manager.redis_blacklist_ready or not redis_service.redis_client:
+            continue
+        try:
+            loaded = await token_manager.rehydrate_blacklist_redis()
+            logger.info("Rehydrated %d blacklist entries into Redis", loaded)
+        except Exception as e:
+            logger.error(f"Failed to rehydrate Redis blacklist: {e}")
+
+
 @app.on_event("startup")
 async def on_startup() -> None:
     init_db()
     await redis_service.connect()
+    # Redis answers blacklist checks first, so seed it from the database;
+    # until that succeeds checks go to the database and a retry loop reseeds
+    try:
+        await token_manager.rehydrate_blacklist_redis()
+    except Exception as e:
+        logger.error(f"Failed to rehydrate Redis blacklist at startup: {e}")
+    app.state.background_tasks = [
+        asyncio.create_task(_cleanup_sessions_periodically()),
+        asyncio.create_task(_rehydrate_blacklist_periodically()),
+    ]
+    if engine.dialect.name == "postgresql":
+        app.state.background_tasks.append(asyncio.create_task(_refresh_rollups_periodically()))
 
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
+    for task in getattr(app.state, "background_tasks", []):
+        task.cancel()
     await redis_service.disconnect()
 
 
@@ -118,6 +178,7 @@ app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 app.include_router(orders.router, prefix="/api", tags=["orders"])
 app.include_router(disputes.router, prefix="/api", tags=["disputes"])
 app.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+app.include_router(user_analytics.router, prefix="/analytics", tags=["analytics"])
 app.include_router(agents.router, prefix="/api", tags=["agents"])
 app.include_router(admin.router, prefix="/admin", tags=["admin"])
 app.include_router(recommendations.router, prefix="/recommendations", tags=["recommendations"])
@@ -3,6 +3,7 @@ from typing import Optional, List
 from enum import Enum
 from decimal import Decimal
 
+from sqlalchemy import Index, text
 from sqlmodel import Field, SQLModel, Column, JSON
 
 
@@ -286,6 +287,24 @@ class CartStatus(str, Enum):
 
 
 class Cart(SQLModel, table=True):
+    # At most one active cart per user, and per session for guest carts
+    __table_args__ = (
+        Index(
+            "uq_cart_active_user",
+            "user_id",
+            unique=True,
+            postgresql_where=text("status = 'ACTIVE'"),
+            sqlite_where=text("status = 'ACTIVE'"),
+        ),
+        Index(
+            "uq_cart_active_session",
+            "session_id",
+            unique=True,
+            postgresql_where=text("status = 'ACTIVE' AND user_id IS NULL"),
+            sqlite_where=text("status = 'ACTIVE' AND user_id IS NULL"),
+        ),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: Optional[int] = Field(default=None, foreign_key="user.id")
     session_id: Optional[str] = Field(default=None, max_length=255)  # For anonymous users
@@ -296,6 +315,15 @@ class Cart(SQLModel, table=True):
 
 
 class CartItem(SQLModel, table=True):
+    __table_args__ = (
+        Index("uq_cartitem_cart_product", "cart_id", "product_id", unique=True),
+        Index(
+            "ix_cartitem_cart_covering",
+            "cart_id",
+            postgresql_include=["id", "product_id", "quantity", "unit_price", "added_at", "updated_at"],
+        ),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     cart_id: int = Field(foreign_key="cart.id")
     product_id: int = Field(foreign_key="product.id")
@@ -354,6 +382,11 @@ class DisputeType(str, Enum):
 
 
 class Dispute(SQLModel, table=True):
+    # Serves the "active dispute for this order?" check on dispute creation
+    __table_args__ = (
+        Index("ix_dispute_order_status", "order_id", "status"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     order_id: int = Field(foreign_key="order.id")
     filed_by: int = Field(foreign_key="user.id")  # User who filed the dispute
@@ -3,11 +3,11 @@ from typing import List
 from pydantic import BaseModel
 
 from fastapi import APIRouter, HTTPException, Depends
-from sqlmodel import Session, select
+from sqlmodel import Session, select, delete
 
 from ..database import engine
-from ..models import User, UserStatus
-from ..deps import get_current_user
+from ..models import User, UserRole, UserStatus
+from ..deps import get_current_user, invalidate_cached_user
 
 
 router = APIRouter()
@@ -19,9 +19,7 @@ class RoleUpdate(BaseModel):
 
 def require_admin(current_user: User = Depends(get_current_user)) -> User:
     """Dependency to require admin access"""
-    # Handle both enum and string role values
-    role_str = current_user.role.value if hasattr(current_user.role, 'value') else str(current_user.role)
-    if role_str.upper() != "ADMIN":
+    if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
 
@@ -53,6 +51,7 @@ def update_user_role(
         user.role = role_update.role.upper()
         session.add(user)
         session.commit()
+        invalidate_cached_user(user.id)
         session.refresh(user)
         return user
 
@@ -74,6 +73,7 @@ def suspend_user(
         user.status = UserStatus.SUSPENDED
         session.add(user)
         session.commit()
+        invalidate_cached_user(user.id)
         session.refresh(user)
         return user
 
@@ -127,23 +127,17 @@ def delete_user(
                     session.delete(farmer)
             
             # 2. Delete user sessions
-            sessions = session.exec(select(UserSession).where(UserSession.user_id == user_id)).all()
-            for s in sessions:
-                session.delete(s)
+            session.exec(delete(UserSession).where(UserSession.user_id == user_id))
             
             # 3. Delete notifications (if table exists)
             try:
-                notifications = session.exec(select(Notification).where(Notification.user_id == user_id)).all()
-                for n in notifications:
-                    session.delete(n)
+                session.exec(delete(Notification).where(Notification.user_id == user_id))
             except Exception:
                 pass  # Table might not exist
             
             # 4. Delete carts
             try:
-                carts = session.exec(select(Cart).where(Cart.user_id == user_id)).all()
-                for c in carts:
-                    session.delete(c)
+                session.exec(delete(Cart).where(Cart.user_id == user_id))
             except Exception:
                 pass  # Table might not exist
             
@@ -153,6 +147,7 @@ def delete_user(
             # Now delete the user
             session.delete(user)
             session.commit()
+            invalidate_cached_user(user_id)
             
     except HTTPException:
         raise
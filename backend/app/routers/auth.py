@@ -127,25 +127,25 @@ def refresh_token(payload: RefreshTokenRequest):
 
 
 @router.post("/logout")
-def logout(request: Request, payload: LogoutRequest, current_user: User = Depends(get_current_user)):
+async def logout(request: Request, payload: LogoutRequest, current_user: User = Depends(get_current_user)):
     """Logout user and revoke tokens."""
     # Get access token from header
     authorization = request.headers.get("authorization", "")
     if authorization.lower().startswith("bearer "):
         access_token = authorization.split(" ", 1)[1]
-        token_manager.revoke_token(access_token)
+        await token_manager.revoke_token_async(access_token)
     
     # Revoke refresh token if provided
     if payload.refresh_token:
-        token_manager.revoke_token(payload.refresh_token)
+        await token_manager.revoke_token_async(payload.refresh_token)
     
     return {"message": "Successfully logged out"}
 
 
 @router.post("/logout-all")
-def logout_all(current_user: User = Depends(get_current_user)):
+async def logout_all(current_user: User = Depends(get_current_user)):
     """Logout user from all devices."""
-    token_manager.revoke_all_user_sessions(current_user.id)
+    await token_manager.revoke_all_user_sessions_async(current_user.id)
     return {"message": "Successfully logged out from all devices"}
 
 
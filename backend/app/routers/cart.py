@@ -3,7 +3,7 @@ Cart API endpoints for shopping cart management.
 """
 
 from typing import Optional
-from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
 from pydantic import BaseModel
 
 from ..services.cart_service import CartService
@@ -25,7 +25,8 @@ class UpdateCartItemRequest(BaseModel):
 
 
 @router.get("/cart")
-def get_cart(
+async def get_cart(
+    include_items: bool = True,
     session_id: Optional[str] = Header(None, alias="X-Session-ID"),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
@@ -38,12 +39,31 @@ def get_cart(
             detail="Either authentication or session ID required"
         )
     
-    cart = cart_service.get_or_create_cart(user_id=user_id, session_id=session_id)
-    return cart_service.get_cart_summary(cart.id)
+    cart = await cart_service.get_or_create_cart(user_id=user_id, session_id=session_id)
+    return await cart_service.get_cart_summary(cart.id, include_items=include_items)
+
+
+@router.get("/cart/items")
+async def get_cart_items(
+    session_id: Optional[str] = Header(None, alias="X-Session-ID"),
+    current_user: Optional[User] = Depends(get_current_user_optional)
+):
+    """Get cart items, served straight from the cached JSON body."""
+    user_id = current_user.id if current_user else None
+    
+    if not user_id and not session_id:
+        raise HTTPException(
+            status_code=400, 
+            detail="Either authentication or session ID required"
+        )
+    
+    cart = await cart_service.get_or_create_cart(user_id=user_id, session_id=session_id)
+    body = await cart_service.get_cart_items_json(cart.id)
+    return Response(content=body, media_type="application/json")
 
 
 @router.post("/cart/items")
-def add_to_cart(
+async def add_to_cart(
     request: AddToCartRequest,
     session_id: Optional[str] = Header(None, alias="X-Session-ID"),
     current_user: Optional[User] = Depends(get_current_user_optional)
@@ -57,8 +77,8 @@ def add_to_cart(
             detail="Either authentication or session ID required"
         )
     
-    cart = cart_service.get_or_create_cart(user_id=user_id, session_id=session_id)
-    cart_item = cart_service.add_item(
+    cart = await cart_service.get_or_create_cart(user_id=user_id, session_id=session_id)
+    cart_item = await cart_service.add_item(
         cart_id=cart.id,
         product_id=request.product_id,
         quantity=request.quantity
@@ -67,12 +87,12 @@ def add_to_cart(
     return {
         "message": "Item added to cart",
         "cart_item_id": cart_item.id,
-        "cart_summary": cart_service.get_cart_summary(cart.id)
+        "cart_summary": await cart_service.get_cart_summary(cart.id)
     }
 
 
 @router.put("/cart/items/{product_id}")
-def update_cart_item(
+async def update_cart_item(
     product_id: int,
     request: UpdateCartItemRequest,
     session_id: Optional[str] = Header(None, alias="X-Session-ID"),
@@ -87,23 +107,23 @@ def update_cart_item(
             detail="Either authentication or session ID required"
         )
     
-    cart = cart_service.get_or_create_cart(user_id=user_id, session_id=session_id)
+    cart = await cart_service.get_or_create_cart(user_id=user_id, session_id=session_id)
     
     if request.quantity <= 0:
-        cart_service.remove_item(cart.id, product_id)
+        await cart_service.remove_item(cart.id, product_id)
         message = "Item removed from cart"
     else:
-        cart_service.update_item_quantity(cart.id, product_id, request.quantity)
+        await cart_service.update_item_quantity(cart.id, product_id, request.quantity)
         message = "Cart item updated"
     
     return {
         "message": message,
-        "cart_summary": cart_service.get_cart_summary(cart.id)
+        "cart_summary": await cart_service.get_cart_summary(cart.id)
     }
 
 
 @router.delete("/cart/items/{product_id}")
-def remove_from_cart(
+async def remove_from_cart(
     product_id: int,
     session_id: Optional[str] = Header(None, alias="X-Session-ID"),
     current_user: Optional[User] = Depends(get_current_user_optional)
@@ -117,20 +137,20 @@ def remove_from_cart(
             detail="Either authentication or session ID required"
         )
     
-    cart = cart_service.get_or_create_cart(user_id=user_id, session_id=session_id)
-    removed = cart_service.remove_item(cart.id, product_id)
+    cart = await cart_service.get_or_create_cart(user_id=user_id, session_id=session_id)
+    removed = await cart_service.remove_item(cart.id, product_id)
     
     if not removed:
         raise HTTPException(status_code=404, detail="Item not found in cart")
     
     return {
         "message": "Item removed from cart",
-        "cart_summary": cart_service.get_cart_summary(cart.id)
+        "cart_summary": await cart_service.get_cart_summary(cart.id)
     }
 
 
 @router.delete("/cart")
-def clear_cart(
+async def clear_cart(
     session_id: Optional[str] = Header(None, alias="X-Session-ID"),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
@@ -143,17 +163,17 @@ def clear_cart(
             detail="Either authentication or session ID required"
         )
     
-    cart = cart_service.get_or_create_cart(user_id=user_id, session_id=session_id)
-    cart_service.clear_cart(cart.id)
+    cart = await cart_service.get_or_create_cart(user_id=user_id, session_id=session_id)
+    await cart_service.clear_cart(cart.id)
     
     return {
         "message": "Cart cleared",
-        "cart_summary": cart_service.get_cart_summary(cart.id)
+        "cart_summary": await cart_service.get_cart_summary(cart.id)
     }
 
 
 @router.get("/cart/validate")
-def validate_cart(
+async def validate_cart(
     session_id: Optional[str] = Header(None, alias="X-Session-ID"),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
@@ -166,18 +186,18 @@ def validate_cart(
             detail="Either authentication or session ID required"
         )
     
-    cart = cart_service.get_or_create_cart(user_id=user_id, session_id=session_id)
-    validation_result = cart_service.validate_cart_items(cart.id)
+    cart = await cart_service.get_or_create_cart(user_id=user_id, session_id=session_id)
+    validation_result = await cart_service.validate_cart_items(cart.id)
     
     return {
         "cart_id": cart.id,
         "validation": validation_result,
-        "cart_summary": cart_service.get_cart_summary(cart.id)
+        "cart_summary": await cart_service.get_cart_summary(cart.id)
     }
 
 
 @router.post("/cart/merge")
-def merge_carts(
+async def merge_carts(
     source_session_id: str,
     current_user: User = Depends(get_current_user_optional)
 ):
@@ -186,15 +206,15 @@ def merge_carts(
         raise HTTPException(status_code=401, detail="Authentication required")
     
     # Get user cart
-    user_cart = cart_service.get_or_create_cart(user_id=current_user.id)
+    user_cart = await cart_service.get_or_create_cart(user_id=current_user.id)
     
     # Get anonymous cart
-    anonymous_cart = cart_service.get_or_create_cart(session_id=source_session_id)
+    anonymous_cart = await cart_service.get_or_create_cart(session_id=source_session_id)
     
     # Merge carts
-    cart_service.merge_carts(user_cart.id, anonymous_cart.id)
+    await cart_service.merge_carts(user_cart.id, anonymous_cart.id)
     
     return {
         "message": "Carts merged successfully",
-        "cart_summary": cart_service.get_cart_summary(user_cart.id)
+        "cart_summary": await cart_service.get_cart_summary(user_cart.id)
     }
\ No newline at end of file
@@ -3,6 +3,7 @@ from typing import List, Optional, Dict, Any
 
 import stripe
 from fastapi import APIRouter, HTTPException, Request, Header, Depends
+from fastapi.concurrency import run_in_threadpool
 import jwt
 from pydantic import BaseModel
 from sqlmodel import Session, select
@@ -140,31 +141,28 @@ def create_checkout_session(payload: CreateCheckoutPayload, authorization: Optio
 
 
 @router.post("/validate_checkout")
-def validate_checkout(
+async def validate_checkout(
     request: ValidateCheckoutRequest,
     current_user: User = Depends(get_current_user)
 ):
     """Validate checkout data before creating payment session."""
     
     # Validate user eligibility
-    user_validation = checkout_validator.validate_user_eligibility(current_user.id)
+    user_validation = await run_in_threadpool(checkout_validator.validate_user_eligibility, current_user.id)
     if not user_validation["valid"]:
         raise HTTPException(status_code=400, detail=user_validation["message"])
     
-    # Validate inventory
-    inventory_validation = checkout_validator.validate_inventory(request.cart_id)
-    if not inventory_validation["valid"]:
-        raise HTTPException(status_code=400, detail=inventory_validation)
-    
-    # Validate pricing
-    pricing_validation = checkout_validator.validate_pricing(request.cart_id)
+    # Validate inventory and pricing in one pass over the cart
+    pricing_validation = await run_in_threadpool(
+        checkout_validator.validate_inventory_and_pricing, request.cart_id
+    )
     if not pricing_validation["valid"]:
         raise HTTPException(status_code=400, detail=pricing_validation)
     
     response = {
         "valid": True,
         "pricing": pricing_validation["pricing"],
-        "cart_summary": cart_service.get_cart_summary(request.cart_id)
+        "cart_summary": await cart_service.get_cart_summary(request.cart_id)
     }
     
     # Validate shipping address if provided
@@ -179,14 +177,14 @@ def validate_checkout(
 
 
 @router.post("/checkout_session_v2")
-def create_checkout_session_v2(
+async def create_checkout_session_v2(
     request: CreateCheckoutSessionRequest,
     current_user: User = Depends(get_current_user)
 ):
     """Create checkout session with comprehensive validation."""
     
     # Create checkout session with validation
-    session_result = checkout_validator.create_checkout_session(
+    session_result = await checkout_validator.create_checkout_session(
         user_id=current_user.id,
         cart_id=request.cart_id,
         shipping_address=request.shipping_address
@@ -198,11 +196,23 @@ def create_checkout_session_v2(
     checkout_session_data = session_result["checkout_session"]
     
     # Get cart items for Stripe
-    cart_items = cart_service.get_cart_items(request.cart_id)
+    cart_items = await cart_service.get_cart_items(request.cart_id)
     
     if not cart_items:
         raise HTTPException(status_code=400, detail="Cart is empty")
     
+    return await run_in_threadpool(
+        _create_order_and_stripe_session, request, current_user, checkout_session_data, cart_items
+    )
+
+
+def _create_order_and_stripe_session(
+    request: CreateCheckoutSessionRequest,
+    current_user: User,
+    checkout_session_data: Dict[str, Any],
+    cart_items: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Persist the order and open the Stripe session (blocking I/O, run off the event loop)."""
     # Create Stripe line items
     line_items = []
     for item in cart_items:
@@ -296,12 +306,12 @@ def create_checkout_session_v2(
 
 
 @router.get("/checkout_session/{session_id}")
-def get_checkout_session(
+async def get_checkout_session(
     session_id: str,
     current_user: User = Depends(get_current_user)
 ):
     """Get checkout session data."""
-    session_data = checkout_validator.get_checkout_session(session_id)
+    session_data = await checkout_validator.get_checkout_session(session_id)
     
     if not session_data:
         raise HTTPException(status_code=404, detail="Checkout session not found or expired")
@@ -314,12 +324,12 @@ def get_checkout_session(
 
 
 @router.post("/checkout_session/{session_id}/validate")
-def validate_checkout_session(
+async def validate_checkout_session(
     session_id: str,
     current_user: User = Depends(get_current_user)
 ):
     """Re-validate checkout session before payment."""
-    session_data = checkout_validator.get_checkout_session(session_id)
+    session_data = await checkout_validator.get_checkout_session(session_id)
     
     if not session_data:
         raise HTTPException(status_code=404, detail="Checkout session not found or expired")
@@ -329,7 +339,7 @@ def validate_checkout_session(
         raise HTTPException(status_code=403, detail="Access denied")
     
     # Re-validate session
-    validation_result = checkout_validator.validate_checkout_session(session_id)
+    validation_result = await checkout_validator.validate_checkout_session(session_id, session_data)
     
     if not validation_result["valid"]:
         raise HTTPException(status_code=400, detail=validation_result)
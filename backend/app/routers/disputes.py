@@ -4,7 +4,7 @@ Dispute resolution API endpoints.
 
 from typing import List, Optional, Dict, Any
 
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Query
 from pydantic import BaseModel, Field
 
 from ..models import User, DisputeStatus, DisputeType
@@ -47,6 +47,7 @@ class AdminDisputeMessageRequest(BaseModel):
 @router.post("/disputes")
 def create_dispute(
     request: CreateDisputeRequest,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user)
 ):
     """Create a new dispute for an order."""
@@ -58,7 +59,8 @@ def create_dispute(
             dispute_type=request.dispute_type,
             subject=request.subject,
             description=request.description,
-            evidence_urls=request.evidence_urls
+            evidence_urls=request.evidence_urls,
+            background_tasks=background_tasks
         )
         return result
     except HTTPException:
@@ -98,7 +100,8 @@ def get_dispute_details(
     try:
         result = dispute_service.get_dispute_details(
             dispute_id=dispute_id,
-            user_id=current_user.id
+            user_id=current_user.id,
+            user_role=current_user.role
         )
         return result
     except HTTPException:
@@ -111,6 +114,7 @@ def get_dispute_details(
 def add_dispute_message(
     dispute_id: int,
     request: AddDisputeMessageRequest,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user)
 ):
     """Add a message to a dispute."""
@@ -120,7 +124,9 @@ def add_dispute_message(
             dispute_id=dispute_id,
             sender_id=current_user.id,
             message=request.message,
-            attachments=request.attachments
+            attachments=request.attachments,
+            background_tasks=background_tasks,
+            sender_role=current_user.role
         )
         return result
     except HTTPException:
@@ -150,7 +156,8 @@ def get_admin_disputes(
             status_filter=status,
             priority_filter=priority,
             limit=limit,
-            offset=offset
+            offset=offset,
+            admin_role=current_user.role
         )
         return result
     except HTTPException:
@@ -163,6 +170,7 @@ def get_admin_disputes(
 def update_dispute_status(
     dispute_id: int,
     request: UpdateDisputeStatusRequest,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user)
 ):
     """Update dispute status (admin only)."""
@@ -176,7 +184,9 @@ def update_dispute_status(
             dispute_id=dispute_id,
             new_status=request.status,
             admin_id=current_user.id,
-            resolution=request.resolution
+            resolution=request.resolution,
+            background_tasks=background_tasks,
+            admin_role=current_user.role
         )
         return result
     except HTTPException:
@@ -189,6 +199,7 @@ def update_dispute_status(
 def add_admin_dispute_message(
     dispute_id: int,
     request: AdminDisputeMessageRequest,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user)
 ):
     """Add an admin message to a dispute (can be internal)."""
@@ -203,7 +214,9 @@ def add_admin_dispute_message(
             sender_id=current_user.id,
             message=request.message,
             is_internal=request.is_internal,
-            attachments=request.attachments
+            attachments=request.attachments,
+            background_tasks=background_tasks,
+            sender_role=current_user.role
         )
         return result
     except HTTPException:
@@ -214,6 +227,7 @@ def add_admin_dispute_message(
 
 @router.post("/admin/disputes/auto-escalate")
 def auto_escalate_disputes(
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user)
 ):
     """Manually trigger auto-escalation of disputes (admin only)."""
@@ -223,7 +237,7 @@ def auto_escalate_disputes(
         raise HTTPException(status_code=403, detail="Admin access required")
     
     try:
-        result = dispute_service.auto_escalate_disputes()
+        result = dispute_service.auto_escalate_disputes(background_tasks=background_tasks)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to auto-escalate disputes: {str(e)}")
@@ -5,7 +5,7 @@ from sqlmodel import Session, select
 
 from ..database import engine
 from ..models import Farmer, User
-from ..deps import get_current_user
+from ..deps import get_current_user, invalidate_cached_user
 
 
 router = APIRouter()
@@ -65,6 +65,7 @@ def create_my_farmer_profile(
             db_user.role = "FARMER"
             session.add(db_user)
             session.commit()
+            invalidate_cached_user(db_user.id)
 
         return farmer
 
@@ -101,6 +102,7 @@ def register_farmer(
             db_user.role = "FARMER"
             session.add(db_user)
             session.commit()
+            invalidate_cached_user(db_user.id)
 
         return farmer
 
@@ -4,11 +4,13 @@ import uuid
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, select
 
 from ..database import engine
 from ..models import Product, Farmer, User
 from ..deps import get_current_user
+from ..services.cart_service import invalidate_cached_product
 
 
 router = APIRouter()
@@ -92,11 +94,17 @@ def get_product(product_id: int) -> Product:
 
 
 @router.put("/products/{product_id}", response_model=Product)
-def update_product(
+async def update_product(
     product_id: int,
     product_update: Product,
     current_user: User = Depends(get_current_user),
 ) -> Product:
+    product = await run_in_threadpool(_update_product, product_id, product_update, current_user)
+    await invalidate_cached_product(product_id)
+    return product
+
+
+def _update_product(product_id: int, product_update: Product, current_user: User) -> Product:
     with Session(engine) as session:
         product = session.get(Product, product_id)
         if not product:
@@ -122,11 +130,17 @@ def update_product(
 
 
 @router.patch("/products/{product_id}/status")
-def update_product_status(
+async def update_product_status(
     product_id: int,
     status: str,
     current_user: User = Depends(get_current_user),
 ):
+    result = await run_in_threadpool(_update_product_status, product_id, status, current_user)
+    await invalidate_cached_product(product_id)
+    return result
+
+
+def _update_product_status(product_id: int, status: str, current_user: User):
     with Session(engine) as session:
         product = session.get(Product, product_id)
         if not product:
@@ -153,10 +167,16 @@ def update_product_status(
 
 
 @router.delete("/products/{product_id}")
-def delete_product(
+async def delete_product(
     product_id: int,
     current_user: User = Depends(get_current_user),
 ):
+    result = await run_in_threadpool(_delete_product, product_id, current_user)
+    await invalidate_cached_product(product_id)
+    return result
+
+
+def _delete_product(product_id: int, current_user: User):
     with Session(engine) as session:
         product = session.get(Product, product_id)
         if not product:
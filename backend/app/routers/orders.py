@@ -2,20 +2,40 @@
 Order management API endpoints.
 """
 
+import json
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
 from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 
-from ..models import User, OrderStatus, PaymentStatus
+from ..models import User, UserRole, OrderStatus, PaymentStatus
 from ..deps import get_current_user
 from ..services.order_service import OrderService
+from ..services.redis_service import redis_service
 
 
 router = APIRouter()
 order_service = OrderService()
 
+# Role sets for permission checks; UserRole is a str enum so membership is a hash lookup
+FARMER_ADMIN_ROLES = frozenset({UserRole.ADMIN, UserRole.FARMER})
+
+# Read-mostly buyer endpoints are fronted by short-lived Redis entries
+TRACKING_CACHE_TTL = 30
+REVIEWS_CACHE_TTL = 300
+
+
+def _tracking_cache_key(order_id: int) -> str:
+    # One hash per order with a field per viewer, so invalidation is a single DEL
+    return f"tracking:{order_id}"
+
+
+async def _invalidate_tracking_cache(*order_ids: int) -> None:
+    """Drop cached tracking payloads for every user that viewed the orders."""
+    await redis_service.delete(*(_tracking_cache_key(order_id) for order_id in order_ids))
+
 
 class OrderStatusUpdateRequest(BaseModel):
     """Request model for updating order status."""
@@ -79,6 +99,34 @@ def get_my_orders(
         raise HTTPException(status_code=500, detail=f"Failed to retrieve orders: {str(e)}")
 
 
+# Declared before /orders/{order_id} so the literal path is not shadowed
+@router.get("/orders/search")
+def search_orders(
+    q: Optional[str] = Query(None, description="Search query for product names"),
+    status: Optional[List[OrderStatus]] = Query(None, description="Filter by order status"),
+    date_from: Optional[datetime] = Query(None, description="Filter orders from this date"),
+    date_to: Optional[datetime] = Query(None, description="Filter orders to this date"),
+    limit: int = Query(20, ge=1, le=100, description="Number of orders to return"),
+    offset: int = Query(0, ge=0, description="Number of orders to skip"),
+    current_user: User = Depends(get_current_user)
+):
+    """Search and filter user orders."""
+    
+    try:
+        results = order_service.search_user_orders(
+            user_id=current_user.id,
+            search_query=q,
+            status_filter=status,
+            date_from=date_from,
+            date_to=date_to,
+            limit=limit,
+            offset=offset
+        )
+        return results
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to search orders: {str(e)}")
+
+
 @router.get("/orders/{order_id}")
 def get_order_details(
     order_id: int,
@@ -96,7 +144,7 @@ def get_order_details(
 
 
 @router.put("/orders/{order_id}/status")
-def update_order_status(
+async def update_order_status(
     order_id: int,
     request: OrderStatusUpdateRequest,
     current_user: User = Depends(get_current_user)
@@ -104,17 +152,19 @@ def update_order_status(
     """Update order status (admin or farmer only)."""
     
     # Check permissions - only admin or farmers can update order status
-    if current_user.role.value not in ["admin", "farmer"]:
+    if current_user.role not in FARMER_ADMIN_ROLES:
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     try:
-        updated_order = order_service.update_order_status(
+        updated_order = await run_in_threadpool(
+            order_service.update_order_status,
             order_id=order_id,
             new_status=request.status,
             user_id=current_user.id,
             notes=request.notes,
             metadata=request.metadata
         )
+        await _invalidate_tracking_cache(order_id)
         
         return {
             "id": updated_order.id,
@@ -129,7 +179,7 @@ def update_order_status(
 
 
 @router.put("/orders/{order_id}/tracking")
-def update_tracking_info(
+async def update_tracking_info(
     order_id: int,
     request: TrackingUpdateRequest,
     current_user: User = Depends(get_current_user)
@@ -137,16 +187,18 @@ def update_tracking_info(
     """Update order tracking information (admin or farmer only)."""
     
     # Check permissions
-    if current_user.role.value not in ["admin", "farmer"]:
+    if current_user.role not in FARMER_ADMIN_ROLES:
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     try:
-        updated_order = order_service.update_tracking_number(
+        updated_order = await run_in_threadpool(
+            order_service.update_tracking_number,
             order_id=order_id,
             tracking_number=request.tracking_number,
             user_id=current_user.id,
             estimated_delivery_date=request.estimated_delivery_date
         )
+        await _invalidate_tracking_cache(order_id)
         
         return {
             "id": updated_order.id,
@@ -163,7 +215,7 @@ def update_tracking_info(
 
 
 @router.post("/orders/{order_id}/cancel")
-def cancel_order(
+async def cancel_order(
     order_id: int,
     request: OrderCancellationRequest,
     current_user: User = Depends(get_current_user)
@@ -171,12 +223,14 @@ def cancel_order(
     """Cancel an order."""
     
     try:
-        cancelled_order = order_service.cancel_order(
+        cancelled_order = await run_in_threadpool(
+            order_service.cancel_order,
             order_id=order_id,
             user_id=current_user.id,
             reason=request.reason,
             refund_amount=request.refund_amount
         )
+        await _invalidate_tracking_cache(order_id)
         
         return {
             "id": cancelled_order.id,
@@ -212,14 +266,24 @@ def get_order_status_history(
 
 # Buyer-specific endpoints
 @router.get("/orders/{order_id}/tracking")
-def get_order_tracking(
+async def get_order_tracking(
     order_id: int,
     current_user: User = Depends(get_current_user)
 ):
     """Get detailed tracking information for an order."""
     
+    # Field per user since the payload is only served after an access check
+    cache_key = _tracking_cache_key(order_id)
+    cached = await redis_service.hget(cache_key, str(current_user.id))
+    if cached:
+        return json.loads(cached)
+    
     try:
-        tracking_info = order_service.get_order_tracking_info(order_id, current_user.id)
+        tracking_info = await run_in_threadpool(
+            order_service.get_order_tracking_info, order_id, current_user.id
+        )
+        await redis_service.hset(cache_key, {str(current_user.id): json.dumps(tracking_info)})
+        await redis_service.expire(cache_key, TRACKING_CACHE_TTL)
         return tracking_info
     except HTTPException:
         raise
@@ -228,7 +292,7 @@ def get_order_tracking(
 
 
 @router.put("/orders/{order_id}/shipping-address")
-def update_shipping_address(
+async def update_shipping_address(
     order_id: int,
     request: ShippingAddressUpdateRequest,
     current_user: User = Depends(get_current_user)
@@ -236,11 +300,13 @@ def update_shipping_address(
     """Update shipping address for a pending order."""
     
     try:
-        result = order_service.modify_order_shipping_address(
+        result = await run_in_threadpool(
+            order_service.modify_order_shipping_address,
             order_id=order_id,
             user_id=current_user.id,
             new_address=request.dict()
         )
+        await _invalidate_tracking_cache(order_id)
         return result
     except HTTPException:
         raise
@@ -249,7 +315,7 @@ def update_shipping_address(
 
 
 @router.post("/orders/{order_id}/request-cancellation")
-def request_order_cancellation(
+async def request_order_cancellation(
     order_id: int,
     request: OrderCancellationRequest,
     current_user: User = Depends(get_current_user)
@@ -257,11 +323,13 @@ def request_order_cancellation(
     """Request order cancellation."""
     
     try:
-        result = order_service.request_order_cancellation(
+        result = await run_in_threadpool(
+            order_service.request_order_cancellation,
             order_id=order_id,
             user_id=current_user.id,
             reason=request.reason
         )
+        await _invalidate_tracking_cache(order_id)
         return result
     except HTTPException:
         raise
@@ -269,35 +337,8 @@ def request_order_cancellation(
         raise HTTPException(status_code=500, detail=f"Failed to request cancellation: {str(e)}")
 
 
-@router.get("/orders/search")
-def search_orders(
-    q: Optional[str] = Query(None, description="Search query for product names"),
-    status: Optional[List[OrderStatus]] = Query(None, description="Filter by order status"),
-    date_from: Optional[datetime] = Query(None, description="Filter orders from this date"),
-    date_to: Optional[datetime] = Query(None, description="Filter orders to this date"),
-    limit: int = Query(20, ge=1, le=100, description="Number of orders to return"),
-    offset: int = Query(0, ge=0, description="Number of orders to skip"),
-    current_user: User = Depends(get_current_user)
-):
-    """Search and filter user orders."""
-    
-    try:
-        results = order_service.search_user_orders(
-            user_id=current_user.id,
-            search_query=q,
-            status_filter=status,
-            date_from=date_from,
-            date_to=date_to,
-            limit=limit,
-            offset=offset
-        )
-        return results
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to search orders: {str(e)}")
-
-
 @router.post("/orders/{order_id}/review")
-def create_order_review(
+async def create_order_review(
     order_id: int,
     request: OrderReviewRequest,
     current_user: User = Depends(get_current_user)
@@ -305,13 +346,15 @@ def create_order_review(
     """Create a review for a completed order."""
     
     try:
-        result = order_service.create_order_review(
+        result = await run_in_threadpool(
+            order_service.create_order_review,
             order_id=order_id,
             user_id=current_user.id,
             rating=request.rating,
             review_text=request.review_text,
             is_anonymous=request.is_anonymous
         )
+        await redis_service.delete_pattern(f"reviews:{order_id}:*")
         return result
     except HTTPException:
         raise
@@ -320,19 +363,26 @@ def create_order_review(
 
 
 @router.get("/orders/{order_id}/reviews")
-def get_order_reviews(
+async def get_order_reviews(
     order_id: int,
     limit: int = Query(10, ge=1, le=50, description="Number of reviews to return"),
     offset: int = Query(0, ge=0, description="Number of reviews to skip")
 ):
     """Get reviews for an order (public endpoint)."""
     
+    cache_key = f"reviews:{order_id}:{limit}:{offset}"
+    cached = await redis_service.get(cache_key)
+    if cached:
+        return json.loads(cached)
+    
     try:
-        reviews = order_service.get_order_reviews(
+        reviews = await run_in_threadpool(
+            order_service.get_order_reviews,
             order_id=order_id,
             limit=limit,
             offset=offset
         )
+        await redis_service.set(cache_key, json.dumps(reviews), expire=REVIEWS_CACHE_TTL)
         return reviews
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve reviews: {str(e)}")
@@ -349,7 +399,7 @@ def get_farmer_orders(
     """Get orders containing products from the current farmer."""
     
     # Check if user is a farmer
-    if current_user.role.value != "farmer":
+    if current_user.role != UserRole.FARMER:
         raise HTTPException(status_code=403, detail="Only farmers can access this endpoint")
     
     try:
@@ -389,7 +439,7 @@ class ShippingLabelRequest(BaseModel):
 
 
 @router.put("/farmer/orders/items/{item_id}/fulfillment")
-def update_item_fulfillment(
+async def update_item_fulfillment(
     item_id: int,
     request: ItemFulfillmentUpdateRequest,
     current_user: User = Depends(get_current_user)
@@ -397,16 +447,18 @@ def update_item_fulfillment(
     """Update fulfillment status for a specific order item."""
     
     # Check if user is a farmer
-    if current_user.role.value != "farmer":
+    if current_user.role != UserRole.FARMER:
         raise HTTPException(status_code=403, detail="Only farmers can access this endpoint")
     
     try:
-        result = order_service.update_item_fulfillment_status(
+        result = await run_in_threadpool(
+            order_service.update_item_fulfillment_status,
             order_item_id=item_id,
             farmer_id=current_user.id,
             fulfillment_status=request.fulfillment_status,
             notes=request.notes
         )
+        await _invalidate_tracking_cache(result["order_id"])
         return result
     except HTTPException:
         raise
@@ -415,23 +467,25 @@ def update_item_fulfillment(
 
 
 @router.put("/farmer/orders/bulk-update")
-def bulk_update_orders(
+async def bulk_update_orders(
     request: BulkOrderUpdateRequest,
     current_user: User = Depends(get_current_user)
 ):
     """Bulk update status for multiple orders."""
     
     # Check if user is a farmer
-    if current_user.role.value != "farmer":
+    if current_user.role != UserRole.FARMER:
         raise HTTPException(status_code=403, detail="Only farmers can access this endpoint")
     
     try:
-        result = order_service.bulk_update_order_status(
+        result = await run_in_threadpool(
+            order_service.bulk_update_order_status,
             order_ids=request.order_ids,
             new_status=request.status,
             farmer_id=current_user.id,
             notes=request.notes
         )
+        await _invalidate_tracking_cache(*request.order_ids)
         return result
     except HTTPException:
         raise
@@ -448,7 +502,7 @@ def get_farmer_analytics(
     """Get order analytics for the current farmer."""
     
     # Check if user is a farmer
-    if current_user.role.value != "farmer":
+    if current_user.role != UserRole.FARMER:
         raise HTTPException(status_code=403, detail="Only farmers can access this endpoint")
     
     try:
@@ -463,7 +517,7 @@ def get_farmer_analytics(
 
 
 @router.post("/farmer/orders/{order_id}/shipping-label")
-def generate_shipping_label(
+async def generate_shipping_label(
     order_id: int,
     request: ShippingLabelRequest,
     current_user: User = Depends(get_current_user)
@@ -471,15 +525,17 @@ def generate_shipping_label(
     """Generate shipping label for an order."""
     
     # Check if user is a farmer
-    if current_user.role.value != "farmer":
+    if current_user.role != UserRole.FARMER:
         raise HTTPException(status_code=403, detail="Only farmers can access this endpoint")
     
     try:
-        result = order_service.generate_shipping_label(
+        result = await run_in_threadpool(
+            order_service.generate_shipping_label,
             order_id=order_id,
             farmer_id=current_user.id,
             shipping_service=request.shipping_service
         )
+        await _invalidate_tracking_cache(order_id)
         return result
     except HTTPException:
         raise
@@ -499,7 +555,7 @@ def get_all_orders(
     """Get all orders (admin only)."""
     
     # Check if user is admin
-    if current_user.role.value != "admin":
+    if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Admin access required")
     
     # This would need to be implemented in the order service
@@ -522,7 +578,7 @@ def get_order_analytics(
     """Get order analytics (admin only)."""
     
     # Check if user is admin
-    if current_user.role.value != "admin":
+    if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Admin access required")
     
     # This would need to be implemented in the order service
@@ -538,7 +594,7 @@ def get_order_analytics(
 
 
 @router.put("/admin/orders/{order_id}/payment-status")
-def update_payment_status(
+async def update_payment_status(
     order_id: int,
     payment_status: PaymentStatus,
     payment_intent_id: Optional[str] = None,
@@ -547,15 +603,17 @@ def update_payment_status(
     """Update payment status (admin only)."""
     
     # Check if user is admin
-    if current_user.role.value != "admin":
+    if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Admin access required")
     
     try:
-        updated_order = order_service.update_payment_status(
+        updated_order = await run_in_threadpool(
+            order_service.update_payment_status,
             order_id=order_id,
             payment_status=payment_status,
             payment_intent_id=payment_intent_id
         )
+        await _invalidate_tracking_cache(order_id)
         
         return {
             "id": updated_order.id,
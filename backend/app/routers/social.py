@@ -1,6 +1,6 @@
 """Social features API endpoints."""
 from typing import List
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from pydantic import BaseModel
 from sqlmodel import Session, select
 
@@ -111,7 +111,7 @@ def like_post(
     return {"message": "Post liked"}
 
 
-@router.delete("/posts/{post_id}/like")
+@router.delete("/posts/{post_id}/like", status_code=204)
 def unlike_post(
     post_id: int,
     user_id: int = 1,  # TODO: Get from auth
@@ -132,4 +132,4 @@ def unlike_post(
     
     session.delete(like)
     session.commit()
-    return {"message": "Post unliked"}
+    return Response(status_code=204)
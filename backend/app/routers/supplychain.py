@@ -1,8 +1,8 @@
 from typing import List
 from datetime import datetime
 
-from fastapi import APIRouter, HTTPException
-from sqlmodel import Session, select
+from fastapi import APIRouter, HTTPException, Response
+from sqlmodel import Session, select, update, func
 from pydantic import BaseModel
 
 from ..database import engine
@@ -68,22 +68,28 @@ def delete_asset(asset_id: int):
             raise HTTPException(status_code=404, detail="Asset not found")
         session.delete(asset)
         session.commit()
-        return
+        return Response(status_code=204)
 
 
 @router.post("/assets/{asset_id}/track", status_code=201)
 def add_tracking_event(asset_id: int, event: TrackingEvent):
     """Add a tracking event to update asset location."""
+    values = {"current_location": event.location}
+    if event.notes:
+        # Append in SQL so concurrent events cannot overwrite each other's notes
+        suffix = f"\n[{datetime.utcnow().isoformat()}] {event.status}: {event.notes}"
+        values["notes"] = func.coalesce(ProvenanceAsset.notes, "") + suffix
+    
+    stmt = (
+        update(ProvenanceAsset)
+        .where(ProvenanceAsset.id == asset_id)
+        .values(**values)
+        .returning(ProvenanceAsset.id)
+    )
     with Session(engine) as session:
-        asset = session.get(ProvenanceAsset, asset_id)
-        if not asset:
+        updated_id = session.exec(stmt).scalar_one_or_none()
+        if updated_id is None:
             raise HTTPException(status_code=404, detail="Asset not found")
-        
-        asset.current_location = event.location
-        if event.notes:
-            asset.notes = f"{asset.notes or ''}\n[{datetime.utcnow().isoformat()}] {event.status}: {event.notes}"
-        
-        session.add(asset)
         session.commit()
         return {"message": "Tracking event added"}
 
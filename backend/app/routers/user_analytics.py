@@ -3,21 +3,46 @@ User-specific analytics router for personalized insights.
 Provides buyer and farmer specific analytics and recommendations.
 """
 
+import asyncio
+import json
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
+from sqlalchemy import DateTime, text
+from sqlmodel import Session, select, func
 
+from ..database import engine
 from ..deps import get_current_user
-from ..models import User, UserRole
+from ..models import (
+    User, UserRole, Order, OrderItem, Product, PaymentStatus, ProductStatus
+)
 from ..services.metrics_service import MetricsCollector
 from ..services.redis_service import redis_service
 from ..services.order_service import OrderService
-from ..services.product_service import ProductService
 
 router = APIRouter()
 order_service = OrderService()
-product_service = ProductService()
+
+# Dashboards poll these endpoints; a short TTL bounds staleness after new orders
+ANALYTICS_CACHE_TTL = 120
+# Rows fetched per round-trip when streaming buyer purchase history
+HISTORY_BATCH_SIZE = 500
+
+
+async def _cached(key: str, ttl: int, coro_factory: Callable[[], Awaitable[Any]]) -> Response:
+    """Return the cached JSON body for key, computing and storing it on a miss.
+    
+    The body is sent as-is, so hits skip decoding and re-serialization.
+    """
+    body = await redis_service.get(key)
+    if not body:
+        body = json.dumps(jsonable_encoder(await coro_factory()))
+        await redis_service.set(key, body, expire=ttl)
+    
+    return Response(content=body, media_type="application/json")
 
 
 class BuyerAnalyticsResponse(BaseModel):
@@ -46,11 +71,12 @@ class FarmerAnalyticsResponse(BaseModel):
 async def get_buyer_analytics(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
+    include_history: bool = Query(True, description="Include per-order purchase history"),
     current_user: User = Depends(get_current_user)
 ):
     """Get comprehensive buyer analytics for the current user."""
     
-    if current_user.role.value != "buyer":
+    if current_user.role != UserRole.BUYER:
         raise HTTPException(status_code=403, detail="Only buyers can access this endpoint")
     
     try:
@@ -59,23 +85,26 @@ async def get_buyer_analytics(
         if not end_date:
             end_date = datetime.utcnow()
             
-        # Get buyer-specific analytics
-        analytics = await _calculate_buyer_analytics(
-            current_user.id, start_date, end_date
-        )
-        
-        # Get personalized recommendations
-        recommendations = await _get_buyer_recommendations(current_user.id)
+        async def build() -> Dict[str, Any]:
+            # Get buyer-specific analytics
+            analytics = await run_in_threadpool(
+                _calculate_buyer_analytics,
+                current_user.id, start_date, end_date, include_history
+            )
+            
+            # Get personalized recommendations
+            recommendations = await run_in_threadpool(
+                _get_buyer_recommendations, current_user.id
+            )
+            
+            return {**analytics, "recommendations": recommendations}
         
-        return BuyerAnalyticsResponse(
-            total_spent=analytics["total_spent"],
-            total_orders=analytics["total_orders"],
-            average_order_value=analytics["average_order_value"],
-            favorite_categories=analytics["favorite_categories"],
-            purchase_history=analytics["purchase_history"],
-            recommendations=recommendations,
-            spending_trends=analytics["spending_trends"]
+        cache_key = (
+            f"analytics:buyer:{current_user.id}:{start_date.date()}:{end_date.date()}"
+            f":{int(include_history)}"
         )
+        # build() output matches BuyerAnalyticsResponse, which documents the schema
+        return await _cached(cache_key, ANALYTICS_CACHE_TTL, build)
         
     except Exception as e:
         raise HTTPException(
@@ -92,7 +121,7 @@ async def get_enhanced_farmer_analytics(
 ):
     """Get enhanced farmer analytics with customer insights."""
     
-    if current_user.role.value != "farmer":
+    if current_user.role != UserRole.FARMER:
         raise HTTPException(status_code=403, detail="Only farmers can access this endpoint")
     
     try:
@@ -101,19 +130,31 @@ async def get_enhanced_farmer_analytics(
         if not end_date:
             end_date = datetime.utcnow()
             
-        # Get basic farmer analytics
-        basic_analytics = order_service.get_farmer_order_analytics(
-            farmer_id=current_user.id,
-            start_date=start_date,
-            end_date=end_date
-        )
-        
-        # Enhance with customer insights
-        enhanced_analytics = await _enhance_farmer_analytics(
-            current_user.id, start_date, end_date, basic_analytics
-        )
+        async def build() -> Dict[str, Any]:
+            # The three queries are independent; each runs on its own pooled
+            # connection so the latency is the slowest rather than the sum
+            basic_analytics, customer_insights, monthly_revenue = await asyncio.gather(
+                run_in_threadpool(
+                    order_service.get_farmer_order_analytics,
+                    farmer_id=current_user.id,
+                    start_date=start_date,
+                    end_date=end_date
+                ),
+                run_in_threadpool(
+                    _get_farmer_customer_insights, current_user.id, start_date, end_date
+                ),
+                run_in_threadpool(
+                    _get_farmer_monthly_revenue, current_user.id, start_date, end_date
+                )
+            )
+            
+            # Enhance with customer insights
+            return _enhance_farmer_analytics(
+                basic_analytics, customer_insights, monthly_revenue
+            )
         
-        return enhanced_analytics
+        cache_key = f"analytics:farmer:{current_user.id}:{start_date.date()}:{end_date.date()}"
+        return await _cached(cache_key, ANALYTICS_CACHE_TTL, build)
         
     except Exception as e:
         raise HTTPException(
@@ -129,12 +170,19 @@ async def get_buyer_recommendations(
 ):
     """Get personalized product recommendations for buyers."""
     
-    if current_user.role.value != "buyer":
+    if current_user.role != UserRole.BUYER:
         raise HTTPException(status_code=403, detail="Only buyers can access this endpoint")
     
     try:
-        recommendations = await _get_buyer_recommendations(current_user.id, limit)
-        return {"recommendations": recommendations}
+        async def build() -> Dict[str, Any]:
+            recommendations = await run_in_threadpool(
+                _get_buyer_recommendations, current_user.id, limit
+            )
+            return {"recommendations": recommendations}
+        
+        return await _cached(
+            f"analytics:buyer_recommendations:{current_user.id}:{limit}", ANALYTICS_CACHE_TTL, build
+        )
         
     except Exception as e:
         raise HTTPException(
@@ -143,76 +191,98 @@ async def get_buyer_recommendations(
         )
 
 
-async def _calculate_buyer_analytics(
+def _calculate_buyer_analytics(
     user_id: int, 
     start_date: datetime, 
-    end_date: datetime
+    end_date: datetime,
+    include_history: bool = True
 ) -> Dict[str, Any]:
     """Calculate detailed buyer analytics."""
     
-    from ..models import Order, OrderItem, Product
-    from sqlmodel import select, func
-    from ..database import engine
+    paid_in_range = (
+        Order.buyer_id == user_id,
+        Order.created_at >= start_date,
+        Order.created_at <= end_date,
+        Order.payment_status == PaymentStatus.PAID
+    )
     
-    with engine.Session() as session:
-        # Get user's orders
-        orders_query = select(Order).where(
-            Order.buyer_id == user_id,
-            Order.created_at >= start_date,
-            Order.created_at <= end_date,
-            Order.payment_status.value == "paid"
-        )
-        orders = session.exec(orders_query).all()
-        
-        total_spent = sum(order.total_amount for order in orders)
-        total_orders = len(orders)
-        average_order_value = total_spent / total_orders if total_orders > 0 else 0
+    with Session(engine) as session:
+        # Totals come from a per-month aggregate so only a handful of rows cross the wire
+        month = func.date_trunc('month', Order.created_at, type_=DateTime).label('month')
+        monthly_query = select(
+            month,
+            func.sum(Order.total).label('spent'),
+            func.count(Order.id).label('order_count')
+        ).where(*paid_in_range).group_by(month).order_by(month)
         
-        # Get favorite categories
-        categories_query = select(
-            Product.category,
-            func.sum(OrderItem.quantity).label('total_quantity')
-        ).join(OrderItem).join(Order).where(
-            Order.buyer_id == user_id,
-            Order.created_at >= start_date,
-            Order.created_at <= end_date
-        ).group_by(Product.category)
+        monthly_rows = session.exec(monthly_query).all()
         
-        category_data = session.exec(categories_query).all()
-        favorite_categories = [cat.category for cat in category_data if cat.category]
+        monthly_spending = {
+            row.month.strftime("%Y-%m"): float(row.spent) for row in monthly_rows
+        }
+        total_spent = sum(monthly_spending.values())
+        total_orders = sum(row.order_count for row in monthly_rows)
+        average_order_value = total_spent / total_orders if total_orders > 0 else 0
         
-        # Get purchase history
-        purchase_history = []
-        for order in orders:
-            items = session.exec(
-                select(OrderItem).where(OrderItem.order_id == order.id)
-            ).all()
+        purchase_history: List[Dict[str, Any]] = []
+        if include_history:
+            # One joined query for every paid order line in range, bucketed by order
+            history_query = select(
+                Order.id,
+                Order.created_at,
+                Order.total,
+                OrderItem.quantity,
+                OrderItem.unit_price,
+                Product.name,
+            ).join(
+                OrderItem, OrderItem.order_id == Order.id
+            ).join(
+                Product, Product.id == OrderItem.product_id
+            ).where(*paid_in_range).order_by(
+                Order.created_at, Order.id
+            ).execution_options(yield_per=HISTORY_BATCH_SIZE)
             
-            purchase_history.append({
-                "order_id": order.id,
-                "date": order.created_at.isoformat(),
-                "total": float(order.total_amount),
-                "items": [
-                    {
-                        "product_name": item.product.name,
-                        "quantity": item.quantity,
-                        "price": float(item.price)
+            # yield_per streams rows from a server-side cursor in batches, so
+            # heavy buyers never materialize the full result set at once
+            purchases_by_order: Dict[int, Dict[str, Any]] = {}
+            for row in session.exec(history_query):
+                purchase = purchases_by_order.get(row.id)
+                if purchase is None:
+                    purchase = {
+                        "order_id": row.id,
+                        "date": row.created_at.isoformat(),
+                        "total": float(row.total),
+                        "items": []
                     }
-                    for item in items
-                ]
-            })
+                    purchases_by_order[row.id] = purchase
+                
+                purchase["items"].append({
+                    "product_name": row.name,
+                    "quantity": float(row.quantity),
+                    "price": float(row.unit_price)
+                })
+            
+            purchase_history = list(purchases_by_order.values())
+        
+        # Get the top five categories by quantity purchased
+        categories_query = select(Product.category).join(OrderItem).join(Order).where(
+            Order.buyer_id == user_id,
+            Order.created_at >= start_date,
+            Order.created_at <= end_date,
+            Product.category.is_not(None)
+        ).group_by(Product.category).order_by(
+            func.sum(OrderItem.quantity).desc()
+        ).limit(5)
         
-        # Calculate spending trends
-        monthly_spending = {}
-        for order in orders:
-            month_key = order.created_at.strftime("%Y-%m")
-            if month_key not in monthly_spending:
-                monthly_spending[month_key] = 0
-            monthly_spending[month_key] += float(order.total_amount)
+        favorite_categories = list(session.exec(categories_query).all())
         
+        # monthly_rows is ordered by month, so first/last are the period endpoints
+        increasing = (
+            len(monthly_rows) > 1 and monthly_rows[-1].spent > monthly_rows[0].spent
+        )
         spending_trends = {
             "monthly_spending": monthly_spending,
-            "trend": "increasing" if len(monthly_spending) > 1 and list(monthly_spending.values())[-1] > list(monthly_spending.values())[0] else "stable"
+            "trend": "increasing" if increasing else "stable"
         }
         
         return {
@@ -225,138 +295,182 @@ async def _calculate_buyer_analytics(
         }
 
 
-async def _get_buyer_recommendations(
+def _get_buyer_recommendations(
     user_id: int, 
     limit: int = 10
 ) -> List[Dict[str, Any]]:
     """Generate personalized product recommendations for buyers."""
     
-    from ..models import Order, OrderItem, Product
-    from sqlmodel import select
-    from ..database import engine
-    
-    with engine.Session() as session:
-        # Get user's purchase history
-        user_orders = session.exec(
-            select(Order).where(
+    with Session(engine) as session:
+        # Categories the buyer has paid for, in a single query
+        purchased_categories = session.exec(
+            select(Product.category).distinct().join(
+                OrderItem, OrderItem.product_id == Product.id
+            ).join(
+                Order, Order.id == OrderItem.order_id
+            ).where(
                 Order.buyer_id == user_id,
-                Order.payment_status.value == "paid"
+                Order.payment_status == PaymentStatus.PAID,
+                Product.category.is_not(None)
             )
         ).all()
         
-        # Get categories user has purchased from
-        purchased_categories = set()
-        for order in user_orders:
-            items = session.exec(
-                select(OrderItem).where(OrderItem.order_id == order.id)
-            ).all()
-            for item in items:
-                purchased_categories.add(item.product.category)
+        if not purchased_categories:
+            return []
         
-        # Get products from similar categories user hasn't purchased
-        recommendations = []
-        for category in purchased_categories:
-            products = session.exec(
-                select(Product).where(
-                    Product.category == category,
-                    Product.status.value == "active"
-                ).limit(limit // len(purchased_categories) + 1)
-            ).all()
-            
-            for product in products:
-                # Check if user hasn't already purchased this product
-                existing_purchase = session.exec(
-                    select(OrderItem).join(Order).where(
-                        Order.buyer_id == user_id,
-                        OrderItem.product_id == product.id
-                    )
-                ).first()
-                
-                if not existing_purchase:
-                    recommendations.append({
-                        "product_id": product.id,
-                        "name": product.name,
-                        "price": float(product.price),
-                        "category": product.category,
-                        "image_url": product.images[0].url if product.images else None,
-                        "reason": f"Based on your interest in {category}"
-                    })
+        # Active products in those categories the buyer has never ordered,
+        # ranked by popularity within each category
+        purchased_product_ids = select(OrderItem.product_id).join(
+            Order, Order.id == OrderItem.order_id
+        ).where(Order.buyer_id == user_id)
+        
+        popularity = select(
+            OrderItem.product_id,
+            func.count().label('order_lines')
+        ).group_by(OrderItem.product_id).subquery()
+        popularity_score = func.coalesce(popularity.c.order_lines, 0)
         
-        return recommendations[:limit]
+        ranked = select(
+            Product.id,
+            popularity_score.label('popularity'),
+            func.row_number().over(
+                partition_by=Product.category,
+                order_by=(popularity_score.desc(), Product.id)
+            ).label('rank')
+        ).outerjoin(
+            popularity, popularity.c.product_id == Product.id
+        ).where(
+            Product.category.in_(purchased_categories),
+            Product.status == ProductStatus.ACTIVE,
+            Product.id.not_in(purchased_product_ids)
+        ).subquery()
+        
+        # Ordering by per-category rank first interleaves the categories, so
+        # the limit fills with each category's best candidates in turn
+        products = session.exec(
+            select(Product).join(
+                ranked, ranked.c.id == Product.id
+            ).order_by(
+                ranked.c.rank, ranked.c.popularity.desc(), Product.id
+            ).limit(limit)
+        ).all()
+        
+        return [
+            {
+                "product_id": product.id,
+                "name": product.name,
+                "price": float(product.price),
+                "category": product.category,
+                "image_url": product.images[0] if product.images else None,
+                "reason": f"Based on your interest in {product.category}"
+            }
+            for product in products
+        ]
 
 
-async def _enhance_farmer_analytics(
+def _get_farmer_customer_insights(
     farmer_id: int,
     start_date: datetime,
-    end_date: datetime,
-    basic_analytics: Dict[str, Any]
+    end_date: datetime
 ) -> Dict[str, Any]:
-    """Enhance farmer analytics with customer insights."""
-    
-    from ..models import Order, OrderItem, User
-    from sqlmodel import select, func
-    from ..database import engine
+    """Summarize a farmer's paying customers for the period."""
     
-    with engine.Session() as session:
-        # Get customer insights
-        customer_query = select(
+    with Session(engine) as session:
+        # Per-customer totals; orders carry no farmer, so attribute spend
+        # through this farmer's order items
+        per_customer = select(
             Order.buyer_id,
-            func.count(Order.id).label('order_count'),
-            func.sum(Order.total_amount).label('total_spent')
+            func.count(func.distinct(Order.id)).label('order_count'),
+            func.sum(OrderItem.quantity * OrderItem.unit_price).label('total_spent')
+        ).join(
+            OrderItem, OrderItem.order_id == Order.id
         ).where(
-            Order.farmer_id == farmer_id,
+            OrderItem.farmer_id == farmer_id,
             Order.created_at >= start_date,
             Order.created_at <= end_date,
-            Order.payment_status.value == "paid"
-        ).group_by(Order.buyer_id)
+            Order.payment_status == PaymentStatus.PAID
+        ).group_by(Order.buyer_id).cte('per_customer')
         
-        customers = session.exec(customer_query).all()
+        # Customer counts are aggregated in the database rather than in Python
+        total_customers, repeat_customers = session.exec(
+            select(
+                func.count(),
+                func.count().filter(per_customer.c.order_count > 1)
+            ).select_from(per_customer)
+        ).one()
         
-        customer_insights = {
-            "total_customers": len(customers),
-            "repeat_customers": len([c for c in customers if c.order_count > 1]),
-            "top_customers": []
-        }
-        
-        # Get top customers
-        for customer in sorted(customers, key=lambda x: x.total_spent, reverse=True)[:5]:
-            user = session.get(User, customer.buyer_id)
-            customer_insights["top_customers"].append({
-                "user_id": customer.buyer_id,
-                "name": user.name if user else "Unknown",
-                "total_spent": float(customer.total_spent),
-                "order_count": customer.order_count
-            })
-        
-        # Monthly revenue trends
-        monthly_revenue_query = select(
-            func.date_trunc('month', Order.created_at).label('month'),
-            func.sum(Order.total_amount).label('revenue'),
-            func.count(Order.id).label('order_count')
-        ).where(
-            Order.farmer_id == farmer_id,
-            Order.created_at >= start_date,
-            Order.created_at <= end_date,
-            Order.payment_status.value == "paid"
-        ).group_by('month').order_by('month')
-        
-        monthly_data = session.exec(monthly_revenue_query).all()
-        
-        monthly_revenue = [
-            {
-                "month": month.month.strftime("%Y-%m"),
-                "revenue": float(month.revenue),
-                "orders": month.order_count
-            }
-            for month in monthly_data
-        ]
+        # Top five customers by spend, joined to their names
+        top_query = select(
+            per_customer.c.buyer_id,
+            per_customer.c.order_count,
+            per_customer.c.total_spent,
+            User.name
+        ).outerjoin(
+            User, User.id == per_customer.c.buyer_id
+        ).order_by(per_customer.c.total_spent.desc()).limit(5)
         
         return {
-            **basic_analytics,
-            "customer_insights": customer_insights,
-            "monthly_revenue": monthly_revenue,
-            "performance_metrics": {
-                "customer_retention_rate": customer_insights["repeat_customers"] / customer_insights["total_customers"] if customer_insights["total_customers"] > 0 else 0,
-                "average_customer_value": basic_analytics.get("total_revenue", 0) / customer_insights["total_customers"] if customer_insights["total_customers"] > 0 else 0
-            }
-        }
\ No newline at end of file
+            "total_customers": total_customers,
+            "repeat_customers": repeat_customers or 0,
+            "top_customers": [
+                {
+                    "user_id": customer.buyer_id,
+                    "name": customer.name or "Unknown",
+                    "total_spent": float(customer.total_spent),
+                    "order_count": customer.order_count
+                }
+                for customer in session.exec(top_query).all()
+            ]
+        }
+
+
+def _get_farmer_monthly_revenue(
+    farmer_id: int,
+    start_date: datetime,
+    end_date: datetime
+) -> List[Dict[str, Any]]:
+    """Monthly revenue trends from the hourly monthly_user_spend rollup."""
+    
+    monthly_revenue_query = text("""
+        SELECT month, sum(revenue) AS revenue, sum(order_count) AS order_count
+        FROM monthly_user_spend
+        WHERE farmer_id = :farmer_id
+          AND month >= date_trunc('month', :start_date)
+          AND month <= :end_date
+        GROUP BY month
+        ORDER BY month
+    """).columns(month=DateTime)
+    
+    with Session(engine) as session:
+        monthly_data = session.exec(
+            monthly_revenue_query,
+            params={"farmer_id": farmer_id, "start_date": start_date, "end_date": end_date}
+        ).all()
+    
+    return [
+        {
+            "month": month.month.strftime("%Y-%m"),
+            "revenue": float(month.revenue),
+            "orders": month.order_count
+        }
+        for month in monthly_data
+    ]
+
+
+def _enhance_farmer_analytics(
+    basic_analytics: Dict[str, Any],
+    customer_insights: Dict[str, Any],
+    monthly_revenue: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Enhance farmer analytics with customer insights."""
+    
+    total_customers = customer_insights["total_customers"]
+    return {
+        **basic_analytics,
+        "customer_insights": customer_insights,
+        "monthly_revenue": monthly_revenue,
+        "performance_metrics": {
+            "customer_retention_rate": customer_insights["repeat_customers"] / total_customers if total_customers > 0 else 0,
+            "average_customer_value": basic_analytics.get("total_revenue", 0) / total_customers if total_customers > 0 else 0
+        }
+    }
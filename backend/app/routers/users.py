@@ -2,11 +2,11 @@ from typing import List
 from pydantic import BaseModel
 
 from fastapi import APIRouter, HTTPException, Depends
-from sqlmodel import Session, select, func
+from sqlmodel import Session, select, func, delete
 
 from ..database import engine
-from ..models import User, UserStatus, Order
-from ..deps import get_current_user
+from ..models import User, UserRole, UserStatus, UserSession, Order
+from ..deps import get_current_user, invalidate_cached_user
 
 
 router = APIRouter()
@@ -20,14 +20,20 @@ class StatusUpdate(BaseModel):
     status: str
 
 
+def _is_admin(user: User) -> bool:
+    return user.role == UserRole.ADMIN
+
+
+def require_admin(current_user: User = Depends(get_current_user)) -> User:
+    """Dependency to require admin access"""
+    if not _is_admin(current_user):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+
 @router.get("/", response_model=List[User])
-def list_users(current_user: User = Depends(get_current_user)) -> List[User]:
+def list_users(current_user: User = Depends(require_admin)) -> List[User]:
     """List all users (admin only)"""
-    # Handle both enum and string role values
-    role_str = current_user.role.value if hasattr(current_user.role, 'value') else str(current_user.role)
-    if role_str.upper() != "ADMIN":
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
     with Session(engine) as session:
         return session.exec(select(User)).all()
 
@@ -36,13 +42,9 @@ def list_users(current_user: User = Depends(get_current_user)) -> List[User]:
 def update_user_role(
     user_id: int, 
     role_update: RoleUpdate,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(require_admin)
 ) -> User:
     """Update user role (admin only)"""
-    role_str = current_user.role.value if hasattr(current_user.role, 'value') else str(current_user.role)
-    if role_str.upper() != "ADMIN":
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
     with Session(engine) as session:
         user = session.get(User, user_id)
         if not user:
@@ -56,6 +58,7 @@ def update_user_role(
         user.role = role_update.role.upper()
         session.add(user)
         session.commit()
+        invalidate_cached_user(user.id)
         session.refresh(user)
         return user
 
@@ -63,13 +66,9 @@ def update_user_role(
 @router.post("/{user_id}/suspend", response_model=User)
 def suspend_user(
     user_id: int,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(require_admin)
 ) -> User:
     """Suspend a user (admin only)"""
-    role_str = current_user.role.value if hasattr(current_user.role, 'value') else str(current_user.role)
-    if role_str.upper() != "ADMIN":
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
     with Session(engine) as session:
         user = session.get(User, user_id)
         if not user:
@@ -81,6 +80,7 @@ def suspend_user(
         user.status = UserStatus.SUSPENDED
         session.add(user)
         session.commit()
+        invalidate_cached_user(user.id)
         session.refresh(user)
         return user
 
@@ -88,13 +88,9 @@ def suspend_user(
 @router.post("/{user_id}/activate", response_model=User)
 def activate_user(
     user_id: int,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(require_admin)
 ) -> User:
     """Activate a suspended user (admin only)"""
-    role_str = current_user.role.value if hasattr(current_user.role, 'value') else str(current_user.role)
-    if role_str.upper() != "ADMIN":
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
     with Session(engine) as session:
         user = session.get(User, user_id)
         if not user:
@@ -103,6 +99,7 @@ def activate_user(
         user.status = UserStatus.ACTIVE
         session.add(user)
         session.commit()
+        invalidate_cached_user(user.id)
         session.refresh(user)
         return user
 
@@ -116,20 +113,15 @@ def get_user(user_id: int, current_user: User = Depends(get_current_user)) -> Us
             raise HTTPException(status_code=404, detail="User not found")
         
         # Users can only view their own profile unless they're admin
-        role_str = current_user.role.value if hasattr(current_user.role, 'value') else str(current_user.role)
-        if user.id != current_user.id and role_str.upper() != "ADMIN":
+        if user.id != current_user.id and not _is_admin(current_user):
             raise HTTPException(status_code=403, detail="Access denied")
         
         return user
 
 
 @router.delete("/{user_id}", status_code=204)
-def delete_user(user_id: int, current_user: User = Depends(get_current_user)):
+def delete_user(user_id: int, current_user: User = Depends(require_admin)):
     """Delete a user (admin only)"""
-    role_str = current_user.role.value if hasattr(current_user.role, 'value') else str(current_user.role)
-    if role_str.upper() != "ADMIN":
-        raise HTTPException(status_code=403, detail="Admin access required")
-    
     with Session(engine) as session:
         user = session.get(User, user_id)
         if not user:
@@ -138,26 +130,25 @@ def delete_user(user_id: int, current_user: User = Depends(get_current_user)):
         if user.id == current_user.id:
             raise HTTPException(status_code=400, detail="Cannot delete yourself")
         
-        # Delete related records to avoid foreign key constraints
-        from ..models import UserSession
-        from sqlmodel import select
-        
-        # Delete user sessions
-        sessions = session.exec(select(UserSession).where(UserSession.user_id == user_id)).all()
-        for s in sessions:
-            session.delete(s)
+        # Check if user has orders - prevent deletion if they do. The LIMIT 1
+        # probe stops at the first row; the full count is only for the message.
+        has_orders = session.exec(
+            select(Order.id).where(Order.buyer_id == user_id).limit(1)
+        ).first() is not None
         
-        # Check if user has orders - prevent deletion if they do
-        order_count = session.exec(
-            select(func.count()).select_from(Order).where(Order.buyer_id == user_id)
-        ).one()
-        
-        if order_count > 0:
+        if has_orders:
+            order_count = session.exec(
+                select(func.count()).select_from(Order).where(Order.buyer_id == user_id)
+            ).one()
             raise HTTPException(
                 status_code=400, 
                 detail=f"Cannot delete user with {order_count} existing orders. Please archive the user instead."
             )
         
+        # Delete related records to avoid foreign key constraints
+        session.exec(delete(UserSession).where(UserSession.user_id == user_id))
+        
         session.delete(user)
         session.commit()
+        invalidate_cached_user(user_id)
 
@@ -1,38 +1,98 @@
+import hashlib
+import logging
 import os
 import secrets
-import uuid
-from datetime import datetime, timedelta
-from typing import Optional, Tuple, Dict, Any
+import time
+from datetime import datetime
+from typing import Optional, Tuple, Dict, Any, Iterable
 
 import jwt
 from passlib.context import CryptContext
-from sqlmodel import Session, select
+from sqlmodel import Session, select, delete
 from fastapi import HTTPException
+from sqlalchemy import literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from fastapi.concurrency import run_in_threadpool
 
 from ..database import engine
 from ..models import User, UserSession, TokenBlacklist
 from .redis_service import redis_service
 
+logger = logging.getLogger(__name__)
+
+# Verified payloads are reused for this long, skipping the signature check.
+# The blacklist is still consulted on every call, so revocation is immediate.
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "30"))
+TOKEN_CACHE_MAX_SIZE = 10000
+
+# Written last by a successful rehydrate. If Redis loses its data (restart
+# without persistence) the marker goes with it, and blacklist checks fall
+# back to the database until the blacklist has been reloaded.
+_BLACKLIST_READY_KEY = "blacklist:__ready__"
+
+_CROCKFORD32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+def _new_jti() -> str:
+    """ULID-style token id: 26 chars, time-ordered so index inserts stay together."""
+    value = (time.time_ns() // 1_000_000) << 80 | secrets.randbits(80)
+    chars = []
+    for _ in range(26):
+        value, digit = divmod(value, 32)
+        chars.append(_CROCKFORD32[digit])
+    return "".join(reversed(chars))
+
+
+def _blacklist_tokens(session: Session, entries: Dict[str, datetime]) -> None:
+    """Insert blacklist rows, letting the token_jti unique index skip duplicates."""
+    if not entries:
+        return
+    
+    insert = sqlite_insert if session.get_bind().dialect.name == "sqlite" else pg_insert
+    now = datetime.utcnow()
+    session.exec(
+        insert(TokenBlacklist)
+        .values([
+            {"token_jti": jti, "expires_at": expires_at, "created_at": now}
+            for jti, expires_at in entries.items()
+        ])
+        .on_conflict_do_nothing(index_elements=["token_jti"])
+    )
+
 
 class TokenManager:
     """Manages JWT tokens with refresh token support and secure session handling."""
     
     def __init__(self):
         self.jwt_secret = os.getenv("JWT_SECRET", "devsecret")
+        # Encoded once; PyJWT would otherwise re-encode the str key on every call
+        self._jwt_key = self.jwt_secret.encode()
         self.jwt_algorithm = "HS256"
         self.access_token_expire_minutes = 15
         self.refresh_token_expire_days = 7
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        # argon2 for new hashes; bcrypt hashes still verify and are flagged for rehash
+        self.pwd_context = CryptContext(
+            schemes=["argon2", "bcrypt"],
+            deprecated="auto",
+            argon2__time_cost=2,
+            argon2__memory_cost=65536,
+            argon2__parallelism=4
+        )
+        self._token_cache: Dict[bytes, Tuple[float, Dict[str, Any]]] = {}
+        # Redis only answers blacklist checks once it is known to hold every entry
+        self.redis_blacklist_ready = False
     
     def create_tokens(self, user: User, user_agent: Optional[str] = None, ip_address: Optional[str] = None) -> Dict[str, Any]:
         """Create access and refresh token pair for a user."""
-        now = datetime.utcnow()
-        access_token_expires = now + timedelta(minutes=self.access_token_expire_minutes)
-        refresh_token_expires = now + timedelta(days=self.refresh_token_expire_days)
+        # Claims are plain unix timestamps; only the stored expiry needs a datetime
+        now = int(time.time())
+        access_token_expires = now + self.access_token_expire_minutes * 60
+        refresh_token_expires = now + self.refresh_token_expire_days * 86400
         
         # Generate unique JTI for token tracking
-        access_jti = str(uuid.uuid4())
-        refresh_jti = str(uuid.uuid4())
+        access_jti = _new_jti()
+        refresh_jti = _new_jti()
         
         # Create access token
         access_payload = {
@@ -54,28 +114,26 @@ class TokenManager:
             "exp": refresh_token_expires
         }
         
-        access_token = jwt.encode(access_payload, self.jwt_secret, algorithm=self.jwt_algorithm)
-        refresh_token = jwt.encode(refresh_payload, self.jwt_secret, algorithm=self.jwt_algorithm)
+        access_token = jwt.encode(access_payload, self._jwt_key, algorithm=self.jwt_algorithm)
+        refresh_token = jwt.encode(refresh_payload, self._jwt_key, algorithm=self.jwt_algorithm)
         
         # Store session in database
         with Session(engine) as session:
             # Clean up old sessions for this user (keep only 5 most recent)
-            old_sessions = session.exec(
-                select(UserSession)
+            old_session_ids = (
+                select(UserSession.id)
                 .where(UserSession.user_id == user.id)
                 .order_by(UserSession.created_at.desc())
                 .offset(4)
-            ).all()
-            
-            for old_session in old_sessions:
-                session.delete(old_session)
+            )
+            session.exec(delete(UserSession).where(UserSession.id.in_(old_session_ids)))
             
             # Create new session
             user_session = UserSession(
                 user_id=user.id,
                 session_token=access_jti,
                 refresh_token=refresh_jti,
-                expires_at=refresh_token_expires,
+                expires_at=datetime.utcfromtimestamp(refresh_token_expires),
                 user_agent=user_agent,
                 ip_address=ip_address
             )
@@ -98,23 +156,26 @@ class TokenManager:
     
     def validate_token(self, token: str, token_type: str = "access") -> Optional[Dict[str, Any]]:
         """Validate JWT token and return payload if valid."""
-        try:
-            payload = jwt.decode(token, self.jwt_secret, algorithms=[self.jwt_algorithm])
-            
-            # Check token type
-            if payload.get("type") != token_type:
-                return None
-            
-            # Check if token is blacklisted
-            jti = payload.get("jti")
-            if jti and self._is_token_blacklisted(jti):
-                return None
-            
-            return payload
-        except jwt.ExpiredSignatureError:
+        payload = self._verified_payload(token, token_type)
+        if not payload:
             return None
-        except jwt.InvalidTokenError:
+        
+        # Check if token is blacklisted
+        if self._is_token_blacklisted(payload["jti"]):
             return None
+        
+        return payload
+    
+    async def validate_token_async(self, token: str, token_type: str = "access") -> Optional[Dict[str, Any]]:
+        """Validate JWT token, checking the blacklist in Redis before the database."""
+        payload = self._verified_payload(token, token_type)
+        if not payload:
+            return None
+        
+        if await self._is_token_blacklisted_async(payload["jti"]):
+            return None
+        
+        return payload
     
     def refresh_access_token(self, refresh_token: str) -> Optional[Dict[str, Any]]:
         """Generate new access token using refresh token."""
@@ -122,8 +183,11 @@ class TokenManager:
         if not payload:
             return None
         
-        user_id = int(payload.get("sub"))
-        refresh_jti = payload.get("jti")
+        user_id = int(payload["sub"])
+        refresh_jti = payload["jti"]
+        
+        now_ts = int(time.time())
+        now = datetime.utcfromtimestamp(now_ts)
         
         with Session(engine) as session:
             # Verify refresh token exists in session store
@@ -133,7 +197,7 @@ class TokenManager:
                 .where(UserSession.user_id == user_id)
             ).first()
             
-            if not user_session or user_session.expires_at < datetime.utcnow():
+            if not user_session or user_session.expires_at < now:
                 return None
             
             # Get user
@@ -142,12 +206,11 @@ class TokenManager:
                 return None
             
             # Update last accessed time and generate new access token
-            user_session.last_accessed = datetime.utcnow()
+            user_session.last_accessed = now
             
             # Generate new access token (keep same refresh token)
-            now = datetime.utcnow()
-            access_token_expires = now + timedelta(minutes=self.access_token_expire_minutes)
-            access_jti = str(uuid.uuid4())
+            access_token_expires = now_ts + self.access_token_expire_minutes * 60
+            access_jti = _new_jti()
             
             access_payload = {
                 "sub": str(user.id),
@@ -155,11 +218,11 @@ class TokenManager:
                 "email": user.email,
                 "jti": access_jti,
                 "type": "access",
-                "iat": now,
+                "iat": now_ts,
                 "exp": access_token_expires
             }
             
-            access_token = jwt.encode(access_payload, self.jwt_secret, algorithm=self.jwt_algorithm)
+            access_token = jwt.encode(access_payload, self._jwt_key, algorithm=self.jwt_algorithm)
             
             # Update session token
             user_session.session_token = access_jti
@@ -174,86 +237,86 @@ class TokenManager:
     
     def revoke_token(self, token: str) -> bool:
         """Add token to blacklist."""
+        return self._revoke_token(token) is not None
+    
+    async def revoke_token_async(self, token: str) -> bool:
+        """Add token to the database blacklist and mirror it into Redis."""
+        revoked = await run_in_threadpool(self._revoke_token, token)
+        if revoked is None:
+            return False
+        
+        jti, expires_at = revoked
+        await self._blacklist_in_redis(jti, expires_at)
+        return True
+    
+    def _revoke_token(self, token: str) -> Optional[Tuple[str, datetime]]:
+        """Blacklist a valid token in the database; returns its (jti, expiry)."""
         payload = self.validate_token(token)
         if not payload:
-            return False
+            return None
         
-        jti = payload.get("jti")
-        exp = datetime.fromtimestamp(payload.get("exp", 0))
+        jti = payload["jti"]
+        exp = datetime.utcfromtimestamp(payload["exp"])
         
         with Session(engine) as session:
-            blacklisted_token = TokenBlacklist(
-                token_jti=jti,
-                expires_at=exp
-            )
-            session.add(blacklisted_token)
+            _blacklist_tokens(session, {jti: exp})
             session.commit()
         
-        return True
+        return jti, exp
     
     def revoke_all_user_sessions(self, user_id: int) -> bool:
         """Revoke all sessions for a user."""
+        self._revoke_all_user_sessions(user_id)
+        return True
+    
+    async def revoke_all_user_sessions_async(self, user_id: int) -> bool:
+        """Revoke all sessions for a user and mirror the blacklist into Redis."""
+        revoked = await run_in_threadpool(self._revoke_all_user_sessions, user_id)
+        await self._blacklist_many_in_redis(revoked)
+        return True
+    
+    def _revoke_all_user_sessions(self, user_id: int) -> list:
+        """Blacklist every session token for a user; returns (jti, expiry) pairs."""
         with Session(engine) as session:
-            # Get all user sessions
+            # Only the token ids and expiry are needed, not full session rows
             user_sessions = session.exec(
-                select(UserSession).where(UserSession.user_id == user_id)
+                select(
+                    UserSession.session_token,
+                    UserSession.refresh_token,
+                    UserSession.expires_at
+                ).where(UserSession.user_id == user_id)
             ).all()
             
-            # Blacklist all tokens and delete sessions
-            for user_session in user_sessions:
-                # Check if tokens are already blacklisted to avoid duplicates
-                existing_access = session.exec(
-                    select(TokenBlacklist).where(TokenBlacklist.token_jti == user_session.session_token)
-                ).first()
-                
-                if not existing_access:
-                    access_blacklist = TokenBlacklist(
-                        token_jti=user_session.session_token,
-                        expires_at=user_session.expires_at
-                    )
-                    session.add(access_blacklist)
-                
-                existing_refresh = session.exec(
-                    select(TokenBlacklist).where(TokenBlacklist.token_jti == user_session.refresh_token)
-                ).first()
-                
-                if not existing_refresh:
-                    refresh_blacklist = TokenBlacklist(
-                        token_jti=user_session.refresh_token,
-                        expires_at=user_session.expires_at
-                    )
-                    session.add(refresh_blacklist)
-                
-                # Delete session
-                session.delete(user_session)
+            revoked = [
+                (jti, expires_at)
+                for access_jti, refresh_jti, expires_at in user_sessions
+                for jti in (access_jti, refresh_jti)
+            ]
+            
+            to_blacklist = {}
+            for jti, expires_at in revoked:
+                to_blacklist.setdefault(jti, expires_at)
+            _blacklist_tokens(session, to_blacklist)
             
+            # Delete sessions
+            session.exec(delete(UserSession).where(UserSession.user_id == user_id))
             session.commit()
         
-        return True
+        return revoked
     
     def cleanup_expired_sessions(self) -> int:
         """Clean up expired sessions and blacklisted tokens."""
         now = datetime.utcnow()
-        count = 0
         
         with Session(engine) as session:
-            # Remove expired sessions
+            # Remove expired sessions and blacklisted tokens in one statement each
             expired_sessions = session.exec(
-                select(UserSession).where(UserSession.expires_at < now)
-            ).all()
-            
-            for expired_session in expired_sessions:
-                session.delete(expired_session)
-                count += 1
-            
-            # Remove expired blacklisted tokens
+                delete(UserSession).where(UserSession.expires_at < now)
+            )
             expired_blacklist = session.exec(
-                select(TokenBlacklist).where(TokenBlacklist.expires_at < now)
-            ).all()
-            
-            for expired_token in expired_blacklist:
-                session.delete(expired_token)
-                count += 1
+                delete(TokenBlacklist).where(TokenBlacklist.expires_at < now)
+            )
+            count = expired_sessions.rowcount + expired_blacklist.rowcount
             
             session.commit()
         
@@ -285,13 +348,137 @@ class TokenManager:
         blacklist_key = f"blacklist:{jti}"
         return await redis_service.set(blacklist_key, "1", expire_seconds)
     
+    async def rehydrate_blacklist_redis(self) -> int:
+        """Load unexpired blacklist rows from the database into Redis.
+        
+        Redis is trusted for blacklist checks again only if every entry and
+        the ready marker were written.
+        """
+        self.redis_blacklist_ready = False
+        if not redis_service.redis_client:
+            return 0
+        
+        def load_active() -> list:
+            with Session(engine) as session:
+                return session.exec(
+                    select(TokenBlacklist.token_jti, TokenBlacklist.expires_at)
+                    .where(TokenBlacklist.expires_at > datetime.utcnow())
+                ).all()
+        
+        rows = await run_in_threadpool(load_active)
+        if await self._blacklist_many_in_redis(rows) and \
+                await redis_service.set(_BLACKLIST_READY_KEY, "1"):
+            self.redis_blacklist_ready = True
+        return len(rows)
+    
+    async def _blacklist_in_redis(self, jti: str, expires_at: datetime) -> None:
+        """Mirror a blacklist entry into Redis until the token would expire anyway."""
+        expire_seconds = int((expires_at - datetime.utcnow()).total_seconds())
+        if expire_seconds > 0 and not await self.blacklist_token_redis(jti, expire_seconds):
+            await self._mark_redis_blacklist_stale()
+    
+    async def _blacklist_many_in_redis(self, entries: Iterable[Tuple[str, datetime]]) -> bool:
+        """Mirror several blacklist entries into Redis in one pipelined round-trip."""
+        now = datetime.utcnow()
+        items = []
+        for jti, expires_at in entries:
+            expire_seconds = int((expires_at - now).total_seconds())
+            if expire_seconds > 0:
+                items.append((f"blacklist:{jti}", "1", expire_seconds))
+        if items and not await redis_service.set_many(items):
+            await self._mark_redis_blacklist_stale()
+            return False
+        return True
+    
+    async def _mark_redis_blacklist_stale(self) -> None:
+        """A mirror write failed; stop trusting Redis here and, if reachable, on other workers."""
+        self.redis_blacklist_ready = False
+        if not redis_service.redis_client:
+            return
+        logger.warning("Redis blacklist mirror write failed; checking the database until rehydrated")
+        await redis_service.delete(_BLACKLIST_READY_KEY)
+    
+    async def _is_token_blacklisted_async(self, jti: str) -> bool:
+        """Check the Redis blacklist, falling back to the database whenever Redis may be incomplete."""
+        if redis_service.redis_client and self.redis_blacklist_ready:
+            try:
+                revoked, ready = await redis_service.redis_client.mget(
+                    [f"blacklist:{jti}", _BLACKLIST_READY_KEY]
+                )
+                if ready is not None:
+                    return revoked is not None
+                # Another worker saw a failed write, or Redis came back empty
+                logger.warning("Redis blacklist ready marker missing; using database until rehydrated")
+                self.redis_blacklist_ready = False
+            except Exception as e:
+                logger.warning(f"Redis blacklist check failed, using database: {e}")
+        
+        return await run_in_threadpool(self._is_token_blacklisted, jti)
+    
+    @staticmethod
+    def _token_cache_key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()[:16]
+    
+    def _get_cached_payload(self, cache_key: bytes, token_type: str) -> Optional[Dict[str, Any]]:
+        """Return a previously verified payload if still fresh, unexpired and of the right type."""
+        cached = self._token_cache.get(cache_key)
+        if not cached:
+            return None
+        
+        cached_until, payload = cached
+        if cached_until <= time.monotonic() or payload["exp"] <= time.time():
+            self._token_cache.pop(cache_key, None)
+            return None
+        
+        return payload if payload["type"] == token_type else None
+    
+    def _cache_payload(self, cache_key: bytes, payload: Dict[str, Any]) -> None:
+        if TOKEN_CACHE_TTL <= 0:
+            return
+        if len(self._token_cache) >= TOKEN_CACHE_MAX_SIZE:
+            self._token_cache.pop(next(iter(self._token_cache)), None)
+        self._token_cache[cache_key] = (time.monotonic() + TOKEN_CACHE_TTL, payload)
+    
+    def _verified_payload(self, token: str, token_type: str) -> Optional[Dict[str, Any]]:
+        """Decode the token, reusing a cached payload; does not consult the blacklist."""
+        cache_key = self._token_cache_key(token)
+        cached = self._get_cached_payload(cache_key, token_type)
+        if cached:
+            return cached
+        
+        payload = self._decode_token(token, token_type)
+        if payload:
+            self._cache_payload(cache_key, payload)
+        return payload
+    
+    def _decode_token(self, token: str, token_type: str) -> Optional[Dict[str, Any]]:
+        """Verify signature, expiry, required claims and type; does not consult the blacklist."""
+        try:
+            payload = jwt.decode(
+                token,
+                self._jwt_key,
+                algorithms=[self.jwt_algorithm],
+                options={"require": ["sub", "jti", "exp", "type"]}
+            )
+        except jwt.ExpiredSignatureError:
+            return None
+        except jwt.InvalidTokenError:
+            return None
+        
+        # Check token type
+        if payload["type"] != token_type:
+            return None
+        
+        return payload
+    
     def _is_token_blacklisted(self, jti: str) -> bool:
         """Check if token JTI is blacklisted."""
         with Session(engine) as session:
-            blacklisted = session.exec(
-                select(TokenBlacklist).where(TokenBlacklist.token_jti == jti)
+            # Constant select lets Postgres answer from the unique token_jti index alone
+            found = session.exec(
+                select(literal(1)).where(TokenBlacklist.token_jti == jti).limit(1)
             ).first()
-            return blacklisted is not None
+            return found is not None
 
 
 # Global token manager instance
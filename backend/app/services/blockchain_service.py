@@ -1,12 +1,45 @@
 import os
 import json
+import functools
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from eth_abi import decode
+from eth_hash.auto import keccak
 from web3 import Web3
 from web3.middleware import geth_poa_middleware
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Hashable, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Contract state only moves once per block (~12s on Sepolia), so view reads are
+# kept briefly to avoid repeating the same eth_call round-trips.
+VIEW_CACHE_TTL = float(os.getenv("BLOCKCHAIN_VIEW_CACHE_TTL", "6"))
+VIEW_CACHE_MAX_SIZE = 1024
+
+# Reused for product hashing; the output must stay byte-identical to
+# json.dumps(..., sort_keys=True) or previously registered hashes stop matching
+_PRODUCT_ENCODER = json.JSONEncoder(sort_keys=True)
+
+RPC_TIMEOUT = float(os.getenv("BLOCKCHAIN_RPC_TIMEOUT", "5"))
+RPC_POOL_SIZE = int(os.getenv("BLOCKCHAIN_RPC_POOL_SIZE", "100"))
+
+
+def _build_rpc_session() -> requests.Session:
+    """HTTP session kept alive across RPC calls so each call skips the TLS handshake."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=20,
+        pool_maxsize=RPC_POOL_SIZE,
+        max_retries=Retry(total=3, backoff_factor=0.1),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
 # Minimal ABIs for our contracts
 AGRIDAO_ABI = [
     {
@@ -67,37 +100,157 @@ ESCROW_ABI = [
     }
 ]
 
+# Multicall3 is deployed at the same address on Sepolia and most other chains,
+# but not on a fresh local node (hardhat, anvil); reads fall back to single calls.
+MULTICALL3_ADDRESS = os.getenv("MULTICALL3_ADDRESS", "0xcA11bde05977b3631167028862bE2a173976CA11")
+
+MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"},
+                ],
+                "internalType": "struct Multicall3.Call3[]",
+                "name": "calls",
+                "type": "tuple[]",
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"internalType": "bool", "name": "success", "type": "bool"},
+                    {"internalType": "bytes", "name": "returnData", "type": "bytes"},
+                ],
+                "internalType": "struct Multicall3.Result[]",
+                "name": "returnData",
+                "type": "tuple[]",
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function",
+    },
+    {
+        "inputs": [],
+        "name": "getCurrentBlockTimestamp",
+        "outputs": [{"internalType": "uint256", "name": "timestamp", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function",
+    }
+]
+
+
+def _selector(signature: str) -> bytes:
+    return keccak(signature.encode())[:4]
+
+
+# Calldata for the argument-less stats reads, so the hot path skips ABI encoding
+MEMBER_COUNT_CALLDATA = _selector("memberCount()")
+PROPOSAL_COUNT_CALLDATA = _selector("proposalCount()")
+BLOCK_TIMESTAMP_CALLDATA = _selector("getCurrentBlockTimestamp()")
+
+
+@functools.cache
+def _build_contracts(rpc_url: Optional[str], agridao_address: Optional[str],
+                     escrow_address: Optional[str]) -> Tuple[Web3, Any, Any, Any]:
+    """Build the Web3 client and contract proxies once per configuration."""
+    w3 = Web3(Web3.HTTPProvider(
+        rpc_url,
+        request_kwargs={"timeout": RPC_TIMEOUT},
+        session=_build_rpc_session(),
+    ))
+    
+    # Inject POA middleware for testnets
+    w3.middleware_onion.inject(geth_poa_middleware, layer=0)
+    
+    agridao = None
+    escrow = None
+    multicall = w3.eth.contract(
+        address=Web3.to_checksum_address(MULTICALL3_ADDRESS),
+        abi=MULTICALL3_ABI
+    )
+    
+    if agridao_address:
+        agridao = w3.eth.contract(
+            address=Web3.to_checksum_address(agridao_address),
+            abi=AGRIDAO_ABI
+        )
+        
+    if escrow_address:
+        escrow = w3.eth.contract(
+            address=Web3.to_checksum_address(escrow_address),
+            abi=ESCROW_ABI
+        )
+    
+    return w3, agridao, escrow, multicall
+
+
 class BlockchainService:
     def __init__(self):
         self.rpc_url = os.getenv("SEPOLIA_RPC_URL")
-        self.w3 = Web3(Web3.HTTPProvider(self.rpc_url))
-        
-        # Inject POA middleware for testnets
-        self.w3.middleware_onion.inject(geth_poa_middleware, layer=0)
-        
         self.agridao_address = os.getenv("AGRIDAO_ADDRESS")
         self.escrow_address = os.getenv("ESCROW_ADDRESS")
         
-        self.agridao = None
-        self.escrow = None
+        self.w3, self.agridao, self.escrow, self.multicall = _build_contracts(
+            self.rpc_url, self.agridao_address, self.escrow_address
+        )
         
-        if self.agridao_address:
-            self.agridao = self.w3.eth.contract(
-                address=Web3.to_checksum_address(self.agridao_address),
-                abi=AGRIDAO_ABI
-            )
-            
-        if self.escrow_address:
-            self.escrow = self.w3.eth.contract(
-                address=Web3.to_checksum_address(self.escrow_address),
-                abi=ESCROW_ABI
-            )
+        self._view_cache: Dict[Hashable, Tuple[float, Any]] = {}
+        self._view_cache_lock = threading.Lock()
+        
+        # Whether Multicall3 has code on this chain; probed on first use
+        self._multicall_available: Optional[bool] = None
+        
+        # Next nonce for the signing account, synced from the node lazily and
+        # after any failed send
+        self._nonce: Optional[int] = None
+        self._nonce_lock = threading.Lock()
+
+    def _get_cached_view(self, key: Hashable) -> Optional[Any]:
+        with self._view_cache_lock:
+            cached = self._view_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        return None
+
+    def _cache_view(self, key: Hashable, value: Any) -> None:
+        if VIEW_CACHE_TTL <= 0:
+            return
+        with self._view_cache_lock:
+            if len(self._view_cache) >= VIEW_CACHE_MAX_SIZE:
+                self._view_cache.pop(next(iter(self._view_cache)), None)
+            self._view_cache[key] = (time.monotonic() + VIEW_CACHE_TTL, value)
+
+    def _next_nonce(self, address: str) -> int:
+        """Reserve the next nonce locally so concurrent sends don't collide."""
+        with self._nonce_lock:
+            if self._nonce is None:
+                self._nonce = self.w3.eth.get_transaction_count(address, 'pending')
+            nonce = self._nonce
+            self._nonce += 1
+            return nonce
+
+    def _reset_nonce(self) -> None:
+        with self._nonce_lock:
+            self._nonce = None
 
     def is_connected(self) -> bool:
         return self.w3.is_connected()
 
+    def _has_multicall(self) -> bool:
+        if self._multicall_available is None:
+            self._multicall_available = len(self.w3.eth.get_code(self.multicall.address)) > 0
+        return self._multicall_available
+
     def get_blockchain_stats(self) -> Dict[str, Any]:
         """Get summary stats from the blockchain."""
+        cached = self._get_cached_view(("stats",))
+        if cached is not None:
+            return dict(cached)
+        
         stats = {
             "total_transactions": 0,
             "total_value": 0.0,
@@ -106,13 +259,28 @@ class BlockchainService:
         }
         
         try:
-            if self.agridao:
+            if self.agridao and self._has_multicall():
+                # One eth_call for both counters and the block timestamp
+                calls = [
+                    (self.agridao.address, False, MEMBER_COUNT_CALLDATA),
+                    (self.agridao.address, False, PROPOSAL_COUNT_CALLDATA),
+                    (self.multicall.address, False, BLOCK_TIMESTAMP_CALLDATA),
+                ]
+                results = self.multicall.functions.aggregate3(calls).call()
+                member_count, proposal_count, block_time = (
+                    decode(["uint256"], return_data)[0] for _, return_data in results
+                )
+                stats["active_users"] = member_count
+                stats["total_transactions"] = proposal_count
+                stats["last_block_time"] = block_time
+            elif self.agridao:
                 stats["active_users"] = self.agridao.functions.memberCount().call()
-                total_proposals = self.agridao.functions.proposalCount().call()
-                stats["total_transactions"] = total_proposals
-            
-            latest_block = self.w3.eth.get_block('latest')
-            stats["last_block_time"] = latest_block['timestamp']
+                stats["total_transactions"] = self.agridao.functions.proposalCount().call()
+                stats["last_block_time"] = self.w3.eth.get_block('latest')['timestamp']
+            else:
+                latest_block = self.w3.eth.get_block('latest')
+                stats["last_block_time"] = latest_block['timestamp']
+            self._cache_view(("stats",), dict(stats))
             
         except Exception as e:
             logger.error(f"Error fetching blockchain stats: {e}")
@@ -123,10 +291,14 @@ class BlockchainService:
         """Get order details from escrow contract."""
         if not self.escrow:
             return None
+        
+        cached = self._get_cached_view(("order", order_id))
+        if cached is not None:
+            return dict(cached)
             
         try:
             order = self.escrow.functions.getOrder(order_id).call()
-            return {
+            details = {
                 "buyer": order[0],
                 "seller": order[1],
                 "amount": self.w3.from_wei(order[2], 'ether'),
@@ -134,6 +306,8 @@ class BlockchainService:
                 "disputed": order[4],
                 "refunded": order[5]
             }
+            self._cache_view(("order", order_id), details)
+            return dict(details)
         except Exception as e:
             logger.error(f"Error fetching order {order_id}: {e}")
             return None
@@ -142,10 +316,14 @@ class BlockchainService:
         """Get proposal details from DAO contract."""
         if not self.agridao:
             return None
+        
+        cached = self._get_cached_view(("proposal", proposal_id))
+        if cached is not None:
+            return dict(cached)
             
         try:
             prop = self.agridao.functions.getProposal(proposal_id).call()
-            return {
+            details = {
                 "proposer": prop[0],
                 "description": prop[1],
                 "forVotes": prop[2],
@@ -153,6 +331,8 @@ class BlockchainService:
                 "endTime": prop[4],
                 "executed": prop[5]
             }
+            self._cache_view(("proposal", proposal_id), details)
+            return dict(details)
         except Exception as e:
             logger.error(f"Error fetching proposal {proposal_id}: {e}")
             return None
@@ -164,14 +344,14 @@ class BlockchainService:
             
         try:
             # Generate stable hash of product data
-            product_json = json.dumps(product_data, sort_keys=True)
-            product_hash = self.w3.keccak(text=product_json).hex()
+            product_json = _PRODUCT_ENCODER.encode(product_data)
+            product_hash = "0x" + keccak(product_json.encode()).hex()
             
             # Prepare transaction
             account = self.w3.eth.account.from_key(os.getenv("PRIVATE_KEY"))
             
             # Use createProposal as a way to put data on-chain
-            nonce = self.w3.eth.get_transaction_count(account.address)
+            nonce = self._next_nonce(account.address)
             
             # Simple description containing the hash and name
             description = f"PRODUCT_REGISTRY:{product_data.get('name', 'Unknown')}:{product_hash}"
@@ -189,6 +369,8 @@ class BlockchainService:
             return self.w3.to_hex(tx_hash)
             
         except Exception as e:
+            # A reserved nonce may now be unused or already taken; resync on next send
+            self._reset_nonce()
             logger.error(f"Error registering product on-chain: {e}")
             return None
 
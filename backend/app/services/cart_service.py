@@ -3,26 +3,117 @@ Cart Service for persistent cart storage and management.
 Handles cart operations, synchronization, and validation.
 """
 
+import asyncio
+import json
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from decimal import Decimal
 
-from sqlmodel import Session, select
+from sqlmodel import Session, select, delete, update, func
+from sqlalchemy import and_, bindparam, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 
 from ..database import engine
 from ..models import Cart, CartItem, Product, User, CartStatus
-from ..services.redis_service import RedisService
+from ..services.redis_service import redis_service
+
+
+# Product snapshots change rarely; cart reads go through Redis first
+PRODUCT_CACHE_TTL = 60
+
+
+# Compact separators keep cached cart payloads small
+_JSON_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+# Fixed-shape statements are built once; callers bind values per execution
+_CART_ITEMS = select(CartItem).where(CartItem.cart_id == bindparam("cart_id"))
+_CART_ITEM = select(CartItem).where(
+    CartItem.cart_id == bindparam("cart_id"),
+    CartItem.product_id == bindparam("product_id")
+)
+# Inner join so totals cover the same lines the item listing shows
+_CART_TOTALS = (
+    select(
+        func.coalesce(func.sum(CartItem.quantity), 0),
+        func.coalesce(func.sum(CartItem.quantity * CartItem.unit_price), 0)
+    )
+    .join(Product, Product.id == CartItem.product_id)
+    .where(CartItem.cart_id == bindparam("cart_id"))
+)
+_DELETE_CART_ITEMS = delete(CartItem).where(CartItem.cart_id == bindparam("cart_id"))
+_TOUCH_CART = (
+    update(Cart)
+    .where(Cart.id == bindparam("cart_id"))
+    .values(updated_at=bindparam("touched_at"))
+)
+# Cart lines with the product columns the stock and price checks read. Outer
+# join so items whose product was deleted still show up, with a NULL found_id
+_CART_CHECK_ROWS = (
+    select(
+        CartItem.product_id,
+        CartItem.quantity,
+        CartItem.unit_price,
+        Product.id.label("found_id"),
+        Product.name,
+        Product.price,
+        Product.quantity_available,
+    )
+    .join(Product, Product.id == CartItem.product_id, isouter=True)
+    .where(CartItem.cart_id == bindparam("cart_id"))
+)
+
+
+def load_cart_check_rows(session: Session, cart_id: int) -> List[Any]:
+    """Every line of a cart joined to its product, in one query."""
+    return session.exec(_CART_CHECK_ROWS, params={"cart_id": cart_id}).all()
+
+
+def inventory_issue(item: Any) -> Optional[Dict[str, Any]]:
+    """Stock problem for one load_cart_check_rows row, or None if it can ship."""
+    if item.found_id is None:
+        return {
+            "type": "product_not_found",
+            "product_id": item.product_id,
+            "message": "Product no longer available"
+        }
+    
+    if item.quantity_available < item.quantity:
+        return {
+            "type": "insufficient_stock",
+            "product_id": item.product_id,
+            "product_name": item.name,
+            "requested_quantity": item.quantity,
+            "available_quantity": item.quantity_available,
+            "message": f"Only {item.quantity_available} items available"
+        }
+    
+    return None
+
+
+def _product_cache_key(product_id: int) -> str:
+    return f"product:{product_id}"
+
+
+async def invalidate_cached_product(product_id: int) -> None:
+    """Drop a product's cached snapshot after it is updated or deleted."""
+    await redis_service.delete(_product_cache_key(product_id))
 
 
 class CartService:
-    """Service for managing shopping cart operations."""
+    """Service for managing shopping cart operations.
+    
+    Public methods are async: database work runs in the threadpool so the
+    event loop stays free, and the Redis cache is awaited directly.
+    """
     
     def __init__(self):
-        self.redis_service = RedisService()
+        self.redis_service = redis_service
         self.cart_expiry_hours = 24 * 7  # 7 days
     
-    def get_or_create_cart(
+    async def get_or_create_cart(
         self, 
         user_id: Optional[int] = None, 
         session_id: Optional[str] = None
@@ -34,102 +125,130 @@ class CartService:
                 detail="Either user_id or session_id must be provided"
             )
         
-        with Session(engine) as session:
-            # Try to find existing active cart
+        return await run_in_threadpool(self._get_or_create_cart, user_id, session_id)
+    
+    def _get_or_create_cart(self, user_id: Optional[int], session_id: Optional[str]) -> Cart:
+        with Session(engine, expire_on_commit=False) as session:
+            # Try to find existing active cart. Guest carts are keyed on
+            # session_id among carts with no owner, matching the partial
+            # unique indexes that allow one active cart per user or session
             query = select(Cart).where(Cart.status == CartStatus.ACTIVE)
             if user_id:
                 query = query.where(Cart.user_id == user_id)
+                conflict_target = {
+                    "index_elements": ["user_id"],
+                    "index_where": Cart.status == CartStatus.ACTIVE
+                }
             else:
-                query = query.where(Cart.session_id == session_id)
+                query = query.where(Cart.session_id == session_id, Cart.user_id.is_(None))
+                conflict_target = {
+                    "index_elements": ["session_id"],
+                    "index_where": and_(Cart.status == CartStatus.ACTIVE, Cart.user_id.is_(None))
+                }
             
             cart = session.exec(query).first()
             
             if cart:
-                # Check if cart is expired
-                if cart.expires_at and cart.expires_at < datetime.utcnow():
-                    cart.status = CartStatus.EXPIRED
-                    session.add(cart)
-                    session.commit()
-                    cart = None
-            
-            if not cart:
-                # Create new cart
-                expires_at = datetime.utcnow() + timedelta(hours=self.cart_expiry_hours)
-                cart = Cart(
+                if not cart.expires_at or cart.expires_at >= datetime.utcnow():
+                    return cart
+                
+                # Retire the expired cart so its unique slot frees up
+                session.exec(
+                    update(Cart)
+                    .where(Cart.id == cart.id)
+                    .values(status=CartStatus.EXPIRED)
+                )
+            
+            # Create new cart; if a concurrent request got there first the
+            # insert is skipped and we read back the cart it created
+            now = datetime.utcnow()
+            insert = sqlite_insert if session.get_bind().dialect.name == "sqlite" else pg_insert
+            cart = session.exec(
+                insert(Cart)
+                .values(
                     user_id=user_id,
                     session_id=session_id,
-                    expires_at=expires_at
+                    status=CartStatus.ACTIVE,
+                    expires_at=now + timedelta(hours=self.cart_expiry_hours),
+                    created_at=now,
+                    updated_at=now
                 )
-                session.add(cart)
-                session.commit()
-                session.refresh(cart)
+                .on_conflict_do_nothing(**conflict_target)
+                .returning(Cart)
+            ).scalars().first()
+            
+            if cart is None:
+                cart = session.exec(query).one()
+            
+            session.commit()
             
             return cart
     
-    def add_item(
+    async def add_item(
         self, 
         cart_id: int, 
         product_id: int, 
         quantity: int = 1
     ) -> CartItem:
         """Add item to cart or update quantity if exists."""
-        with Session(engine) as session:
-            # Validate product exists and is available
-            product = session.get(Product, product_id)
-            if not product:
-                raise HTTPException(status_code=404, detail="Product not found")
+        cart_item = await run_in_threadpool(self._add_item, cart_id, product_id, quantity)
+        await self._invalidate_cart_cache(cart_id)
+        return cart_item
+    
+    def _add_item(self, cart_id: int, product_id: int, quantity: int) -> CartItem:
+        with Session(engine, expire_on_commit=False) as session:
+            # Insert the line priced from the product row, or bump its
+            # quantity, in one statement. Both branches only fire while stock
+            # covers the total, so the product is never read up front and an
+            # empty RETURNING means it is missing or short
+            now = datetime.utcnow()
+            insert = sqlite_insert if session.get_bind().dialect.name == "sqlite" else pg_insert
+            available = (
+                select(Product.quantity_available)
+                .where(Product.id == product_id)
+                .scalar_subquery()
+            )
+            cart_item = session.exec(
+                insert(CartItem)
+                .from_select(
+                    ["cart_id", "product_id", "quantity", "unit_price", "added_at", "updated_at"],
+                    select(
+                        literal(cart_id),
+                        Product.id,
+                        literal(quantity),
+                        Product.price,
+                        literal(now),
+                        literal(now)
+                    ).where(
+                        Product.id == product_id,
+                        Product.quantity_available >= quantity
+                    )
+                )
+                .on_conflict_do_update(
+                    index_elements=["cart_id", "product_id"],
+                    set_={"quantity": CartItem.quantity + quantity, "updated_at": now},
+                    where=CartItem.quantity + quantity <= available
+                )
+                .returning(CartItem)
+            ).scalars().first()
             
-            if product.quantity_available < quantity:
+            if cart_item is None:
+                session.rollback()
+                product = session.get(Product, product_id)
+                if not product:
+                    raise HTTPException(status_code=404, detail="Product not found")
                 raise HTTPException(
                     status_code=400, 
                     detail=f"Only {product.quantity_available} items available"
                 )
             
-            # Check if item already exists in cart
-            existing_item = session.exec(
-                select(CartItem).where(
-                    CartItem.cart_id == cart_id,
-                    CartItem.product_id == product_id
-                )
-            ).first()
-            
-            if existing_item:
-                # Update quantity
-                new_quantity = existing_item.quantity + quantity
-                if product.quantity_available < new_quantity:
-                    raise HTTPException(
-                        status_code=400, 
-                        detail=f"Only {product.quantity_available} items available"
-                    )
-                existing_item.quantity = new_quantity
-                existing_item.updated_at = datetime.utcnow()
-                session.add(existing_item)
-                cart_item = existing_item
-            else:
-                # Create new cart item
-                cart_item = CartItem(
-                    cart_id=cart_id,
-                    product_id=product_id,
-                    quantity=quantity,
-                    unit_price=product.price
-                )
-                session.add(cart_item)
-            
-            # Update cart timestamp
-            cart = session.get(Cart, cart_id)
-            if cart:
-                cart.updated_at = datetime.utcnow()
-                session.add(cart)
+            self._touch_cart(session, cart_id)
             
             session.commit()
-            session.refresh(cart_item)
-            
-            # Invalidate cache
-            self._invalidate_cart_cache(cart_id)
             
             return cart_item
     
-    def update_item_quantity(
+    async def update_item_quantity(
         self, 
         cart_id: int, 
         product_id: int, 
@@ -137,9 +256,14 @@ class CartService:
     ) -> Optional[CartItem]:
         """Update item quantity in cart."""
         if quantity <= 0:
-            return self.remove_item(cart_id, product_id)
+            return await self.remove_item(cart_id, product_id)
         
-        with Session(engine) as session:
+        cart_item = await run_in_threadpool(self._update_item_quantity, cart_id, product_id, quantity)
+        await self._invalidate_cart_cache(cart_id)
+        return cart_item
+    
+    def _update_item_quantity(self, cart_id: int, product_id: int, quantity: int) -> CartItem:
+        with Session(engine, expire_on_commit=False) as session:
             # Validate product availability
             product = session.get(Product, product_id)
             if not product:
@@ -152,10 +276,7 @@ class CartService:
                 )
             
             cart_item = session.exec(
-                select(CartItem).where(
-                    CartItem.cart_id == cart_id,
-                    CartItem.product_id == product_id
-                )
+                _CART_ITEM, params={"cart_id": cart_id, "product_id": product_id}
             ).first()
             
             if not cart_item:
@@ -165,28 +286,23 @@ class CartService:
             cart_item.updated_at = datetime.utcnow()
             session.add(cart_item)
             
-            # Update cart timestamp
-            cart = session.get(Cart, cart_id)
-            if cart:
-                cart.updated_at = datetime.utcnow()
-                session.add(cart)
+            self._touch_cart(session, cart_id)
             
             session.commit()
-            session.refresh(cart_item)
-            
-            # Invalidate cache
-            self._invalidate_cart_cache(cart_id)
             
             return cart_item
     
-    def remove_item(self, cart_id: int, product_id: int) -> bool:
+    async def remove_item(self, cart_id: int, product_id: int) -> bool:
         """Remove item from cart."""
+        removed = await run_in_threadpool(self._remove_item, cart_id, product_id)
+        if removed:
+            await self._invalidate_cart_cache(cart_id)
+        return removed
+    
+    def _remove_item(self, cart_id: int, product_id: int) -> bool:
         with Session(engine) as session:
             cart_item = session.exec(
-                select(CartItem).where(
-                    CartItem.cart_id == cart_id,
-                    CartItem.product_id == product_id
-                )
+                _CART_ITEM, params={"cart_id": cart_id, "product_id": product_id}
             ).first()
             
             if not cart_item:
@@ -194,178 +310,215 @@ class CartService:
             
             session.delete(cart_item)
             
-            # Update cart timestamp
-            cart = session.get(Cart, cart_id)
-            if cart:
-                cart.updated_at = datetime.utcnow()
-                session.add(cart)
+            self._touch_cart(session, cart_id)
             
             session.commit()
             
-            # Invalidate cache
-            self._invalidate_cart_cache(cart_id)
-            
             return True
     
-    def get_cart_items(self, cart_id: int) -> List[Dict[str, Any]]:
+    async def get_cart_items(self, cart_id: int) -> List[Dict[str, Any]]:
         """Get all items in cart with product details."""
-        cache_key = f"cart_items:{cart_id}"
-        
         # Try to get from cache first
-        cached_items = self.redis_service.get_json(cache_key)
+        cached_items = await self.redis_service.get(f"cart_items:{cart_id}")
+        if cached_items is not None:
+            return json.loads(cached_items)
+        
+        items_data, _ = await self._fill_cart_items_cache(cart_id)
+        return items_data
+    
+    async def get_cart_items_json(self, cart_id: int) -> str:
+        """Get cart items as a JSON body; cache hits are returned without decoding."""
+        cached_items = await self.redis_service.get(f"cart_items:{cart_id}")
         if cached_items is not None:
             return cached_items
         
-        with Session(engine) as session:
-            cart_items = session.exec(
-                select(CartItem).where(CartItem.cart_id == cart_id)
-            ).all()
-            
-            if not cart_items:
-                return []
-            
-            # Get product details
-            product_ids = [item.product_id for item in cart_items]
-            products = {
-                p.id: p for p in session.exec(
-                    select(Product).where(Product.id.in_(product_ids))
-                ).all()
-            }
-            
-            items_data = []
-            for item in cart_items:
-                product = products.get(item.product_id)
-                if product:
-                    items_data.append({
-                        "id": item.id,
-                        "product_id": item.product_id,
-                        "product_name": product.name,
-                        "product_description": product.description,
-                        "product_image": product.images[0] if product.images else None,
-                        "quantity": item.quantity,
-                        "unit_price": float(item.unit_price),
-                        "total_price": float(item.unit_price * item.quantity),
-                        "available_quantity": product.quantity_available,
-                        "added_at": item.added_at.isoformat(),
-                        "updated_at": item.updated_at.isoformat()
-                    })
-            
-            # Cache for 5 minutes
-            self.redis_service.set_json(cache_key, items_data, expire=300)
-            
-            return items_data
+        _, body = await self._fill_cart_items_cache(cart_id)
+        return body
     
-    def get_cart_summary(self, cart_id: int) -> Dict[str, Any]:
-        """Get cart summary with totals."""
-        items = self.get_cart_items(cart_id)
+    async def _fill_cart_items_cache(self, cart_id: int) -> Tuple[List[Dict[str, Any]], str]:
+        """Build the item list from the database, cache its encoded form and return both."""
+        items = await run_in_threadpool(self._load_cart_items, cart_id)
+        products = await self._get_products_bulk([item.product_id for item in items])
         
-        subtotal = sum(item["total_price"] for item in items)
-        item_count = sum(item["quantity"] for item in items)
+        items_data = []
+        for item in items:
+            product = products.get(item.product_id)
+            if not product:
+                continue
+            line_total = item.unit_price * item.quantity
+            items_data.append({
+                "id": item.id,
+                "product_id": item.product_id,
+                "product_name": product["name"],
+                "product_description": product["description"],
+                "product_image": product["images"][0] if product["images"] else None,
+                "quantity": item.quantity,
+                "unit_price": float(item.unit_price),
+                "total_price": float(line_total),
+                "available_quantity": product["quantity_available"],
+                "added_at": item.added_at.isoformat(),
+                "updated_at": item.updated_at.isoformat()
+            })
         
-        return {
-            "cart_id": cart_id,
-            "item_count": item_count,
-            "subtotal": round(subtotal, 2),
-            "items": items
+        body = _JSON_ENCODER.encode(items_data)
+        if items_data:
+            # Cache for 5 minutes
+            await self.redis_service.set(f"cart_items:{cart_id}", body, expire=300)
+        
+        return items_data, body
+    
+    def _load_cart_items(self, cart_id: int) -> List[CartItem]:
+        with Session(engine) as session:
+            return session.exec(_CART_ITEMS, params={"cart_id": cart_id}).all()
+    
+    async def _get_products_bulk(self, product_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Product snapshots by id: one MGET, then a single query for the misses."""
+        product_ids = list(dict.fromkeys(product_ids))
+        if not product_ids:
+            return {}
+        
+        cached = await self.redis_service.mget([_product_cache_key(pid) for pid in product_ids])
+        products = {
+            pid: json.loads(raw) for pid, raw in zip(product_ids, cached) if raw is not None
         }
+        
+        misses = [pid for pid in product_ids if pid not in products]
+        if misses:
+            loaded = await run_in_threadpool(self._load_products, misses)
+            products.update(loaded)
+            await self.redis_service.set_many([
+                (_product_cache_key(pid), json.dumps(product), PRODUCT_CACHE_TTL)
+                for pid, product in loaded.items()
+            ])
+        
+        return products
     
-    def validate_cart_items(self, cart_id: int) -> Dict[str, Any]:
-        """Validate all items in cart against current product availability."""
+    def _load_products(self, product_ids: List[int]) -> Dict[int, Dict[str, Any]]:
         with Session(engine) as session:
-            cart_items = session.exec(
-                select(CartItem).where(CartItem.cart_id == cart_id)
-            ).all()
-            
-            if not cart_items:
-                return {"valid": True, "issues": []}
-            
-            # Get current product data
-            product_ids = [item.product_id for item in cart_items]
-            products = {
-                p.id: p for p in session.exec(
+            return {
+                product.id: {
+                    "name": product.name,
+                    "description": product.description,
+                    "images": product.images or [],
+                    "price": str(product.price),
+                    "quantity_available": product.quantity_available
+                }
+                for product in session.exec(
                     select(Product).where(Product.id.in_(product_ids))
                 ).all()
             }
+    
+    async def get_cart_summary(self, cart_id: int, include_items: bool = True) -> Dict[str, Any]:
+        """Get cart summary with totals, optionally with the item details."""
+        if not include_items:
+            return {"cart_id": cart_id, **await self.get_cart_totals(cart_id)}
+        
+        # Totals come from the NUMERIC aggregate rather than summing the
+        # per-line floats, so the subtotal carries no rounding drift
+        items, totals = await asyncio.gather(
+            self.get_cart_items(cart_id),
+            self.get_cart_totals(cart_id)
+        )
+        
+        return {"cart_id": cart_id, **totals, "items": items}
+    
+    async def get_cart_totals(self, cart_id: int) -> Dict[str, Any]:
+        """Get item count and subtotal from a single SQL aggregate."""
+        cache_key = f"cart_totals:{cart_id}"
+        
+        cached_totals = await self.redis_service.get(cache_key)
+        if cached_totals is not None:
+            return json.loads(cached_totals)
+        
+        totals = await run_in_threadpool(self._load_cart_totals, cart_id)
+        await self.redis_service.set(cache_key, json.dumps(totals), expire=60)
+        
+        return totals
+    
+    def _load_cart_totals(self, cart_id: int) -> Dict[str, Any]:
+        with Session(engine) as session:
+            item_count, subtotal = session.exec(
+                _CART_TOTALS, params={"cart_id": cart_id}
+            ).one()
             
-            issues = []
-            valid = True
-            
-            for item in cart_items:
-                product = products.get(item.product_id)
-                
-                if not product:
-                    issues.append({
-                        "type": "product_not_found",
-                        "product_id": item.product_id,
-                        "message": "Product no longer available"
-                    })
-                    valid = False
+            # Cast to float once, at the response edge
+            subtotal = Decimal(str(subtotal)).quantize(Decimal("0.01"))
+            return {"item_count": int(item_count), "subtotal": float(subtotal)}
+    
+    async def validate_cart_items(self, cart_id: int) -> Dict[str, Any]:
+        """Validate all items in cart against current product availability."""
+        return await run_in_threadpool(self._validate_cart_items, cart_id)
+    
+    def _validate_cart_items(self, cart_id: int, session: Optional[Session] = None) -> Dict[str, Any]:
+        if session is None:
+            with Session(engine) as session:
+                return self._validate_cart_items(cart_id, session)
+        
+        issues = []
+        valid = True
+        
+        for item in load_cart_check_rows(session, cart_id):
+            issue = inventory_issue(item)
+            if issue:
+                issues.append(issue)
+                valid = False
+                if item.found_id is None:
                     continue
-                
-                if product.quantity_available < item.quantity:
-                    issues.append({
-                        "type": "insufficient_stock",
-                        "product_id": item.product_id,
-                        "product_name": product.name,
-                        "requested_quantity": item.quantity,
-                        "available_quantity": product.quantity_available,
-                        "message": f"Only {product.quantity_available} items available"
-                    })
-                    valid = False
-                
-                # Check if price has changed significantly (more than 10%)
-                price_diff = abs(float(product.price - item.unit_price))
-                if price_diff > float(item.unit_price) * 0.1:
-                    issues.append({
-                        "type": "price_changed",
-                        "product_id": item.product_id,
-                        "product_name": product.name,
-                        "old_price": float(item.unit_price),
-                        "new_price": float(product.price),
-                        "message": f"Price changed from ${item.unit_price} to ${product.price}"
-                    })
-                    # Price changes don't invalidate cart, just notify
-            
-            return {"valid": valid, "issues": issues}
+            
+            # Check if price has changed significantly (more than 10%)
+            price_diff = abs(float(item.price - item.unit_price))
+            if price_diff > float(item.unit_price) * 0.1:
+                issues.append({
+                    "type": "price_changed",
+                    "product_id": item.product_id,
+                    "product_name": item.name,
+                    "old_price": float(item.unit_price),
+                    "new_price": float(item.price),
+                    "message": f"Price changed from ${item.unit_price} to ${item.price}"
+                })
+                # Price changes don't invalidate cart, just notify
+        
+        return {"valid": valid, "issues": issues}
     
-    def clear_cart(self, cart_id: int) -> bool:
+    async def clear_cart(self, cart_id: int) -> bool:
         """Clear all items from cart."""
+        await run_in_threadpool(self._clear_cart, cart_id)
+        await self._invalidate_cart_cache(cart_id)
+        return True
+    
+    def _clear_cart(self, cart_id: int) -> None:
         with Session(engine) as session:
-            cart_items = session.exec(
-                select(CartItem).where(CartItem.cart_id == cart_id)
-            ).all()
-            
-            for item in cart_items:
-                session.delete(item)
+            session.exec(_DELETE_CART_ITEMS, params={"cart_id": cart_id})
             
-            # Update cart timestamp
-            cart = session.get(Cart, cart_id)
-            if cart:
-                cart.updated_at = datetime.utcnow()
-                session.add(cart)
+            self._touch_cart(session, cart_id)
             
             session.commit()
-            
-            # Invalidate cache
-            self._invalidate_cart_cache(cart_id)
-            
-            return True
     
-    def merge_carts(self, target_cart_id: int, source_cart_id: int) -> bool:
+    async def merge_carts(self, target_cart_id: int, source_cart_id: int) -> bool:
         """Merge items from source cart into target cart."""
+        await run_in_threadpool(self._merge_carts, target_cart_id, source_cart_id)
+        await self._invalidate_cart_cache(target_cart_id, source_cart_id)
+        return True
+    
+    def _merge_carts(self, target_cart_id: int, source_cart_id: int) -> None:
         with Session(engine) as session:
             source_items = session.exec(
-                select(CartItem).where(CartItem.cart_id == source_cart_id)
+                _CART_ITEMS, params={"cart_id": source_cart_id}
             ).all()
             
-            for source_item in source_items:
-                # Check if item exists in target cart
-                existing_item = session.exec(
+            # One lookup for every source product already in the target cart
+            source_product_ids = [item.product_id for item in source_items]
+            existing_by_product = {
+                item.product_id: item for item in session.exec(
                     select(CartItem).where(
                         CartItem.cart_id == target_cart_id,
-                        CartItem.product_id == source_item.product_id
+                        CartItem.product_id.in_(source_product_ids)
                     )
-                ).first()
+                ).all()
+            } if source_product_ids else {}
+            
+            for source_item in source_items:
+                existing_item = existing_by_product.get(source_item.product_id)
                 
                 if existing_item:
                     # Update quantity
@@ -381,67 +534,58 @@ class CartService:
                         unit_price=source_item.unit_price
                     )
                     session.add(new_item)
-                
-                # Remove from source cart
-                session.delete(source_item)
+                    existing_by_product[source_item.product_id] = new_item
+            
+            # Remove merged items from source cart
+            session.exec(_DELETE_CART_ITEMS, params={"cart_id": source_cart_id})
             
             # Mark source cart as expired
-            source_cart = session.get(Cart, source_cart_id)
-            if source_cart:
-                source_cart.status = CartStatus.EXPIRED
-                session.add(source_cart)
+            session.exec(
+                update(Cart)
+                .where(Cart.id == source_cart_id)
+                .values(status=CartStatus.EXPIRED)
+            )
             
-            # Update target cart timestamp
-            target_cart = session.get(Cart, target_cart_id)
-            if target_cart:
-                target_cart.updated_at = datetime.utcnow()
-                session.add(target_cart)
+            self._touch_cart(session, target_cart_id)
             
             session.commit()
-            
-            # Invalidate caches
-            self._invalidate_cart_cache(target_cart_id)
-            self._invalidate_cart_cache(source_cart_id)
-            
-            return True
     
     def cleanup_expired_carts(self) -> int:
         """Clean up expired carts and return count of cleaned carts."""
         with Session(engine) as session:
-            expired_carts = session.exec(
-                select(Cart).where(
+            expired_ids = session.exec(
+                select(Cart.id).where(
                     Cart.expires_at < datetime.utcnow(),
                     Cart.status == CartStatus.ACTIVE
                 )
             ).all()
             
-            count = 0
-            for cart in expired_carts:
-                # Delete cart items
-                cart_items = session.exec(
-                    select(CartItem).where(CartItem.cart_id == cart.id)
-                ).all()
-                
-                for item in cart_items:
-                    session.delete(item)
-                
-                # Mark cart as expired
-                cart.status = CartStatus.EXPIRED
-                session.add(cart)
-                count += 1
+            if not expired_ids:
+                return 0
+            
+            # Drop their items and mark them expired in two statements
+            session.exec(delete(CartItem).where(CartItem.cart_id.in_(expired_ids)))
+            session.exec(
+                update(Cart)
+                .where(Cart.id.in_(expired_ids))
+                .values(status=CartStatus.EXPIRED)
+            )
             
             session.commit()
-            return count
+            return len(expired_ids)
+    
+    def _touch_cart(self, session: Session, cart_id: int) -> None:
+        """Stamp the cart's updated_at without loading it.
+        
+        Timestamps are naive UTC from datetime.utcnow(), like every other
+        column here; the database clock would follow its session TimeZone.
+        """
+        session.exec(_TOUCH_CART, params={"cart_id": cart_id, "touched_at": datetime.utcnow()})
     
-    def _invalidate_cart_cache(self, cart_id: int) -> None:
-        """Invalidate cart cache."""
-        cache_key = f"cart_items:{cart_id}"
-        try:
-            # Use sync delete method if available, otherwise skip cache invalidation
-            if hasattr(self.redis_service, 'delete_sync'):
-                self.redis_service.delete_sync(cache_key)
-            # For now, we'll skip cache invalidation in sync context
-            # In production, consider using a background task for cache invalidation
-        except Exception:
-            # Silently fail cache invalidation - not critical for functionality
-            pass
\ No newline at end of file
+    async def _invalidate_cart_cache(self, *cart_ids: int) -> None:
+        """Invalidate cached items and totals for one or more carts in a single round-trip."""
+        await self.redis_service.delete(*(
+            key
+            for cart_id in cart_ids
+            for key in (f"cart_items:{cart_id}", f"cart_totals:{cart_id}")
+        ))
@@ -3,19 +3,112 @@ Checkout Service for comprehensive validation and session management.
 Handles checkout validation, pricing, tax calculation, and session management.
 """
 
+import json
 import os
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+import secrets
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Any, Tuple
 from decimal import Decimal
 import re
 
 from sqlmodel import Session, select
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 
 from ..database import engine
 from ..models import Cart, CartItem, Product, User, Order, OrderItem
-from ..services.cart_service import CartService
-from ..services.redis_service import RedisService
+from ..services.cart_service import CartService, inventory_issue, load_cart_check_rows
+from ..services.redis_service import redis_service
+
+
+# Checkout session blobs are written on create and on every repricing;
+# compact separators keep them small in Redis
+_SESSION_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+# Checkout submit re-reads the same session several times in quick
+# succession, so decoded-from-Redis blobs are kept in process briefly
+SESSION_CACHE_TTL = float(os.getenv("CHECKOUT_SESSION_CACHE_TTL", "5"))
+SESSION_CACHE_MAX_SIZE = 1024
+
+# Cart prices within a cent of the current price are not treated as drift
+_PRICE_TOLERANCE_CENTS = 1
+
+# Postal code formats, compiled once
+_CA_POSTAL_RE = re.compile(r'^[A-Z]\d[A-Z] \d[A-Z]\d$')
+
+
+_REQUIRED_ADDRESS_FIELDS = (
+    "first_name", "last_name", "address_line_1",
+    "city", "state", "postal_code", "country"
+)
+
+# Regional shipping surcharges
+_WEST_COAST_STATES = frozenset({"CA", "OR", "WA"})
+_EAST_COAST_STATES = frozenset({"NY", "NJ", "CT"})
+
+# US state tax rates (simplified)
+_US_TAX_RATES = {
+    "CA": Decimal("0.0875"),  # California
+    "NY": Decimal("0.08"),    # New York
+    "TX": Decimal("0.0625"),  # Texas
+    "FL": Decimal("0.06"),    # Florida
+    # Add more states as needed
+}
+
+
+def _rate_ratio(rate: Decimal) -> Tuple[int, int]:
+    """Exact integer (numerator, denominator) for a decimal rate."""
+    return rate.as_integer_ratio()
+
+
+def _apply_rate_cents(amount_cents: int, ratio: Tuple[int, int]) -> int:
+    """Scale a non-negative cent amount by a rate, rounding half up to a cent."""
+    numerator, denominator = ratio
+    return (2 * amount_cents * numerator + denominator) // (2 * denominator)
+
+
+def _price_check(
+    product_id: int,
+    product_name: str,
+    cart_price: Decimal,
+    current_price: Decimal
+) -> Tuple[int, Optional[Dict[str, Any]]]:
+    """Current unit price in cents, plus a drift issue if the cart price is stale."""
+    # Prices carry two decimal places, so both sides are exact in cents
+    current_cents = round(current_price * 100)
+    cart_cents = round(cart_price * 100)
+    
+    # Allow small price differences (up to 1 cent)
+    if abs(current_cents - cart_cents) <= _PRICE_TOLERANCE_CENTS:
+        return current_cents, None
+    
+    return current_cents, {
+        "product_id": product_id,
+        "product_name": product_name,
+        "cart_price": cart_cents / 100,
+        "current_price": current_cents / 100,
+        "issue": "Price has changed"
+    }
+
+
+def _pricing_fingerprint(pricing: Dict[str, float]) -> List[float]:
+    """Flat, JSON-stable view of a pricing breakdown for cheap change detection."""
+    return [pricing["subtotal"], pricing["platform_fee"], pricing["tax_amount"], pricing["total"]]
+
+
+def _is_us_zip(postal_code: str) -> bool:
+    """Check for a 5-digit or ZIP+4 code without going through the regex engine."""
+    if not postal_code.isascii():
+        return False
+    if len(postal_code) == 5:
+        return postal_code.isdigit()
+    return (
+        len(postal_code) == 10
+        and postal_code[5] == "-"
+        and postal_code[:5].isdigit()
+        and postal_code[6:].isdigit()
+    )
 
 
 class CheckoutValidator:
@@ -23,15 +116,22 @@ class CheckoutValidator:
     
     def __init__(self):
         self.cart_service = CartService()
-        self.redis_service = RedisService()
-        self.platform_fee_rate = float(os.getenv("PLATFORM_FEE_RATE", "0.08"))
-        self.tax_rate = float(os.getenv("TAX_RATE", "0.0875"))  # Default 8.75%
+        self.redis_service = redis_service
+        # Decimal forms for money math, built straight from the env strings
+        self._platform_fee_rate_dec = Decimal(os.getenv("PLATFORM_FEE_RATE", "0.08"))
+        self._tax_rate_dec = Decimal(os.getenv("TAX_RATE", "0.0875"))
+        # Integer ratios so checkout pricing stays in whole cents
+        self._platform_fee_ratio = _rate_ratio(self._platform_fee_rate_dec)
+        self._tax_ratio = _rate_ratio(self._tax_rate_dec)
         self.checkout_session_timeout = 30  # 30 minutes
+        self._session_cache: Dict[str, Tuple[float, str]] = {}
     
-    def validate_inventory(self, cart_id: int) -> Dict[str, Any]:
+    async def validate_inventory(self, cart_id: int) -> Dict[str, Any]:
         """Validate inventory availability for all cart items."""
-        validation_result = self.cart_service.validate_cart_items(cart_id)
-        
+        validation_result = await self.cart_service.validate_cart_items(cart_id)
+        return self._inventory_result(validation_result)
+    
+    def _inventory_result(self, validation_result: Dict[str, Any]) -> Dict[str, Any]:
         if not validation_result["valid"]:
             # Filter out only inventory-related issues
             inventory_issues = [
@@ -49,9 +149,9 @@ class CheckoutValidator:
         
         return {"valid": True, "issues": []}
     
-    def validate_pricing(self, cart_id: int) -> Dict[str, Any]:
+    async def validate_pricing(self, cart_id: int) -> Dict[str, Any]:
         """Validate pricing and calculate totals."""
-        cart_items = self.cart_service.get_cart_items(cart_id)
+        cart_items = await self.cart_service.get_cart_items(cart_id)
         
         if not cart_items:
             return {
@@ -60,36 +160,51 @@ class CheckoutValidator:
                 "message": "Cart is empty"
             }
         
-        # Validate each item's pricing
-        pricing_issues = []
-        subtotal = Decimal("0.00")
+        return await run_in_threadpool(self._price_cart_items, cart_items)
+    
+    def _price_cart_items(
+        self, 
+        cart_items: List[Dict[str, Any]], 
+        session: Optional[Session] = None
+    ) -> Dict[str, Any]:
+        if session is None:
+            with Session(engine) as session:
+                return self._price_cart_items(cart_items, session)
+        
+        # Validate each item's pricing; the issue list is only allocated
+        # once drift is found, which most checkouts never hit
+        pricing_issues = None
+        subtotal_cents = 0
+        
+        # One query for every product in the cart, reading only the
+        # columns pricing needs rather than hydrating full Product rows
+        product_ids = [item["product_id"] for item in cart_items]
+        products = {
+            row.id: row for row in session.exec(
+                select(Product.id, Product.price, Product.name)
+                .where(Product.id.in_(product_ids))
+            ).all()
+        }
         
-        with Session(engine) as session:
-            for item in cart_items:
-                product = session.get(Product, item["product_id"])
-                if not product:
-                    pricing_issues.append({
-                        "product_id": item["product_id"],
-                        "issue": "Product not found"
-                    })
-                    continue
-                
-                current_price = product.price
-                cart_price = Decimal(str(item["unit_price"]))
-                
-                # Allow small price differences (up to 1 cent)
-                if abs(current_price - cart_price) > Decimal("0.01"):
-                    pricing_issues.append({
-                        "product_id": item["product_id"],
-                        "product_name": product.name,
-                        "cart_price": float(cart_price),
-                        "current_price": float(current_price),
-                        "issue": "Price has changed"
-                    })
-                
-                # Use current price for calculations
-                item_total = current_price * item["quantity"]
-                subtotal += item_total
+        for item in cart_items:
+            product = products.get(item["product_id"])
+            if not product:
+                pricing_issues = pricing_issues or []
+                pricing_issues.append({
+                    "product_id": item["product_id"],
+                    "issue": "Product not found"
+                })
+                continue
+            
+            current_cents, issue = _price_check(
+                item["product_id"], product.name, item["unit_price"], product.price
+            )
+            if issue:
+                pricing_issues = pricing_issues or []
+                pricing_issues.append(issue)
+            
+            # Use current price for calculations
+            subtotal_cents += current_cents * item["quantity"]
         
         if pricing_issues:
             return {
@@ -99,34 +214,96 @@ class CheckoutValidator:
                 "issues": pricing_issues
             }
         
-        # Calculate fees and taxes
-        platform_fee = subtotal * Decimal(str(self.platform_fee_rate))
-        tax_amount = subtotal * Decimal(str(self.tax_rate))
-        total = subtotal + platform_fee + tax_amount
+        return {"valid": True, "pricing": self._pricing_breakdown(subtotal_cents)}
+    
+    def _pricing_breakdown(self, subtotal_cents: int) -> Dict[str, float]:
+        # Calculate fees and taxes, each rounded to the cent it will be charged as
+        platform_fee_cents = _apply_rate_cents(subtotal_cents, self._platform_fee_ratio)
+        tax_cents = _apply_rate_cents(subtotal_cents, self._tax_ratio)
+        total_cents = subtotal_cents + platform_fee_cents + tax_cents
         
         return {
-            "valid": True,
-            "pricing": {
-                "subtotal": float(subtotal),
-                "platform_fee": float(platform_fee),
-                "tax_amount": float(tax_amount),
-                "total": float(total)
-            }
+            "subtotal": subtotal_cents / 100,
+            "platform_fee": platform_fee_cents / 100,
+            "tax_amount": tax_cents / 100,
+            "total": total_cents / 100
         }
     
+    def validate_inventory_and_pricing(
+        self, 
+        cart_id: int, 
+        session: Optional[Session] = None
+    ) -> Dict[str, Any]:
+        """Check stock and price drift for every cart item in a single pass.
+        
+        Cart items and their products come back from the cart service's
+        joined query, so checkout no longer loads the products once for the
+        inventory check and again for pricing. Failures use the same shapes
+        as validate_inventory and validate_pricing.
+        """
+        if session is None:
+            with Session(engine) as session:
+                return self.validate_inventory_and_pricing(cart_id, session)
+        
+        rows = load_cart_check_rows(session, cart_id)
+        
+        if not rows:
+            return {
+                "valid": False,
+                "error_type": "empty_cart",
+                "message": "Cart is empty"
+            }
+        
+        inventory_issues = None
+        pricing_issues = None
+        subtotal_cents = 0
+        
+        for item in rows:
+            issue = inventory_issue(item)
+            if issue:
+                inventory_issues = inventory_issues or []
+                inventory_issues.append(issue)
+                if item.found_id is None:
+                    continue
+            
+            current_cents, issue = _price_check(
+                item.product_id, item.name, item.unit_price, item.price
+            )
+            if issue:
+                pricing_issues = pricing_issues or []
+                pricing_issues.append(issue)
+            
+            # Use current price for calculations
+            subtotal_cents += current_cents * item.quantity
+        
+        if inventory_issues:
+            return {
+                "valid": False,
+                "error_type": "inventory_validation",
+                "message": "Some items in your cart are no longer available",
+                "issues": inventory_issues
+            }
+        
+        if pricing_issues:
+            return {
+                "valid": False,
+                "error_type": "pricing_validation",
+                "message": "Some item prices have changed",
+                "issues": pricing_issues
+            }
+        
+        return {"valid": True, "pricing": self._pricing_breakdown(subtotal_cents)}
+    
     def validate_shipping_address(self, address: Dict[str, Any]) -> Dict[str, Any]:
         """Validate shipping address format and completeness."""
-        required_fields = [
-            "first_name", "last_name", "address_line_1", 
-            "city", "state", "postal_code", "country"
-        ]
-        
-        missing_fields = []
         validation_errors = []
         
-        for field in required_fields:
-            if not address.get(field) or not str(address[field]).strip():
-                missing_fields.append(field)
+        # Strip each required field once; later checks reuse these values
+        stripped = {
+            field: str(value).strip() if (value := address.get(field)) else ""
+            for field in _REQUIRED_ADDRESS_FIELDS
+        }
+        missing_fields = [field for field in _REQUIRED_ADDRESS_FIELDS if not stripped[field]]
         
         if missing_fields:
             return {
@@ -137,27 +314,28 @@ class CheckoutValidator:
             }
         
         # Validate postal code format (basic validation)
-        postal_code = str(address["postal_code"]).strip()
-        country = str(address["country"]).upper()
+        # Case-fold the stripped values once; formatting below reuses them
+        postal_code = stripped["postal_code"].upper()
+        state = stripped["state"].upper()
+        country = stripped["country"].upper()
         
         if country == "US":
             # US ZIP code validation (5 digits or 5+4 format)
-            if not re.match(r'^\d{5}(-\d{4})?$', postal_code):
+            if not _is_us_zip(postal_code):
                 validation_errors.append({
                     "field": "postal_code",
                     "message": "Invalid US ZIP code format"
                 })
         elif country == "CA":
             # Canadian postal code validation
-            if not re.match(r'^[A-Z]\d[A-Z] \d[A-Z]\d$', postal_code.upper()):
+            if not _CA_POSTAL_RE.match(postal_code):
                 validation_errors.append({
                     "field": "postal_code",
                     "message": "Invalid Canadian postal code format"
                 })
         
         # Validate state/province for US/CA
-        if country in ["US", "CA"]:
-            state = str(address["state"]).strip()
+        if country in ("US", "CA"):
             if len(state) < 2:
                 validation_errors.append({
                     "field": "state",
@@ -174,15 +352,15 @@ class CheckoutValidator:
         
         # Format address consistently
         formatted_address = {
-            "first_name": str(address["first_name"]).strip().title(),
-            "last_name": str(address["last_name"]).strip().title(),
-            "address_line_1": str(address["address_line_1"]).strip(),
-            "address_line_2": str(address.get("address_line_2", "")).strip() or None,
-            "city": str(address["city"]).strip().title(),
-            "state": str(address["state"]).strip().upper(),
-            "postal_code": postal_code.upper(),
+            "first_name": stripped["first_name"].title(),
+            "last_name": stripped["last_name"].title(),
+            "address_line_1": stripped["address_line_1"],
+            "address_line_2": str(address.get("address_line_2") or "").strip() or None,
+            "city": stripped["city"].title(),
+            "state": state,
+            "postal_code": postal_code,
             "country": country,
-            "phone": str(address.get("phone", "")).strip() or None
+            "phone": str(address.get("phone") or "").strip() or None
         }
         
         return {
@@ -190,36 +368,39 @@ class CheckoutValidator:
             "formatted_address": formatted_address
         }
     
-    def validate_user_eligibility(self, user_id: int) -> Dict[str, Any]:
+    def validate_user_eligibility(self, user_id: int, session: Optional[Session] = None) -> Dict[str, Any]:
         """Validate user eligibility for checkout."""
-        with Session(engine) as session:
-            user = session.get(User, user_id)
-            
-            if not user:
-                return {
-                    "valid": False,
-                    "error_type": "user_not_found",
-                    "message": "User not found"
-                }
-            
-            if user.status.value != "active":
-                return {
-                    "valid": False,
-                    "error_type": "user_inactive",
-                    "message": "User account is not active"
-                }
-            
-            # Check for email verification if required
-            if not user.email_verified and os.getenv("REQUIRE_EMAIL_VERIFICATION", "false").lower() == "true":
-                return {
-                    "valid": False,
-                    "error_type": "email_not_verified",
-                    "message": "Email verification required for checkout"
-                }
-            
-            return {"valid": True, "user": user}
+        if session is None:
+            with Session(engine) as session:
+                return self.validate_user_eligibility(user_id, session)
+        
+        user = session.get(User, user_id)
+        
+        if not user:
+            return {
+                "valid": False,
+                "error_type": "user_not_found",
+                "message": "User not found"
+            }
+        
+        if user.status.value != "active":
+            return {
+                "valid": False,
+                "error_type": "user_inactive",
+                "message": "User account is not active"
+            }
+        
+        # Check for email verification if required
+        if not user.email_verified and os.getenv("REQUIRE_EMAIL_VERIFICATION", "false").lower() == "true":
+            return {
+                "valid": False,
+                "error_type": "email_not_verified",
+                "message": "Email verification required for checkout"
+            }
+        
+        return {"valid": True, "user": user}
     
-    def create_checkout_session(
+    async def create_checkout_session(
         self, 
         user_id: int, 
         cart_id: int, 
@@ -227,18 +408,10 @@ class CheckoutValidator:
     ) -> Dict[str, Any]:
         """Create a checkout session with validation and timeout."""
         
-        # Validate user eligibility
-        user_validation = self.validate_user_eligibility(user_id)
-        if not user_validation["valid"]:
-            return user_validation
-        
-        # Validate inventory
-        inventory_validation = self.validate_inventory(cart_id)
-        if not inventory_validation["valid"]:
-            return inventory_validation
-        
-        # Validate pricing
-        pricing_validation = self.validate_pricing(cart_id)
+        # Validate user eligibility, inventory and pricing on one connection
+        pricing_validation = await run_in_threadpool(
+            self._validate_for_checkout, user_id, cart_id
+        )
         if not pricing_validation["valid"]:
             return pricing_validation
         
@@ -248,8 +421,12 @@ class CheckoutValidator:
             return address_validation
         
         # Create checkout session
-        session_id = f"checkout_{user_id}_{cart_id}_{int(datetime.utcnow().timestamp())}"
-        expires_at = datetime.utcnow() + timedelta(minutes=self.checkout_session_timeout)
+        # Random suffix so repeated submits within a second get distinct sessions
+        session_id = f"checkout_{user_id}_{cart_id}_{secrets.token_hex(8)}"
+        # One clock read per request; expiry stays epoch seconds and the
+        # audit timestamp is the same instant in aware UTC
+        now = time.time()
+        expires_at = int(now) + self.checkout_session_timeout * 60
         
         session_data = {
             "session_id": session_id,
@@ -257,50 +434,65 @@ class CheckoutValidator:
             "cart_id": cart_id,
             "shipping_address": address_validation["formatted_address"],
             "pricing": pricing_validation["pricing"],
-            "created_at": datetime.utcnow().isoformat(),
-            "expires_at": expires_at.isoformat(),
+            "pricing_fingerprint": _pricing_fingerprint(pricing_validation["pricing"]),
+            "created_at": datetime.fromtimestamp(now, timezone.utc).isoformat(),
+            "expires_at": expires_at,
             "status": "active"
         }
         
-        # Store session in Redis with expiration
-        try:
-            cache_key = f"checkout_session:{session_id}"
-            self.redis_service.set_json(
-                cache_key, 
-                session_data, 
-                expire=self.checkout_session_timeout * 60
-            )
-        except Exception:
-            # If Redis fails, continue without caching
-            pass
+        # Store session in Redis with expiration; if Redis is down the
+        # service logs it and checkout continues without caching
+        await self._save_checkout_session(
+            session_id, session_data, self.checkout_session_timeout * 60
+        )
         
         return {
             "valid": True,
             "checkout_session": session_data
         }
     
-    def get_checkout_session(self, session_id: str) -> Optional[Dict[str, Any]]:
-        """Retrieve checkout session data."""
-        try:
-            cache_key = f"checkout_session:{session_id}"
-            session_data = self.redis_service.get_json(cache_key)
+    def _validate_for_checkout(self, user_id: int, cart_id: int) -> Dict[str, Any]:
+        """Run the user, inventory and pricing checks in order within a single session."""
+        with Session(engine) as session:
+            user_validation = self.validate_user_eligibility(user_id, session)
+            if not user_validation["valid"]:
+                return user_validation
             
-            if session_data:
-                # Check if session is expired
-                expires_at = datetime.fromisoformat(session_data["expires_at"])
-                if expires_at < datetime.utcnow():
-                    self.redis_service.delete(cache_key)
-                    return None
-                
-                return session_data
-        except Exception:
-            pass
-        
-        return None
+            return self.validate_inventory_and_pricing(cart_id, session)
     
-    def validate_checkout_session(self, session_id: str) -> Dict[str, Any]:
-        """Validate checkout session and re-validate all data."""
-        session_data = self.get_checkout_session(session_id)
+    async def get_checkout_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Retrieve checkout session data."""
+        cache_key = f"checkout_session:{session_id}"
+        cached_session = self._get_cached_session(session_id)
+        if cached_session is None:
+            cached_session = await self.redis_service.get(cache_key)
+            if cached_session is None:
+                return None
+            self._cache_session(session_id, cached_session)
+        
+        session_data = json.loads(cached_session)
+        
+        # Redis TTL already evicts expired sessions; this guards the last
+        # second with an int compare instead of parsing a timestamp
+        if session_data["expires_at"] < time.time():
+            self._session_cache.pop(session_id, None)
+            await self.redis_service.delete(cache_key)
+            return None
+        
+        return session_data
+    
+    async def validate_checkout_session(
+        self, 
+        session_id: str, 
+        session_data: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Validate checkout session and re-validate all data.
+        
+        Callers that already fetched the session can pass it in to skip a
+        second Redis round-trip.
+        """
+        if session_data is None:
+            session_data = await self.get_checkout_session(session_id)
         
         if not session_data:
             return {
@@ -312,42 +504,75 @@ class CheckoutValidator:
         # Re-validate inventory and pricing
         cart_id = session_data["cart_id"]
         
-        inventory_validation = self.validate_inventory(cart_id)
-        if not inventory_validation["valid"]:
-            return inventory_validation
-        
-        pricing_validation = self.validate_pricing(cart_id)
+        pricing_validation = await run_in_threadpool(
+            self.validate_inventory_and_pricing, cart_id
+        )
         if not pricing_validation["valid"]:
             return pricing_validation
         
         # Update session with latest pricing if changed
-        if pricing_validation["pricing"] != session_data["pricing"]:
+        fingerprint = _pricing_fingerprint(pricing_validation["pricing"])
+        if fingerprint != session_data.get("pricing_fingerprint"):
+            # Validation may have outlived the session; never write it back
+            # past its expiry or with a refreshed TTL
+            now = time.time()
+            remaining = session_data["expires_at"] - now
+            if remaining <= 0:
+                return {
+                    "valid": False,
+                    "error_type": "session_expired",
+                    "message": "Checkout session has expired"
+                }
+            
             session_data["pricing"] = pricing_validation["pricing"]
-            session_data["updated_at"] = datetime.utcnow().isoformat()
+            session_data["pricing_fingerprint"] = fingerprint
+            session_data["updated_at"] = datetime.fromtimestamp(now, timezone.utc).isoformat()
             
-            try:
-                cache_key = f"checkout_session:{session_id}"
-                self.redis_service.set_json(
-                    cache_key, 
-                    session_data, 
-                    expire=self.checkout_session_timeout * 60
-                )
-            except Exception:
-                pass
+            await self._save_checkout_session(
+                session_id, session_data, max(int(remaining), 1)
+            )
         
         return {
             "valid": True,
             "session_data": session_data
         }
     
-    def invalidate_checkout_session(self, session_id: str) -> bool:
-        """Invalidate checkout session."""
-        try:
-            cache_key = f"checkout_session:{session_id}"
-            self.redis_service.delete(cache_key)
-            return True
-        except Exception:
-            return False
+    async def _save_checkout_session(
+        self, 
+        session_id: str, 
+        session_data: Dict[str, Any], 
+        expire: int
+    ) -> None:
+        blob = _SESSION_ENCODER.encode(session_data)
+        # Only mirror what Redis actually holds, so other workers agree
+        if await self.redis_service.set(f"checkout_session:{session_id}", blob, expire=expire):
+            self._cache_session(session_id, blob)
+        else:
+            self._session_cache.pop(session_id, None)
+    
+    def _get_cached_session(self, session_id: str) -> Optional[str]:
+        cached = self._session_cache.get(session_id)
+        if not cached:
+            return None
+        if cached[0] <= time.monotonic():
+            self._session_cache.pop(session_id, None)
+            return None
+        return cached[1]
+    
+    def _cache_session(self, session_id: str, blob: str) -> None:
+        if SESSION_CACHE_TTL <= 0:
+            return
+        if len(self._session_cache) >= SESSION_CACHE_MAX_SIZE:
+            self._session_cache.pop(next(iter(self._session_cache)), None)
+        self._session_cache[session_id] = (time.monotonic() + SESSION_CACHE_TTL, blob)
+    
+    async def invalidate_checkout_session(self, *session_ids: str) -> bool:
+        """Invalidate one or more checkout sessions with a single DEL."""
+        for session_id in session_ids:
+            self._session_cache.pop(session_id, None)
+        return await self.redis_service.delete(
+            *(f"checkout_session:{session_id}" for session_id in session_ids)
+        )
     
     def calculate_tax(self, subtotal: Decimal, shipping_address: Dict[str, Any]) -> Decimal:
         """Calculate tax based on shipping address."""
@@ -355,20 +580,11 @@ class CheckoutValidator:
         state = shipping_address.get("state", "").upper()
         country = shipping_address.get("country", "").upper()
         
-        # US state tax rates (simplified)
-        us_tax_rates = {
-            "CA": 0.0875,  # California
-            "NY": 0.08,    # New York
-            "TX": 0.0625,  # Texas
-            "FL": 0.06,    # Florida
-            # Add more states as needed
-        }
-        
-        if country == "US" and state in us_tax_rates:
-            tax_rate = Decimal(str(us_tax_rates[state]))
+        if country == "US" and state in _US_TAX_RATES:
+            tax_rate = _US_TAX_RATES[state]
         else:
             # Default tax rate
-            tax_rate = Decimal(str(self.tax_rate))
+            tax_rate = self._tax_rate_dec
         
         return subtotal * tax_rate
     
@@ -382,11 +598,15 @@ class CheckoutValidator:
         total_weight = Decimal("0.0")
         
         with Session(engine) as session:
-            for item in cart_items:
-                product = session.get(Product, item["product_id"])
-                if product and product.weight:
-                    item_weight = product.weight * item["quantity"]
-                    total_weight += item_weight
+            product_ids = [item["product_id"] for item in cart_items]
+            weights = dict(session.exec(
+                select(Product.id, Product.weight).where(Product.id.in_(product_ids))
+            ).all())
+        
+        for item in cart_items:
+            weight = weights.get(item["product_id"])
+            if weight:
+                total_weight += weight * item["quantity"]
         
         # Base shipping rate
         base_rate = Decimal("5.99")
@@ -398,9 +618,9 @@ class CheckoutValidator:
         
         # Distance-based adjustment (simplified)
         state = shipping_address.get("state", "").upper()
-        if state in ["CA", "OR", "WA"]:  # West Coast
+        if state in _WEST_COAST_STATES:
             base_rate += Decimal("2.00")
-        elif state in ["NY", "NJ", "CT"]:  # East Coast
+        elif state in _EAST_COAST_STATES:
             base_rate += Decimal("1.50")
         
         return base_rate
\ No newline at end of file
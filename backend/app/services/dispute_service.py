@@ -2,25 +2,53 @@
 Dispute resolution service for handling order disputes and customer support.
 """
 
+import os
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from decimal import Decimal
+from typing import List, Optional, Dict, Any, Iterable, Tuple
 
-from sqlmodel import Session, select, and_, or_, func
-from fastapi import HTTPException
+from sqlalchemy import case
+from sqlmodel import Session, select, update, and_, or_, func
+from fastapi import BackgroundTasks, HTTPException
 
 from ..models import (
     Dispute, DisputeMessage, DisputeStatus, DisputeType,
-    Order, User, OrderItem, Product
+    Order, User, OrderItem, Product, UserRole
 )
 from ..database import engine
 from .notification_service import NotificationService
 
+# Whether a non-admin may see a dispute only depends on its filer and the
+# order's parties, so answers are kept briefly instead of re-queried per call.
+# Keys carry filed_by/order_id so a changed dispute never hits a stale entry.
+# Nothing evicts entries: changes to the order's parties, such as reassigned
+# order items, apply once the entry expires.
+# The admin role is never cached; a demotion applies on the next request.
+ACCESS_CACHE_TTL = float(os.getenv("DISPUTE_ACCESS_CACHE_TTL", "60"))
+ACCESS_CACHE_MAX_SIZE = 10000
+
+# Starting priority per dispute type; high-value orders add one
+_BASE_PRIORITY: Dict[DisputeType, int] = {
+    DisputeType.ORDER_NOT_RECEIVED: 4,
+    DisputeType.DAMAGED_ITEM: 3,
+    DisputeType.WRONG_ITEM: 3,
+    DisputeType.ITEM_NOT_AS_DESCRIBED: 2,
+    DisputeType.QUALITY_ISSUE: 2,
+    DisputeType.REFUND_REQUEST: 1,
+    DisputeType.OTHER: 1
+}
+_HIGH_VALUE_ORDER_TOTAL = Decimal("100")
+
 
 class DisputeService:
     """Service for managing disputes and customer support."""
     
     def __init__(self):
         self.notification_service = NotificationService()
+        self._access_cache: Dict[Tuple[int, int, int, int], Tuple[float, bool]] = {}
+        self._cache_lock = threading.Lock()
     
     def create_dispute(
         self,
@@ -29,43 +57,42 @@ class DisputeService:
         dispute_type: DisputeType,
         subject: str,
         description: str,
-        evidence_urls: Optional[List[str]] = None
+        evidence_urls: Optional[List[str]] = None,
+        background_tasks: Optional[BackgroundTasks] = None
     ) -> Dict[str, Any]:
         """Create a new dispute for an order."""
         
         with Session(engine) as session:
-            # Verify order exists and user has access
-            order = session.get(Order, order_id)
-            if not order:
+            # Verify order exists and, in the same query, whether the user
+            # has items in it (farmer)
+            row = session.exec(
+                select(Order, func.count(OrderItem.id).filter(OrderItem.farmer_id == filed_by))
+                .join(OrderItem, OrderItem.order_id == Order.id, isouter=True)
+                .where(Order.id == order_id)
+                .group_by(Order.id)
+            ).first()
+            if not row:
                 raise HTTPException(status_code=404, detail="Order not found")
+            order, farmer_item_count = row
             
             # Check if user is buyer or has items in the order (farmer)
-            user_can_dispute = (
-                order.buyer_id == filed_by or
-                session.exec(
-                    select(OrderItem).where(
-                        and_(
-                            OrderItem.order_id == order_id,
-                            OrderItem.farmer_id == filed_by
-                        )
-                    )
-                ).first() is not None
-            )
+            user_can_dispute = order.buyer_id == filed_by or farmer_item_count > 0
             
             if not user_can_dispute:
                 raise HTTPException(status_code=403, detail="Access denied")
             
-            # Check if dispute already exists for this order
-            existing_dispute = session.exec(
-                select(Dispute).where(
+            # Check if dispute already exists for this order; only existence
+            # matters, so probe the (order_id, status) index for one id
+            existing_dispute_id = session.exec(
+                select(Dispute.id).where(
                     and_(
                         Dispute.order_id == order_id,
                         Dispute.status.in_([DisputeStatus.OPEN, DisputeStatus.IN_REVIEW])
                     )
-                )
+                ).limit(1)
             ).first()
             
-            if existing_dispute:
+            if existing_dispute_id is not None:
                 raise HTTPException(
                     status_code=400,
                     detail="An active dispute already exists for this order"
@@ -87,7 +114,7 @@ class DisputeService:
             session.refresh(dispute)
             
             # Send notifications
-            self._send_dispute_notifications(dispute, "created")
+            self._queue_dispute_notifications([dispute.id], "created", background_tasks)
             
             return {
                 "id": dispute.id,
@@ -106,7 +133,9 @@ class DisputeService:
         sender_id: int,
         message: str,
         is_internal: bool = False,
-        attachments: Optional[List[str]] = None
+        attachments: Optional[List[str]] = None,
+        background_tasks: Optional[BackgroundTasks] = None,
+        sender_role: Optional[UserRole] = None
     ) -> Dict[str, Any]:
         """Add a message to a dispute."""
         
@@ -116,7 +145,7 @@ class DisputeService:
                 raise HTTPException(status_code=404, detail="Dispute not found")
             
             # Check permissions
-            if not self._user_can_access_dispute(dispute, sender_id, session):
+            if not self._user_can_access_dispute(dispute, sender_id, session, sender_role):
                 raise HTTPException(status_code=403, detail="Access denied")
             
             # Create message
@@ -141,7 +170,7 @@ class DisputeService:
             
             # Send notifications (except for internal messages)
             if not is_internal:
-                self._send_dispute_notifications(dispute, "message_added")
+                self._queue_dispute_notifications([dispute_id], "message_added", background_tasks)
             
             return {
                 "id": dispute_message.id,
@@ -155,14 +184,15 @@ class DisputeService:
         dispute_id: int,
         new_status: DisputeStatus,
         admin_id: int,
-        resolution: Optional[str] = None
+        resolution: Optional[str] = None,
+        background_tasks: Optional[BackgroundTasks] = None,
+        admin_role: Optional[UserRole] = None
     ) -> Dict[str, Any]:
         """Update dispute status (admin only)."""
         
         with Session(engine) as session:
             # Verify admin permissions
-            admin = session.get(User, admin_id)
-            if not admin or admin.role.value != "admin":
+            if not self._is_admin(admin_id, session, admin_role):
                 raise HTTPException(status_code=403, detail="Admin access required")
             
             dispute = session.get(Dispute, dispute_id)
@@ -185,7 +215,7 @@ class DisputeService:
             session.commit()
             
             # Send notifications
-            self._send_dispute_notifications(dispute, "status_updated")
+            self._queue_dispute_notifications([dispute_id], "status_updated", background_tasks)
             
             return {
                 "id": dispute.id,
@@ -199,7 +229,8 @@ class DisputeService:
     def get_dispute_details(
         self,
         dispute_id: int,
-        user_id: int
+        user_id: int,
+        user_role: Optional[UserRole] = None
     ) -> Dict[str, Any]:
         """Get detailed dispute information."""
         
@@ -209,15 +240,14 @@ class DisputeService:
                 raise HTTPException(status_code=404, detail="Dispute not found")
             
             # Check permissions
-            if not self._user_can_access_dispute(dispute, user_id, session):
+            if not self._user_can_access_dispute(dispute, user_id, session, user_role):
                 raise HTTPException(status_code=403, detail="Access denied")
             
             # Get order details
             order = session.get(Order, dispute.order_id)
             
             # Get dispute messages (exclude internal if not admin)
-            user = session.get(User, user_id)
-            is_admin = user and user.role.value == "admin"
+            is_admin = self._is_admin(user_id, session, user_role)
             
             messages_query = select(DisputeMessage, User).join(
                 User, DisputeMessage.sender_id == User.id
@@ -229,11 +259,15 @@ class DisputeService:
             messages_query = messages_query.order_by(DisputeMessage.created_at.asc())
             messages_result = session.exec(messages_query).all()
             
-            # Get filed by user info
-            filed_by_user = session.get(User, dispute.filed_by)
-            resolved_by_user = None
-            if dispute.resolved_by:
-                resolved_by_user = session.get(User, dispute.resolved_by)
+            # Filer and resolver come back from one IN lookup
+            user_ids = {dispute.filed_by, dispute.resolved_by} - {None}
+            users_by_id = {
+                user.id: user for user in session.exec(
+                    select(User).where(User.id.in_(user_ids))
+                ).all()
+            }
+            filed_by_user = users_by_id.get(dispute.filed_by)
+            resolved_by_user = users_by_id.get(dispute.resolved_by)
             
             return {
                 "id": dispute.id,
@@ -289,7 +323,7 @@ class DisputeService:
         
         with Session(engine) as session:
             # Get disputes where user is involved (filed by them or has items in the order)
-            query = select(Dispute).where(
+            filters = [
                 or_(
                     Dispute.filed_by == user_id,
                     Dispute.order_id.in_(
@@ -299,26 +333,32 @@ class DisputeService:
                         select(Order.id).where(Order.buyer_id == user_id)
                     )
                 )
-            )
+            ]
             
             if status_filter:
-                query = query.where(Dispute.status.in_(status_filter))
+                filters.append(Dispute.status.in_(status_filter))
             
-            # Get total count
+            # Get total count straight off the filters, no wrapping subquery
             total_count = session.exec(
-                select(func.count()).select_from(query.subquery())
+                select(func.count(Dispute.id)).where(*filters)
             ).one()
             
-            # Apply pagination and ordering
-            query = query.order_by(Dispute.created_at.desc()).offset(offset).limit(limit)
-            disputes = session.exec(query).all()
+            # Apply pagination and ordering; the order total and filer name
+            # come back on the same rows instead of one lookup each per dispute
+            query = (
+                select(Dispute, Order.total, User.name)
+                .join(Order, Order.id == Dispute.order_id, isouter=True)
+                .join(User, User.id == Dispute.filed_by, isouter=True)
+                .where(*filters)
+                .order_by(Dispute.created_at.desc())
+                .offset(offset)
+                .limit(limit)
+            )
+            rows = session.exec(query).all()
             
             # Format results
             results = []
-            for dispute in disputes:
-                order = session.get(Order, dispute.order_id)
-                filed_by_user = session.get(User, dispute.filed_by)
-                
+            for dispute, order_total, filed_by_name in rows:
                 results.append({
                     "id": dispute.id,
                     "order_id": dispute.order_id,
@@ -326,8 +366,8 @@ class DisputeService:
                     "status": dispute.status,
                     "subject": dispute.subject,
                     "priority": dispute.priority,
-                    "filed_by_name": filed_by_user.name if filed_by_user else None,
-                    "order_total": float(order.total) if order else 0,
+                    "filed_by_name": filed_by_name,
+                    "order_total": float(order_total) if order_total is not None else 0,
                     "created_at": dispute.created_at.isoformat(),
                     "updated_at": dispute.updated_at.isoformat()
                 })
@@ -346,50 +386,52 @@ class DisputeService:
         status_filter: Optional[List[DisputeStatus]] = None,
         priority_filter: Optional[List[int]] = None,
         limit: int = 50,
-        offset: int = 0
+        offset: int = 0,
+        admin_role: Optional[UserRole] = None
     ) -> Dict[str, Any]:
         """Get all disputes for admin review."""
         
         with Session(engine) as session:
             # Verify admin permissions
-            admin = session.get(User, admin_id)
-            if not admin or admin.role.value != "admin":
+            if not self._is_admin(admin_id, session, admin_role):
                 raise HTTPException(status_code=403, detail="Admin access required")
             
-            query = select(Dispute)
+            filters = []
             
             if status_filter:
-                query = query.where(Dispute.status.in_(status_filter))
+                filters.append(Dispute.status.in_(status_filter))
             
             if priority_filter:
-                query = query.where(Dispute.priority.in_(priority_filter))
+                filters.append(Dispute.priority.in_(priority_filter))
             
-            # Get total count
+            # Get total count straight off the filters, no wrapping subquery
             total_count = session.exec(
-                select(func.count()).select_from(query.subquery())
+                select(func.count(Dispute.id)).where(*filters)
             ).one()
             
-            # Apply pagination and ordering (high priority first, then by creation date)
-            query = query.order_by(
-                Dispute.priority.desc(),
-                Dispute.created_at.desc()
-            ).offset(offset).limit(limit)
+            # Apply pagination and ordering (high priority first, then by creation date);
+            # order and filer come back joined rather than fetched per dispute
+            query = (
+                select(Dispute, Order.total, User)
+                .join(Order, Order.id == Dispute.order_id, isouter=True)
+                .join(User, User.id == Dispute.filed_by, isouter=True)
+                .where(*filters)
+                .order_by(Dispute.priority.desc(), Dispute.created_at.desc())
+                .offset(offset)
+                .limit(limit)
+            )
+            rows = session.exec(query).all()
             
-            disputes = session.exec(query).all()
+            # Message counts for the whole page in one grouped query
+            message_counts = dict(session.exec(
+                select(DisputeMessage.dispute_id, func.count(DisputeMessage.id))
+                .where(DisputeMessage.dispute_id.in_([dispute.id for dispute, _, _ in rows]))
+                .group_by(DisputeMessage.dispute_id)
+            ).all()) if rows else {}
             
             # Format results with additional admin info
             results = []
-            for dispute in disputes:
-                order = session.get(Order, dispute.order_id)
-                filed_by_user = session.get(User, dispute.filed_by)
-                
-                # Get message count
-                message_count = session.exec(
-                    select(func.count()).select_from(
-                        select(DisputeMessage).where(DisputeMessage.dispute_id == dispute.id).subquery()
-                    )
-                ).one()
-                
+            for dispute, order_total, filed_by_user in rows:
                 results.append({
                     "id": dispute.id,
                     "order_id": dispute.order_id,
@@ -402,8 +444,8 @@ class DisputeService:
                         "name": filed_by_user.name,
                         "role": filed_by_user.role
                     } if filed_by_user else None,
-                    "order_total": float(order.total) if order else 0,
-                    "message_count": message_count,
+                    "order_total": float(order_total) if order_total is not None else 0,
+                    "message_count": message_counts.get(dispute.id, 0),
                     "days_open": (datetime.utcnow() - dispute.created_at).days,
                     "created_at": dispute.created_at.isoformat(),
                     "updated_at": dispute.updated_at.isoformat()
@@ -417,37 +459,44 @@ class DisputeService:
                 "has_more": offset + len(results) < total_count
             }
     
-    def auto_escalate_disputes(self) -> Dict[str, Any]:
+    def auto_escalate_disputes(
+        self,
+        background_tasks: Optional[BackgroundTasks] = None
+    ) -> Dict[str, Any]:
         """Automatically escalate disputes based on rules (called by scheduler)."""
         
         with Session(engine) as session:
-            # Escalate disputes that are open for more than 3 days
-            escalation_date = datetime.utcnow() - timedelta(days=3)
-            
-            disputes_to_escalate = session.exec(
-                select(Dispute).where(
+            # Escalate disputes that are open for more than 3 days; one naive
+            # UTC clock for the cutoff and the stamps, like created_at
+            now = datetime.utcnow()
+            escalation_date = now - timedelta(days=3)
+            
+            # One UPDATE ... RETURNING instead of loading and dirtying each row
+            escalated_ids = session.exec(
+                update(Dispute)
+                .where(
                     and_(
                         Dispute.status == DisputeStatus.OPEN,
                         Dispute.created_at <= escalation_date,
                         Dispute.escalated_at.is_(None)
                     )
                 )
-            ).all()
-            
-            escalated_count = 0
-            for dispute in disputes_to_escalate:
-                dispute.status = DisputeStatus.ESCALATED
-                dispute.escalated_at = datetime.utcnow()
-                dispute.priority = min(dispute.priority + 1, 5)
-                dispute.updated_at = datetime.utcnow()
-                session.add(dispute)
-                escalated_count += 1
-                
-                # Send escalation notifications
-                self._send_dispute_notifications(dispute, "escalated")
+                .values(
+                    status=DisputeStatus.ESCALATED,
+                    escalated_at=now,
+                    updated_at=now,
+                    priority=case((Dispute.priority >= 5, 5), else_=Dispute.priority + 1)
+                )
+                .returning(Dispute.id)
+            ).scalars().all()
+            escalated_count = len(escalated_ids)
             
             session.commit()
             
+            # Send escalation notifications once the batch is committed
+            if escalated_ids:
+                self._queue_dispute_notifications(escalated_ids, "escalated", background_tasks)
+            
             return {
                 "escalated_count": escalated_count,
                 "message": f"Escalated {escalated_count} disputes"
@@ -456,23 +505,21 @@ class DisputeService:
     def _calculate_dispute_priority(self, dispute_type: DisputeType, order: Order) -> int:
         """Calculate dispute priority based on type and order value."""
         
-        base_priority = {
-            DisputeType.ORDER_NOT_RECEIVED: 4,
-            DisputeType.DAMAGED_ITEM: 3,
-            DisputeType.WRONG_ITEM: 3,
-            DisputeType.ITEM_NOT_AS_DESCRIBED: 2,
-            DisputeType.QUALITY_ISSUE: 2,
-            DisputeType.REFUND_REQUEST: 1,
-            DisputeType.OTHER: 1
-        }.get(dispute_type, 1)
+        base_priority = _BASE_PRIORITY.get(dispute_type, 1)
         
         # Increase priority for high-value orders
-        if order.total > 100:
+        if order.total > _HIGH_VALUE_ORDER_TOTAL:
             base_priority = min(base_priority + 1, 5)
         
         return base_priority
     
-    def _user_can_access_dispute(self, dispute: Dispute, user_id: int, session: Session) -> bool:
+    def _user_can_access_dispute(
+        self,
+        dispute: Dispute,
+        user_id: int,
+        session: Session,
+        user_role: Optional[UserRole] = None
+    ) -> bool:
         """Check if user can access dispute."""
         
         # User filed the dispute
@@ -480,29 +527,64 @@ class DisputeService:
             return True
         
         # User is admin
-        user = session.get(User, user_id)
-        if user and user.role.value == "admin":
+        if self._is_admin(user_id, session, user_role):
             return True
         
-        # User is buyer of the order
-        order = session.get(Order, dispute.order_id)
-        if order and order.buyer_id == user_id:
-            return True
+        key = (dispute.id, user_id, dispute.filed_by, dispute.order_id)
+        with self._cache_lock:
+            cached = self._access_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
         
-        # User is farmer with items in the order
-        farmer_items = session.exec(
-            select(OrderItem).where(
-                and_(
-                    OrderItem.order_id == dispute.order_id,
-                    OrderItem.farmer_id == user_id
-                )
-            )
+        allowed = self._check_dispute_access(dispute, user_id, session)
+        if ACCESS_CACHE_TTL > 0:
+            with self._cache_lock:
+                if len(self._access_cache) >= ACCESS_CACHE_MAX_SIZE:
+                    self._access_cache.pop(next(iter(self._access_cache)), None)
+                self._access_cache[key] = (time.monotonic() + ACCESS_CACHE_TTL, allowed)
+        return allowed
+    
+    def _is_admin(self, user_id: int, session: Session, role: Optional[UserRole] = None) -> bool:
+        # Routers pass the role of the user they just loaded; otherwise look it up
+        if role is None:
+            user = session.get(User, user_id)
+            if not user:
+                return False
+            role = user.role
+        return role == UserRole.ADMIN
+    
+    def _check_dispute_access(self, dispute: Dispute, user_id: int, session: Session) -> bool:
+        # User is buyer of the order or farmer with items in it, in one query
+        row = session.exec(
+            select(Order.buyer_id, func.count(OrderItem.id).filter(OrderItem.farmer_id == user_id))
+            .join(OrderItem, OrderItem.order_id == Order.id, isouter=True)
+            .where(Order.id == dispute.order_id)
+            .group_by(Order.id)
         ).first()
+        if not row:
+            return False
         
-        return farmer_items is not None
+        buyer_id, farmer_item_count = row
+        return buyer_id == user_id or farmer_item_count > 0
+    
+    def _queue_dispute_notifications(
+        self,
+        dispute_ids: List[int],
+        event_type: str,
+        background_tasks: Optional[BackgroundTasks]
+    ) -> None:
+        """Defer notifications until after the response when called from a request."""
+        if background_tasks is not None:
+            background_tasks.add_task(self._send_dispute_notifications, dispute_ids, event_type)
+        else:
+            self._send_dispute_notifications(dispute_ids, event_type)
     
-    def _send_dispute_notifications(self, dispute: Dispute, event_type: str) -> None:
-        """Send notifications for dispute events."""
+    def _send_dispute_notifications(self, dispute_ids: Iterable[int], event_type: str) -> None:
+        """Send notifications for dispute events.
+        
+        Takes ids rather than Dispute rows so it can run after the request's
+        session has closed; a real implementation reloads what it needs.
+        """
         
         # This would integrate with the notification service
         # For now, just a placeholder
@@ -6,15 +6,92 @@ Supports multiple email providers with fallback mechanisms
 import os
 import smtplib
 import logging
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Dict, Optional, List
 import requests
+from requests.adapters import HTTPAdapter
 import json
 
 logger = logging.getLogger(__name__)
 
 
+def _pooled_session() -> requests.Session:
+    """HTTP session that keeps TLS connections to the provider API alive between sends."""
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20))
+    return session
+
+
+# OTP email bodies, split once around the code so a send only concatenates
+_OTP_SUBJECT = "Your AgriDAO Verification Code"
+
+_OTP_HTML_PREFIX, _OTP_HTML_SUFFIX = """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body { font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; }
+                .header { background: linear-gradient(to right, #1e40af, #059669); padding: 30px 20px; text-align: center; }
+                .logo-container { display: flex; align-items: center; justify-content: center; gap: 8px; }
+                .leaf-icon { font-size: 32px; line-height: 1; }
+                .logo-text { font-size: 28px; font-weight: bold; color: white; }
+                .content { padding: 30px; }
+                .code { 
+                    font-size: 36px; 
+                    font-weight: bold; 
+                    color: #22c55e; 
+                    letter-spacing: 8px; 
+                    text-align: center; 
+                    padding: 20px; 
+                    background: #f3f4f6; 
+                    border-radius: 8px;
+                    margin: 20px 0;
+                }
+                .footer { 
+                    text-align: center; 
+                    padding: 20px; 
+                    color: #6b7280; 
+                    font-size: 12px; 
+                }
+            </style>
+        </head>
+        <body>
+            <div class="header">
+                <div class="logo-container">
+                    <span class="leaf-icon">🌱</span>
+                    <span class="logo-text">AgriDAO</span>
+                </div>
+            </div>
+            <div class="content">
+                <h2>Verify Your Email</h2>
+                <p>Enter this code to complete your verification:</p>
+                <div class="code">{otp_code}</div>
+                <p><strong>This code expires in 5 minutes.</strong></p>
+                <p>If you didn't request this code, please ignore this email.</p>
+            </div>
+            <div class="footer">
+                <p>© 2025 AgriDAO - Agricultural Marketplace</p>
+                <p>This is an automated message, please do not reply.</p>
+            </div>
+        </body>
+        </html>
+        """.split("{otp_code}")
+
+_OTP_TEXT_PREFIX, _OTP_TEXT_SUFFIX = """
+        AgriDAO - Email Verification
+        
+        Your verification code is: {otp_code}
+        
+        This code expires in 5 minutes.
+        
+        If you didn't request this code, please ignore this email.
+        
+        © 2025 AgriDAO
+        """.split("{otp_code}")
+
+
 class EmailProvider:
     """Base class for email providers"""
     
@@ -40,6 +117,43 @@ class GmailProvider(EmailProvider):
         self.from_name = os.getenv("FROM_NAME", "AgriDAO")
         
         self.enabled = bool(self.username and self.password)
+        
+        # One authenticated connection is kept open and reused across sends;
+        # smtplib connections are not thread-safe, so sends are serialized
+        self._server: Optional[smtplib.SMTP] = None
+        self._lock = threading.Lock()
+    
+    def _connect(self) -> smtplib.SMTP:
+        if self.smtp_port == 465:
+            # SSL connection
+            server = smtplib.SMTP_SSL(self.smtp_host, self.smtp_port)
+        else:
+            # TLS connection (port 587)
+            server = smtplib.SMTP(self.smtp_host, self.smtp_port)
+            server.starttls()
+        server.login(self.username, self.password)
+        return server
+    
+    def _close(self) -> None:
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+    
+    def _get_server(self) -> smtplib.SMTP:
+        """Return the open connection if the server still answers, else reconnect."""
+        if self._server is not None:
+            try:
+                if self._server.noop()[0] == 250:
+                    return self._server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close()
+        
+        self._server = self._connect()
+        return self._server
     
     def send_email(self, to_email: str, subject: str, html_body: str, text_body: str) -> bool:
         if not self.enabled:
@@ -54,23 +168,21 @@ class GmailProvider(EmailProvider):
             msg.attach(MIMEText(text_body, "plain"))
             msg.attach(MIMEText(html_body, "html"))
             
-            if self.smtp_port == 465:
-                # SSL connection
-                with smtplib.SMTP_SSL(self.smtp_host, self.smtp_port) as server:
-                    server.login(self.username, self.password)
-                    server.send_message(msg)
-            else:
-                # TLS connection (port 587)
-                with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                    server.starttls()
-                    server.login(self.username, self.password)
-                    server.send_message(msg)
+            with self._lock:
+                try:
+                    self._get_server().send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    # Dropped between the NOOP and the send; retry once on a fresh connection
+                    self._close()
+                    self._get_server().send_message(msg)
             
             logger.info(f"Email sent successfully via Gmail to {to_email}")
             return True
             
         except Exception as e:
             logger.error(f"Gmail send failed: {e}")
+            with self._lock:
+                self._close()
             return False
 
 
@@ -84,6 +196,7 @@ class SendGridProvider(EmailProvider):
         self.from_name = os.getenv("SENDGRID_FROM_NAME", "AgriDAO")
         
         self.enabled = bool(self.api_key and self.from_email)
+        self.session = _pooled_session()
     
     def send_email(self, to_email: str, subject: str, html_body: str, text_body: str) -> bool:
         if not self.enabled:
@@ -105,7 +218,7 @@ class SendGridProvider(EmailProvider):
                 ]
             }
             
-            response = requests.post(
+            response = self.session.post(
                 "https://api.sendgrid.com/v3/mail/send",
                 headers={
                     "Authorization": f"Bearer {self.api_key}",
@@ -138,13 +251,14 @@ class MailgunProvider(EmailProvider):
         self.from_name = os.getenv("MAILGUN_FROM_NAME", "AgriDAO")
         
         self.enabled = bool(self.api_key and self.domain)
+        self.session = _pooled_session()
     
     def send_email(self, to_email: str, subject: str, html_body: str, text_body: str) -> bool:
         if not self.enabled:
             return False
             
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"https://api.mailgun.net/v3/{self.domain}/messages",
                 auth=("api", self.api_key),
                 data={
@@ -192,73 +306,9 @@ class ProductionEmailService:
     def send_otp_email(self, email: str, otp_code: str) -> bool:
         """Send OTP email using available providers with fallback"""
         
-        subject = "Your AgriDAO Verification Code"
-        
-        # HTML email template
-        html_body = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; }}
-                .header {{ background: linear-gradient(to right, #1e40af, #059669); padding: 30px 20px; text-align: center; }}
-                .logo-container {{ display: flex; align-items: center; justify-content: center; gap: 8px; }}
-                .leaf-icon {{ font-size: 32px; line-height: 1; }}
-                .logo-text {{ font-size: 28px; font-weight: bold; color: white; }}
-                .content {{ padding: 30px; }}
-                .code {{ 
-                    font-size: 36px; 
-                    font-weight: bold; 
-                    color: #22c55e; 
-                    letter-spacing: 8px; 
-                    text-align: center; 
-                    padding: 20px; 
-                    background: #f3f4f6; 
-                    border-radius: 8px;
-                    margin: 20px 0;
-                }}
-                .footer {{ 
-                    text-align: center; 
-                    padding: 20px; 
-                    color: #6b7280; 
-                    font-size: 12px; 
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <div class="logo-container">
-                    <span class="leaf-icon">🌱</span>
-                    <span class="logo-text">AgriDAO</span>
-                </div>
-            </div>
-            <div class="content">
-                <h2>Verify Your Email</h2>
-                <p>Enter this code to complete your verification:</p>
-                <div class="code">{otp_code}</div>
-                <p><strong>This code expires in 5 minutes.</strong></p>
-                <p>If you didn't request this code, please ignore this email.</p>
-            </div>
-            <div class="footer">
-                <p>© 2025 AgriDAO - Agricultural Marketplace</p>
-                <p>This is an automated message, please do not reply.</p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        # Plain text version
-        text_body = f"""
-        AgriDAO - Email Verification
-        
-        Your verification code is: {otp_code}
-        
-        This code expires in 5 minutes.
-        
-        If you didn't request this code, please ignore this email.
-        
-        © 2025 AgriDAO
-        """
+        subject = _OTP_SUBJECT
+        html_body = _OTP_HTML_PREFIX + otp_code + _OTP_HTML_SUFFIX
+        text_body = _OTP_TEXT_PREFIX + otp_code + _OTP_TEXT_SUFFIX
         
         # Try each provider until one succeeds
         for provider in self.enabled_providers:
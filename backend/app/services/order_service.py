@@ -2,6 +2,7 @@
 Order management service with comprehensive status tracking and business logic.
 """
 
+from collections import defaultdict
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 from decimal import Decimal
@@ -328,19 +329,14 @@ class OrderService:
             
             orders = session.exec(query).all()
             
-            # Get items for each order that belong to this farmer
+            # Load this farmer's items for the whole page in one query
+            items_by_order = self._load_items_by_order(
+                session, [order.id for order in orders], farmer_id=farmer_id
+            )
+            
             result = []
             for order in orders:
-                items_query = select(OrderItem, Product).join(
-                    Product, OrderItem.product_id == Product.id
-                ).where(
-                    and_(
-                        OrderItem.order_id == order.id,
-                        OrderItem.farmer_id == farmer_id
-                    )
-                )
-                
-                items_result = session.exec(items_query).all()
+                items_result = items_by_order.get(order.id, [])
                 
                 result.append({
                     "id": order.id,
@@ -414,6 +410,7 @@ class OrderService:
             
             return {
                 "id": order_item.id,
+                "order_id": order_item.order_id,
                 "fulfillment_status": order_item.fulfillment_status,
                 "shipped_at": order_item.shipped_at.isoformat() if order_item.shipped_at else None,
                 "delivered_at": order_item.delivered_at.isoformat() if order_item.delivered_at else None,
@@ -775,15 +772,15 @@ class OrderService:
             
             orders = session.exec(query).all()
             
+            # Load items for the whole page in one query
+            items_by_order = self._load_items_by_order(
+                session, [order.id for order in orders]
+            )
+            
             # Format results
             results = []
             for order in orders:
-                # Get order items
-                items_query = select(OrderItem, Product).join(
-                    Product, OrderItem.product_id == Product.id
-                ).where(OrderItem.order_id == order.id)
-                
-                items_result = session.exec(items_query).all()
+                items_result = items_by_order.get(order.id, [])
                 
                 results.append({
                     "id": order.id,
@@ -1016,6 +1013,30 @@ class OrderService:
             
             return order
     
+    def _load_items_by_order(
+        self,
+        session: Session,
+        order_ids: List[int],
+        farmer_id: Optional[int] = None
+    ) -> Dict[int, List[Any]]:
+        """Fetch (OrderItem, Product) rows for many orders with a single IN query."""
+        
+        items_by_order: Dict[int, List[Any]] = defaultdict(list)
+        if not order_ids:
+            return items_by_order
+        
+        items_query = select(OrderItem, Product).join(
+            Product, OrderItem.product_id == Product.id
+        ).where(OrderItem.order_id.in_(order_ids))
+        
+        if farmer_id is not None:
+            items_query = items_query.where(OrderItem.farmer_id == farmer_id)
+        
+        for item, product in session.exec(items_query.order_by(OrderItem.id)).all():
+            items_by_order[item.order_id].append((item, product))
+        
+        return items_by_order
+    
     def _create_status_history(
         self,
         session: Session,
@@ -1,7 +1,7 @@
 import os
 import json
 import asyncio
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, List, Tuple
 from datetime import datetime, timedelta
 import redis.asyncio as redis
 from redis.asyncio import Redis
@@ -79,18 +79,60 @@ class RedisService:
             logger.error(f"Redis SET error for key {key}: {e}")
             return False
     
-    async def delete(self, key: str) -> bool:
-        """Delete key from Redis."""
+    async def mget(self, keys: List[str]) -> List[Optional[str]]:
+        """Get several keys in one round-trip; misses come back as None."""
+        if not self.redis_client or not keys:
+            return [None] * len(keys)
+        
+        try:
+            return await self.redis_client.mget(keys)
+        except Exception as e:
+            logger.error(f"Redis MGET error for {len(keys)} keys: {e}")
+            return [None] * len(keys)
+    
+    async def set_many(self, entries: List[Tuple[str, str, Optional[int]]]) -> bool:
+        """Set several (key, value, expire) entries in one pipelined round-trip."""
         if not self.redis_client:
             return False
+        if not entries:
+            return True
         
         try:
-            result = await self.redis_client.delete(key)
-            return result > 0
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, value, expire in entries:
+                pipe.set(key, value, ex=expire)
+            results = await pipe.execute()
+            return all(result is True for result in results)
         except Exception as e:
-            logger.error(f"Redis DELETE error for key {key}: {e}")
+            logger.error(f"Redis pipelined SET error for {len(entries)} keys: {e}")
             return False
     
+    async def delete(self, *keys: str) -> bool:
+        """Delete one or more keys from Redis in a single DEL."""
+        if not self.redis_client or not keys:
+            return False
+        
+        try:
+            result = await self.redis_client.delete(*keys)
+            return result > 0
+        except Exception as e:
+            logger.error(f"Redis DELETE error for keys {keys}: {e}")
+            return False
+
+    async def delete_pattern(self, pattern: str) -> int:
+        """Delete all keys matching a glob pattern. Returns number of keys removed."""
+        if not self.redis_client:
+            return 0
+
+        try:
+            keys = [key async for key in self.redis_client.scan_iter(match=pattern)]
+            if not keys:
+                return 0
+            return await self.redis_client.delete(*keys)
+        except Exception as e:
+            logger.error(f"Redis DELETE pattern error for {pattern}: {e}")
+            return 0
+
     async def incr(self, key: str) -> Optional[int]:
         """Increment counter in Redis."""
         if not self.redis_client:
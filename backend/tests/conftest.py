@@ -18,6 +18,7 @@ os.environ["JWT_SECRET"] = "test_secret"
 
 from app.main import app  # noqa: E402
 from app.database import engine  # noqa: E402
+from app.deps import _user_cache  # noqa: E402
 from app.models import User, UserRole  # noqa: E402
 from sqlmodel import SQLModel, Session  # noqa: E402
 
@@ -42,6 +43,8 @@ def _cleanup_db():
         # Delete all users to avoid conflicts
         session.exec(SQLModel.metadata.tables['user'].delete())
         session.commit()
+    # Ids are reused across tests, so drop users cached by get_current_user
+    _user_cache.clear()
 
 
 @pytest.fixture()
@@ -1,9 +1,13 @@
+import time
+import jwt
 import pytest
 from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
 from sqlmodel import Session, select
 
 from app.models import User, UserSession, TokenBlacklist, UserRole, UserStatus
 from app.services.auth import TokenManager
+from app.services.redis_service import redis_service
 from app.database import engine
 
 
@@ -228,4 +232,148 @@ class TestTokenManager:
         
         # Refresh token should not validate as access token
         payload = token_manager.validate_token(refresh_token, "access")
-        assert payload is None
\ No newline at end of file
+        assert payload is None
+    
+    @pytest.mark.asyncio
+    async def test_validate_token_async_checks_redis_first(self, token_manager, test_user):
+        """A Redis blacklist hit rejects the token without touching the database."""
+        access_token = token_manager.create_tokens(test_user)["access_token"]
+        token_manager.redis_blacklist_ready = True
+        mock_client = AsyncMock()
+        mock_client.mget.return_value = ["1", "1"]
+        
+        with patch.object(redis_service, "redis_client", mock_client), \
+             patch.object(token_manager, "_is_token_blacklisted") as mock_db_check:
+            assert await token_manager.validate_token_async(access_token, "access") is None
+            mock_db_check.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_failed_redis_mirror_falls_back_to_database(self, token_manager, test_user):
+        """After a failed blacklist write, Redis misses are not trusted until rehydrated."""
+        access_token = token_manager.create_tokens(test_user)["access_token"]
+        token_manager.redis_blacklist_ready = True
+        mock_client = AsyncMock()
+        mock_client.set.return_value = None
+        mock_client.mget.return_value = [None, "1"]
+        
+        with patch.object(redis_service, "redis_client", mock_client):
+            assert await token_manager.revoke_token_async(access_token) is True
+            assert token_manager.redis_blacklist_ready is False
+            assert await token_manager.validate_token_async(access_token, "access") is None
+        
+        mock_client.delete.assert_awaited_once_with("blacklist:__ready__")
+        mock_client.mget.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_missing_ready_marker_falls_back_to_database(self, token_manager, test_user):
+        """A Redis that lost its data is detected by the missing ready marker."""
+        access_token = token_manager.create_tokens(test_user)["access_token"]
+        jti = token_manager.validate_token(access_token, "access")["jti"]
+        assert token_manager.revoke_token(access_token) is True
+        token_manager.redis_blacklist_ready = True
+        mock_client = AsyncMock()
+        mock_client.mget.return_value = [None, None]
+        
+        with patch.object(redis_service, "redis_client", mock_client):
+            assert await token_manager._is_token_blacklisted_async(jti) is True
+        
+        assert token_manager.redis_blacklist_ready is False
+    
+    @pytest.mark.asyncio
+    async def test_validate_token_async_falls_back_to_database(self, token_manager, test_user):
+        """Without Redis, revocations recorded in the database still apply."""
+        access_token = token_manager.create_tokens(test_user)["access_token"]
+        
+        with patch.object(redis_service, "redis_client", None):
+            assert await token_manager.validate_token_async(access_token, "access") is not None
+            assert await token_manager.revoke_token_async(access_token) is True
+            assert await token_manager.validate_token_async(access_token, "access") is None
+    
+    @pytest.mark.asyncio
+    async def test_revoke_token_async_mirrors_to_redis(self, token_manager, test_user):
+        """Revocation writes the blacklist entry to Redis with a TTL."""
+        access_token = token_manager.create_tokens(test_user)["access_token"]
+        jti = token_manager.validate_token(access_token, "access")["jti"]
+        mock_client = AsyncMock()
+        mock_client.set.return_value = True
+        
+        with patch.object(redis_service, "redis_client", mock_client):
+            assert await token_manager.revoke_token_async(access_token) is True
+        
+        key, value = mock_client.set.call_args.args
+        assert key == f"blacklist:{jti}"
+        assert 0 < mock_client.set.call_args.kwargs["ex"] <= token_manager.access_token_expire_minutes * 60
+    
+    def test_validate_token_reuses_verified_payload(self, token_manager, test_user):
+        """Repeat validations reuse the verified payload instead of re-checking the signature."""
+        access_token = token_manager.create_tokens(test_user)["access_token"]
+        assert token_manager.validate_token(access_token, "access") is not None
+        
+        with patch.object(token_manager, "_decode_token") as mock_decode:
+            assert token_manager.validate_token(access_token, "access") is not None
+            mock_decode.assert_not_called()
+        
+        assert token_manager.validate_token(access_token, "refresh") is None
+        assert token_manager.revoke_token(access_token) is True
+        assert token_manager.validate_token(access_token, "access") is None
+    
+    @pytest.mark.asyncio
+    async def test_validate_token_async_rejects_revoked_cached_token(self, token_manager, test_user):
+        """A cached payload does not outlive a revocation made by another worker."""
+        access_token = token_manager.create_tokens(test_user)["access_token"]
+        
+        with patch.object(redis_service, "redis_client", None):
+            assert await token_manager.validate_token_async(access_token, "access") is not None
+            
+            # Revoke through a separate manager, as another worker would
+            assert TokenManager().revoke_token(access_token) is True
+            assert token_manager._token_cache
+            assert await token_manager.validate_token_async(access_token, "access") is None
+    
+    def test_revoke_all_user_sessions_skips_already_blacklisted(self, token_manager, test_user):
+        """Tokens revoked earlier are not blacklisted a second time."""
+        result1 = token_manager.create_tokens(test_user)
+        token_manager.create_tokens(test_user)
+        token_manager.revoke_token(result1["access_token"])
+        
+        assert token_manager.revoke_all_user_sessions(test_user.id) is True
+        
+        with Session(engine) as session:
+            jtis = session.exec(select(TokenBlacklist.token_jti)).all()
+            assert len(jtis) == 4
+            assert len(set(jtis)) == 4
+    
+    def test_validate_token_requires_core_claims(self, token_manager):
+        """Tokens missing sub/jti/exp/type are rejected at decode time."""
+        token = jwt.encode(
+            {"sub": "1", "type": "access", "exp": datetime.utcnow() + timedelta(minutes=5)},
+            token_manager.jwt_secret,
+            algorithm=token_manager.jwt_algorithm
+        )
+        
+        assert token_manager.validate_token(token, "access") is None
+    
+    @pytest.mark.asyncio
+    async def test_revoke_all_user_sessions_async_pipelines_redis_writes(self, token_manager, test_user):
+        """All revoked token ids are mirrored to Redis in a single pipelined call."""
+        token_manager.create_tokens(test_user)
+        token_manager.create_tokens(test_user)
+        
+        with patch.object(redis_service, "set_many", new_callable=AsyncMock) as mock_set_many:
+            assert await token_manager.revoke_all_user_sessions_async(test_user.id) is True
+        
+        mock_set_many.assert_awaited_once()
+        entries = mock_set_many.call_args.args[0]
+        assert len(entries) == 4
+        assert all(key.startswith("blacklist:") and ttl > 0 for key, _, ttl in entries)
+    
+    def test_token_ids_are_short_and_time_ordered(self, token_manager, test_user):
+        """JTIs are 26-char ULIDs that sort by creation time."""
+        first = token_manager.create_tokens(test_user)
+        time.sleep(0.002)
+        second = token_manager.create_tokens(test_user)
+        
+        first_jti = token_manager.validate_token(first["access_token"])["jti"]
+        second_jti = token_manager.validate_token(second["access_token"])["jti"]
+        assert len(first_jti) == len(second_jti) == 26
+        assert first_jti < second_jti
@@ -0,0 +1,71 @@
+"""
+Tests for blockchain service contract reads.
+"""
+
+import pytest
+from unittest.mock import Mock
+
+pytest.importorskip("web3")
+
+from eth_abi import encode  # noqa: E402
+
+from app.services.blockchain_service import BlockchainService  # noqa: E402
+
+
+def _uint(value: int) -> bytes:
+    return encode(["uint256"], [value])
+
+
+@pytest.fixture
+def blockchain_service():
+    """Create a service whose node and contracts are mocks."""
+    service = BlockchainService()
+    service.w3 = Mock()
+    service.agridao = Mock(address="0x0000000000000000000000000000000000000001")
+    service.multicall = Mock(address="0xcA11bde05977b3631167028862bE2a173976CA11")
+    return service
+
+
+class TestBlockchainStats:
+    """Test cases for get_blockchain_stats."""
+
+    def test_stats_batched_through_multicall(self, blockchain_service):
+        """With Multicall3 deployed, all reads go out in one aggregate3 call."""
+        blockchain_service.w3.eth.get_code.return_value = b"\x60\x80"
+        aggregate = blockchain_service.multicall.functions.aggregate3.return_value
+        aggregate.call.return_value = [(True, _uint(7)), (True, _uint(3)), (True, _uint(1700000000))]
+
+        stats = blockchain_service.get_blockchain_stats()
+
+        assert stats["active_users"] == 7
+        assert stats["total_transactions"] == 3
+        assert stats["last_block_time"] == 1700000000
+        blockchain_service.agridao.functions.memberCount.assert_not_called()
+
+    def test_stats_fall_back_without_multicall(self, blockchain_service):
+        """On chains without Multicall3, each value is read with its own call."""
+        blockchain_service.w3.eth.get_code.return_value = b""
+        blockchain_service.w3.eth.get_block.return_value = {"timestamp": 1700000000}
+        functions = blockchain_service.agridao.functions
+        functions.memberCount.return_value.call.return_value = 7
+        functions.proposalCount.return_value.call.return_value = 3
+
+        stats = blockchain_service.get_blockchain_stats()
+
+        assert stats["active_users"] == 7
+        assert stats["total_transactions"] == 3
+        assert stats["last_block_time"] == 1700000000
+        blockchain_service.multicall.functions.aggregate3.assert_not_called()
+
+    def test_multicall_probe_runs_once(self, blockchain_service):
+        """The deployment check is cached for the life of the service."""
+        blockchain_service.w3.eth.get_code.return_value = b""
+        blockchain_service.w3.eth.get_block.return_value = {"timestamp": 1700000000}
+        blockchain_service.agridao.functions.memberCount.return_value.call.return_value = 0
+        blockchain_service.agridao.functions.proposalCount.return_value.call.return_value = 0
+
+        blockchain_service.get_blockchain_stats()
+        blockchain_service._view_cache.clear()
+        blockchain_service.get_blockchain_stats()
+
+        blockchain_service.w3.eth.get_code.assert_called_once()
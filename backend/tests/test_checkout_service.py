@@ -2,8 +2,11 @@
 Tests for checkout service functionality.
 """
 
+import json
+import time
 import pytest
 from decimal import Decimal
+from unittest.mock import AsyncMock
 
 from sqlmodel import Session
 
@@ -98,12 +101,13 @@ class TestCheckoutValidator:
         assert result["valid"] is False
         assert result["error_type"] == "user_not_found"
     
-    def test_validate_pricing_valid(self, checkout_validator, cart_service, test_user, test_product):
+    @pytest.mark.asyncio
+    async def test_validate_pricing_valid(self, checkout_validator, cart_service, test_user, test_product):
         """Test validating pricing with valid cart."""
-        cart = cart_service.get_or_create_cart(user_id=test_user.id)
-        cart_service.add_item(cart.id, test_product.id, 2)
+        cart = await cart_service.get_or_create_cart(user_id=test_user.id)
+        await cart_service.add_item(cart.id, test_product.id, 2)
         
-        result = checkout_validator.validate_pricing(cart.id)
+        result = await checkout_validator.validate_pricing(cart.id)
         
         assert result["valid"] is True
         assert "pricing" in result
@@ -112,15 +116,39 @@ class TestCheckoutValidator:
         assert result["pricing"]["tax_amount"] >= 0
         assert result["pricing"]["total"] > result["pricing"]["subtotal"]
     
-    def test_validate_pricing_empty_cart(self, checkout_validator, cart_service, test_user):
+    @pytest.mark.asyncio
+    async def test_validate_pricing_empty_cart(self, checkout_validator, cart_service, test_user):
         """Test validating pricing with empty cart."""
-        cart = cart_service.get_or_create_cart(user_id=test_user.id)
+        cart = await cart_service.get_or_create_cart(user_id=test_user.id)
         
-        result = checkout_validator.validate_pricing(cart.id)
+        result = await checkout_validator.validate_pricing(cart.id)
         
         assert result["valid"] is False
         assert result["error_type"] == "empty_cart"
-    
+
+    @pytest.mark.asyncio
+    async def test_validate_inventory_and_pricing(self, checkout_validator, cart_service, test_product):
+        """Test the combined stock and price check over one cart read."""
+        cart = await cart_service.get_or_create_cart(session_id="inventory_pricing_session")
+        await cart_service.add_item(cart.id, test_product.id, 2)
+
+        result = checkout_validator.validate_inventory_and_pricing(cart.id)
+
+        assert result["valid"] is True
+        assert result["pricing"]["subtotal"] == float(test_product.price * 2)
+
+        with Session(engine) as session:
+            product = session.get(Product, test_product.id)
+            product.quantity_available = 1
+            session.add(product)
+            session.commit()
+
+        result = checkout_validator.validate_inventory_and_pricing(cart.id)
+
+        assert result["valid"] is False
+        assert result["error_type"] == "inventory_validation"
+        assert result["issues"][0]["type"] == "insufficient_stock"
+
     def test_validate_shipping_address_valid(self, checkout_validator):
         """Test validating valid US shipping address."""
         address = {
@@ -175,6 +203,31 @@ class TestCheckoutValidator:
         assert result["error_type"] == "address_format"
         assert any(error["field"] == "postal_code" for error in result["errors"])
     
+    @pytest.mark.parametrize("postal_code,valid", [
+        ("94102", True),
+        ("94102-1234", True),
+        ("9410", False),
+        ("94102-123", False),
+        ("94102 1234", False),
+        ("9410a", False),
+        ("\u0669\u0664\u0661\u0660\u0662", False),
+    ])
+    def test_validate_shipping_address_us_zip_formats(self, checkout_validator, postal_code, valid):
+        """Test US ZIP and ZIP+4 format checks."""
+        address = {
+            "first_name": "John",
+            "last_name": "Doe",
+            "address_line_1": "123 Main St",
+            "city": "San Francisco",
+            "state": "CA",
+            "postal_code": postal_code,
+            "country": "US"
+        }
+        
+        result = checkout_validator.validate_shipping_address(address)
+        
+        assert result["valid"] is valid
+    
     def test_validate_canadian_address(self, checkout_validator):
         """Test validating Canadian address."""
         address = {
@@ -192,10 +245,11 @@ class TestCheckoutValidator:
         assert result["valid"] is True
         assert result["formatted_address"]["postal_code"] == "M5V 3A8"
     
-    def test_create_checkout_session_valid(self, checkout_validator, cart_service, test_user, test_product):
+    @pytest.mark.asyncio
+    async def test_create_checkout_session_valid(self, checkout_validator, cart_service, test_user, test_product):
         """Test creating valid checkout session."""
-        cart = cart_service.get_or_create_cart(user_id=test_user.id)
-        cart_service.add_item(cart.id, test_product.id, 2)
+        cart = await cart_service.get_or_create_cart(user_id=test_user.id)
+        await cart_service.add_item(cart.id, test_product.id, 2)
         
         address = {
             "first_name": "John",
@@ -207,7 +261,7 @@ class TestCheckoutValidator:
             "country": "US"
         }
         
-        result = checkout_validator.create_checkout_session(
+        result = await checkout_validator.create_checkout_session(
             user_id=test_user.id,
             cart_id=cart.id,
             shipping_address=address
@@ -222,10 +276,11 @@ class TestCheckoutValidator:
         assert "pricing" in session_data
         assert "shipping_address" in session_data
     
-    def test_create_checkout_session_invalid_user(self, checkout_validator, cart_service, test_product):
+    @pytest.mark.asyncio
+    async def test_create_checkout_session_invalid_user(self, checkout_validator, cart_service, test_product):
         """Test creating checkout session with invalid user."""
-        cart = cart_service.get_or_create_cart(session_id="test-session")
-        cart_service.add_item(cart.id, test_product.id, 2)
+        cart = await cart_service.get_or_create_cart(session_id="test-session")
+        await cart_service.add_item(cart.id, test_product.id, 2)
         
         address = {
             "first_name": "John",
@@ -237,7 +292,7 @@ class TestCheckoutValidator:
             "country": "US"
         }
         
-        result = checkout_validator.create_checkout_session(
+        result = await checkout_validator.create_checkout_session(
             user_id=99999,  # Non-existent user
             cart_id=cart.id,
             shipping_address=address
@@ -246,6 +301,43 @@ class TestCheckoutValidator:
         assert result["valid"] is False
         assert result["error_type"] == "user_not_found"
     
+    @pytest.mark.asyncio
+    async def test_get_checkout_session_expired(self, checkout_validator):
+        """Test that an expired cached session is dropped and not returned."""
+        session_data = {
+            "session_id": "checkout_1_1_abc",
+            "user_id": 1,
+            "expires_at": int(time.time()) - 60
+        }
+        redis = AsyncMock()
+        redis.get.return_value = json.dumps(session_data)
+        checkout_validator.redis_service = redis
+        
+        result = await checkout_validator.get_checkout_session("checkout_1_1_abc")
+        
+        assert result is None
+        redis.delete.assert_awaited_once_with("checkout_session:checkout_1_1_abc")
+
+    @pytest.mark.asyncio
+    async def test_get_checkout_session_cached_in_process(self, checkout_validator):
+        """Test that repeated reads skip Redis until the session is invalidated."""
+        session_data = {
+            "session_id": "checkout_1_1_def",
+            "user_id": 1,
+            "expires_at": int(time.time()) + 60
+        }
+        redis = AsyncMock()
+        redis.get.return_value = json.dumps(session_data)
+        checkout_validator.redis_service = redis
+
+        assert await checkout_validator.get_checkout_session("checkout_1_1_def") == session_data
+        assert await checkout_validator.get_checkout_session("checkout_1_1_def") == session_data
+        assert redis.get.await_count == 1
+
+        await checkout_validator.invalidate_checkout_session("checkout_1_1_def")
+        await checkout_validator.get_checkout_session("checkout_1_1_def")
+        assert redis.get.await_count == 2
+    
     def test_calculate_tax_california(self, checkout_validator):
         """Test tax calculation for California."""
         subtotal = Decimal("100.00")
@@ -0,0 +1,64 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session
+from starlette.requests import Request
+
+from app.database import engine
+from app.deps import get_current_user, invalidate_cached_user
+from app.models import User
+from app.routers.users import suspend_user
+from app.services.auth import token_manager
+
+
+def _request() -> Request:
+    return Request({"type": "http", "headers": []})
+
+
+def _bearer(user: User) -> str:
+    return f"Bearer {token_manager.create_tokens(user)['access_token']}"
+
+
+class TestGetCurrentUser:
+
+    @pytest.mark.asyncio
+    async def test_memoizes_user_on_request_state(self, regular_user):
+        """Repeated resolution within one request skips token validation."""
+        request = _request()
+        authorization = _bearer(regular_user)
+
+        user = await get_current_user(request, authorization)
+
+        with patch.object(token_manager, "validate_token_async") as mock_validate:
+            assert await get_current_user(request, authorization) is user
+            mock_validate.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_reuses_cached_user_until_invalidated(self, regular_user):
+        """Users are cached across requests and dropped on invalidation."""
+        authorization = _bearer(regular_user)
+        await get_current_user(_request(), authorization)
+
+        with Session(engine) as session:
+            session.delete(session.get(User, regular_user.id))
+            session.commit()
+
+        assert (await get_current_user(_request(), authorization)).id == regular_user.id
+
+        invalidate_cached_user(regular_user.id)
+        with pytest.raises(HTTPException) as exc_info:
+            await get_current_user(_request(), authorization)
+        assert exc_info.value.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_suspension_applies_on_next_request(self, admin_user, regular_user):
+        """Suspending a user evicts them from the cache immediately."""
+        authorization = _bearer(regular_user)
+        await get_current_user(_request(), authorization)
+
+        suspend_user(regular_user.id, admin_user)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await get_current_user(_request(), authorization)
+        assert exc_info.value.status_code == 403
@@ -471,7 +471,30 @@ class TestDisputeService:
             )
         
         assert "Admin access required" in str(exc_info.value)
-    
+
+    def test_demoted_admin_loses_access_immediately(self, dispute_service, sample_admin):
+        """Test that the admin role is checked per call, not cached."""
+
+        dispute_service.get_admin_disputes(admin_id=sample_admin.id, limit=10)
+
+        with Session(engine) as session:
+            admin = session.get(User, sample_admin.id)
+            admin.role = UserRole.BUYER
+            session.add(admin)
+            session.commit()
+
+        with pytest.raises(Exception) as exc_info:
+            dispute_service.get_admin_disputes(admin_id=sample_admin.id, limit=10)
+
+        assert "Admin access required" in str(exc_info.value)
+
+        with pytest.raises(Exception):
+            dispute_service.get_admin_disputes(
+                admin_id=sample_admin.id,
+                limit=10,
+                admin_role=UserRole.BUYER
+            )
+
     def test_auto_escalate_disputes(self, dispute_service, sample_order_with_items, sample_buyer):
         """Test automatic dispute escalation."""
         
@@ -494,6 +517,7 @@ class TestDisputeService:
             session.commit()
         
         # Run auto-escalation
+        before = datetime.utcnow()
         escalation_result = dispute_service.auto_escalate_disputes()
         
         assert escalation_result["escalated_count"] == 1
@@ -503,6 +527,8 @@ class TestDisputeService:
             dispute = session.get(Dispute, dispute_result["id"])
             assert dispute.status == DisputeStatus.ESCALATED
             assert dispute.escalated_at is not None
+            assert dispute.escalated_at >= before
+            assert dispute.updated_at == dispute.escalated_at
             assert dispute.priority > 1  # Priority should be increased
     
     def test_dispute_priority_calculation(self, dispute_service, sample_order_with_items, sample_buyer):
@@ -523,7 +549,44 @@ class TestDisputeService:
         with Session(engine) as session:
             dispute = session.get(Dispute, high_priority_dispute["id"])
             assert dispute.priority >= 4  # ORDER_NOT_RECEIVED should have high priority
-    
+
+    def test_create_dispute_defers_notifications(self, dispute_service, sample_order_with_items, sample_buyer):
+        """Test that notifications are queued as a background task when one is given."""
+
+        background_tasks = Mock()
+
+        result = dispute_service.create_dispute(
+            order_id=sample_order_with_items["order_id"],
+            filed_by=sample_buyer.id,
+            dispute_type=DisputeType.OTHER,
+            subject="Background notification",
+            description="Notifications run after the response",
+            background_tasks=background_tasks
+        )
+
+        background_tasks.add_task.assert_called_once_with(
+            dispute_service._send_dispute_notifications, [result["id"]], "created"
+        )
+
+    def test_dispute_access_is_memoized(self, dispute_service, sample_order_with_items, sample_buyer, sample_farmer_user):
+        """Test that repeated access checks reuse the cached answer."""
+
+        dispute_result = dispute_service.create_dispute(
+            order_id=sample_order_with_items["order_id"],
+            filed_by=sample_buyer.id,
+            dispute_type=DisputeType.OTHER,
+            subject="Access check",
+            description="Farmer reads the dispute twice"
+        )
+
+        with Session(engine) as session:
+            dispute = session.get(Dispute, dispute_result["id"])
+            assert dispute_service._user_can_access_dispute(dispute, sample_farmer_user.id, session)
+
+            with patch.object(dispute_service, "_check_dispute_access") as mock_check:
+                assert dispute_service._user_can_access_dispute(dispute, sample_farmer_user.id, session)
+                mock_check.assert_not_called()
+
     def test_internal_admin_messages(self, dispute_service, sample_order_with_items, sample_buyer, sample_admin):
         """Test internal admin messages that are not visible to users."""
         
@@ -0,0 +1,69 @@
+"""
+Tests for order router tracking cache handling.
+"""
+
+import json
+from datetime import datetime
+from typing import Dict
+from unittest.mock import AsyncMock, Mock, patch
+
+from app.models import User, UserRole, OrderStatus
+from app.services.auth import token_manager
+from app.services.redis_service import redis_service
+
+
+def _auth_header(user: User) -> Dict[str, str]:
+    tokens = token_manager.create_tokens(user)
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+class TestOrderTrackingCache:
+    """Test cases for the per-order tracking cache."""
+
+    def test_tracking_served_from_order_hash(self, client, regular_user):
+        """Each viewer's payload is a field of one hash per order."""
+        tracking = {"order_id": 7, "current_status": "shipped"}
+
+        with patch.object(redis_service, "hget", AsyncMock(return_value=json.dumps(tracking))) as mock_hget, \
+             patch("app.routers.orders.order_service") as mock_order_service:
+            response = client.get("/api/orders/7/tracking", headers=_auth_header(regular_user))
+
+        assert response.status_code == 200
+        assert response.json() == tracking
+        mock_hget.assert_awaited_once_with("tracking:7", str(regular_user.id))
+        mock_order_service.get_order_tracking_info.assert_not_called()
+
+    def test_status_update_drops_tracking_hash(self, client, admin_user):
+        """A status change invalidates every viewer's tracking entry with one DEL."""
+        updated_order = Mock(id=7, status=OrderStatus.SHIPPED, updated_at=datetime.utcnow())
+
+        with patch.object(redis_service, "delete", AsyncMock(return_value=True)) as mock_delete, \
+             patch("app.routers.orders.order_service") as mock_order_service:
+            mock_order_service.update_order_status.return_value = updated_order
+            response = client.put(
+                "/api/orders/7/status",
+                json={"status": OrderStatus.SHIPPED.value},
+                headers=_auth_header(admin_user)
+            )
+
+        assert response.status_code == 200
+        mock_delete.assert_awaited_once_with("tracking:7")
+
+    def test_bulk_update_drops_each_order_in_one_call(self, client, db_session):
+        """Bulk updates invalidate all touched orders in a single DEL."""
+        farmer = User(email="bulk-farmer@example.com", name="Bulk Farmer", role=UserRole.FARMER)
+        db_session.add(farmer)
+        db_session.commit()
+        db_session.refresh(farmer)
+
+        with patch.object(redis_service, "delete", AsyncMock(return_value=True)) as mock_delete, \
+             patch("app.routers.orders.order_service") as mock_order_service:
+            mock_order_service.bulk_update_order_status.return_value = {"updated_orders": []}
+            response = client.put(
+                "/api/farmer/orders/bulk-update",
+                json={"order_ids": [3, 4], "status": OrderStatus.SHIPPED.value},
+                headers=_auth_header(farmer)
+            )
+
+        assert response.status_code == 200
+        mock_delete.assert_awaited_once_with("tracking:3", "tracking:4")
@@ -1,6 +1,6 @@
 import pytest
 import asyncio
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from app.services.redis_service import RedisService
 
 
@@ -91,6 +91,51 @@ class TestRedisService:
         
         assert result is False
     
+    @pytest.mark.asyncio
+    async def test_mget_success(self, redis_service, mock_redis_client):
+        """Test batched GET of several keys."""
+        mock_redis_client.mget.return_value = ["1", None]
+        redis_service.redis_client = mock_redis_client
+        
+        result = await redis_service.mget(["a", "b"])
+        
+        assert result == ["1", None]
+        mock_redis_client.mget.assert_called_once_with(["a", "b"])
+    
+    @pytest.mark.asyncio
+    async def test_mget_no_client(self, redis_service):
+        """Test batched GET without Redis client."""
+        redis_service.redis_client = None
+        
+        result = await redis_service.mget(["a", "b"])
+        
+        assert result == [None, None]
+    
+    @pytest.mark.asyncio
+    async def test_set_many_success(self, redis_service, mock_redis_client):
+        """Test pipelined SET of several keys."""
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=[True, True])
+        mock_redis_client.pipeline = MagicMock(return_value=pipe)
+        redis_service.redis_client = mock_redis_client
+        
+        result = await redis_service.set_many([("a", "1", 60), ("b", "1", 120)])
+        
+        assert result is True
+        mock_redis_client.pipeline.assert_called_once_with(transaction=False)
+        pipe.set.assert_any_call("a", "1", ex=60)
+        pipe.set.assert_any_call("b", "1", ex=120)
+        pipe.execute.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_set_many_no_client(self, redis_service):
+        """Test pipelined SET without Redis client."""
+        redis_service.redis_client = None
+        
+        result = await redis_service.set_many([("a", "1", 60)])
+        
+        assert result is False
+    
     @pytest.mark.asyncio
     async def test_delete_success(self, redis_service, mock_redis_client):
         """Test successful DELETE operation."""
@@ -100,7 +145,43 @@ class TestRedisService:
         
         assert result is True
         mock_redis_client.delete.assert_called_once_with("test_key")
-    
+
+    @pytest.mark.asyncio
+    async def test_delete_many_keys(self, redis_service, mock_redis_client):
+        """Test deleting several keys in one call."""
+        mock_redis_client.delete.return_value = 2
+        redis_service.redis_client = mock_redis_client
+
+        result = await redis_service.delete("cart_items:1", "cart_items:2")
+
+        assert result is True
+        mock_redis_client.delete.assert_called_once_with("cart_items:1", "cart_items:2")
+
+    @pytest.mark.asyncio
+    async def test_delete_pattern_success(self, redis_service, mock_redis_client):
+        """Test deleting all keys matching a pattern."""
+        async def scan_iter(match):
+            for key in ("reviews:1:10:0", "reviews:1:10:10"):
+                yield key
+
+        mock_redis_client.scan_iter = scan_iter
+        mock_redis_client.delete.return_value = 2
+        redis_service.redis_client = mock_redis_client
+
+        result = await redis_service.delete_pattern("reviews:1:*")
+
+        assert result == 2
+        mock_redis_client.delete.assert_called_once_with("reviews:1:10:0", "reviews:1:10:10")
+
+    @pytest.mark.asyncio
+    async def test_delete_pattern_no_client(self, redis_service):
+        """Test pattern delete without Redis client."""
+        redis_service.redis_client = None
+
+        result = await redis_service.delete_pattern("reviews:1:*")
+
+        assert result == 0
+
     @pytest.mark.asyncio
     async def test_incr_success(self, redis_service, mock_redis_client):
         """Test successful INCR operation."""
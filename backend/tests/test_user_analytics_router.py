@@ -0,0 +1,205 @@
+"""
+Tests for the user analytics router.
+"""
+
+import json
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import (
+    User, UserRole, Order, OrderItem, Product, ProductStatus, PaymentStatus
+)
+from app.database import engine
+from app.services.auth import token_manager
+from app.services.redis_service import redis_service
+from sqlmodel import Session, delete
+
+# Orders are dated well before any other test's rows, and queried by that window
+ORDER_DATE = datetime(2020, 1, 15)
+WINDOW = {"start_date": "2020-01-01T00:00:00", "end_date": "2020-02-01T00:00:00"}
+CATEGORY = "user-analytics-greens"
+
+
+def _auth_header(user: User) -> Dict[str, str]:
+    tokens = token_manager.create_tokens(user)
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+class TestUserAnalyticsRouter:
+    """Test cases for buyer and farmer analytics endpoints."""
+
+    @pytest.fixture
+    def client(self):
+        """Create test client."""
+        return TestClient(app)
+
+    @pytest.fixture
+    def users(self):
+        """Create two buyers and a farmer."""
+        with Session(engine) as session:
+            created = {
+                "buyer": User(role=UserRole.BUYER, name="Analytics Buyer", email="ua-buyer@test.com"),
+                "other_buyer": User(role=UserRole.BUYER, name="Other Buyer", email="ua-other@test.com"),
+                "farmer": User(role=UserRole.FARMER, name="Analytics Farmer", email="ua-farmer@test.com"),
+            }
+            session.add_all(created.values())
+            session.commit()
+            for user in created.values():
+                session.refresh(user)
+            return created
+
+    @pytest.fixture
+    def catalog(self, users):
+        """Create products and paid orders; removed again after the test."""
+        with Session(engine) as session:
+            products = {
+                name: Product(name=name, category=CATEGORY, price=Decimal("5.00"), status=status)
+                for name, status in (
+                    ("bought", ProductStatus.ACTIVE),
+                    ("quiet", ProductStatus.ACTIVE),
+                    ("popular", ProductStatus.ACTIVE),
+                    ("retired", ProductStatus.INACTIVE),
+                )
+            }
+            session.add_all(products.values())
+            session.commit()
+            for product in products.values():
+                session.refresh(product)
+
+            order_ids = []
+
+            def add_order(buyer: User, lines, payment_status=PaymentStatus.PAID):
+                order = Order(
+                    buyer_id=buyer.id,
+                    subtotal=Decimal("0"),
+                    platform_fee=Decimal("0"),
+                    total=Decimal("0"),
+                    payment_status=payment_status,
+                    created_at=ORDER_DATE
+                )
+                session.add(order)
+                session.commit()
+                session.refresh(order)
+                order_ids.append(order.id)
+                for product, quantity in lines:
+                    session.add(OrderItem(
+                        order_id=order.id,
+                        product_id=product.id,
+                        quantity=Decimal(quantity),
+                        unit_price=product.price,
+                        farmer_id=users["farmer"].id
+                    ))
+                session.commit()
+
+            add_order(users["buyer"], [(products["bought"], "2")])
+            add_order(users["buyer"], [(products["bought"], "1")])
+            add_order(users["other_buyer"], [(products["popular"], "1"), (products["retired"], "1")])
+            add_order(users["other_buyer"], [(products["popular"], "4")], PaymentStatus.UNPAID)
+
+            product_ids = [product.id for product in products.values()]
+
+        yield products
+
+        with Session(engine) as session:
+            session.exec(delete(OrderItem).where(OrderItem.order_id.in_(order_ids)))
+            session.exec(delete(Order).where(Order.id.in_(order_ids)))
+            session.exec(delete(Product).where(Product.id.in_(product_ids)))
+            session.commit()
+
+    def test_buyer_recommendations_ranked_by_popularity(self, client, users, catalog):
+        """Unbought active products in purchased categories, most ordered first."""
+
+        response = client.get(
+            "/analytics/buyer/recommendations?limit=50", headers=_auth_header(users["buyer"])
+        )
+
+        assert response.status_code == 200
+        names = [
+            rec["name"] for rec in response.json()["recommendations"] if rec["category"] == CATEGORY
+        ]
+        assert names == ["popular", "quiet"]
+
+    def test_buyer_recommendations_requires_buyer(self, client, users):
+        """Farmers cannot read buyer recommendations."""
+
+        response = client.get("/analytics/buyer/recommendations", headers=_auth_header(users["farmer"]))
+
+        assert response.status_code == 403
+
+    def test_farmer_customer_insights(self, client, users, catalog):
+        """Paid orders are grouped per customer, with repeat buyers counted in SQL."""
+
+        # The revenue rollup is a Postgres materialized view; order analytics are covered elsewhere
+        with patch("app.routers.user_analytics._get_farmer_monthly_revenue", return_value=[]), \
+             patch("app.routers.user_analytics.order_service") as mock_order_service:
+            mock_order_service.get_farmer_order_analytics.return_value = {"total_revenue": 30.0}
+
+            response = client.get(
+                "/analytics/farmer/enhanced", params=WINDOW, headers=_auth_header(users["farmer"])
+            )
+
+        assert response.status_code == 200
+        data = response.json()
+        insights = data["customer_insights"]
+        assert insights["total_customers"] == 2
+        assert insights["repeat_customers"] == 1
+
+        top = insights["top_customers"]
+        assert [customer["user_id"] for customer in top] == [users["buyer"].id, users["other_buyer"].id]
+        assert top[0]["name"] == "Analytics Buyer"
+        assert top[0]["total_spent"] == 15.0
+        assert top[0]["order_count"] == 2
+        assert top[1]["total_spent"] == 10.0
+
+        assert data["performance_metrics"]["customer_retention_rate"] == 0.5
+        assert data["performance_metrics"]["average_customer_value"] == 15.0
+
+    def test_cache_hit_returns_stored_body(self, client, users):
+        """A cached body is sent verbatim without recomputing analytics."""
+
+        body = json.dumps({"recommendations": [{"product_id": 1, "name": "Cached"}]})
+
+        with patch.object(redis_service, "get", AsyncMock(return_value=body)) as mock_get, \
+             patch("app.routers.user_analytics._get_buyer_recommendations") as mock_build:
+            response = client.get(
+                "/analytics/buyer/recommendations?limit=5", headers=_auth_header(users["buyer"])
+            )
+
+        assert response.status_code == 200
+        assert response.text == body
+        assert response.headers["content-type"] == "application/json"
+        mock_get.assert_awaited_once_with(f"analytics:buyer_recommendations:{users['buyer'].id}:5")
+        mock_build.assert_not_called()
+
+    def test_cache_miss_stores_serialized_body(self, client, users):
+        """On a miss the response is computed once and the sent body is what gets cached."""
+
+        analytics = {
+            "total_spent": 12.5,
+            "total_orders": 1,
+            "average_order_value": 12.5,
+            "favorite_categories": [CATEGORY],
+            "purchase_history": [],
+            "spending_trends": {"monthly_spending": {"2020-01": 12.5}, "trend": "stable"}
+        }
+
+        with patch.object(redis_service, "get", AsyncMock(return_value=None)), \
+             patch.object(redis_service, "set", AsyncMock(return_value=True)) as mock_set, \
+             patch("app.routers.user_analytics._calculate_buyer_analytics", return_value=analytics), \
+             patch("app.routers.user_analytics._get_buyer_recommendations", return_value=[]):
+            response = client.get(
+                "/analytics/buyer", params=WINDOW, headers=_auth_header(users["buyer"])
+            )
+
+        assert response.status_code == 200
+        assert response.json() == {**analytics, "recommendations": []}
+
+        key, cached_body = mock_set.call_args.args
+        assert key == f"analytics:buyer:{users['buyer'].id}:2020-01-01:2020-02-01:1"
+        assert cached_body == response.text
+        assert mock_set.call_args.kwargs["expire"] == 120